@@ -0,0 +1,108 @@
+"""
+    Compares text CSV COPY with binary COPY on a wide numeric file.
+
+    Usage: python benchmarks/binary_copy.py --host localhost --port 5440 --dbname tests --user tests
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from postgresql_csv_loader import CsvLoader  # noqa: E402
+
+
+def generate_numeric_file(file_path, rows, columns, seed=0):
+    """
+    Writes CSV file with integer and decimal columns.
+
+    :param file_path: path of the created file
+    :param rows: number of records
+    :param columns: number of columns, half of them integers and half decimals
+    :param seed: random seed
+    """
+    generator = random.Random(seed)
+    with open(file_path, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["c{}".format(index) for index in range(columns)])
+        for _ in range(rows):
+            writer.writerow([generator.randint(-10 ** 6, 10 ** 6) if index % 2 == 0
+                             else "{:.4f}".format(generator.uniform(-1000, 1000)) for index in range(columns)])
+
+
+def backend_cpu_time(pid):
+    """
+    Reads CPU time used by a server process, possible only if the database runs on this machine.
+
+    :param pid: backend process id
+    :return: user and system time in seconds, None if not available
+    """
+    try:
+        with open("/proc/{}/stat".format(pid)) as stat_file:
+            fields = stat_file.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def run(loader, file_path, column_types, copy_format):
+    """
+    Loads file once and measures time.
+
+    :return: tuple of wall time, client CPU time and server CPU time (None if not available) in seconds
+    """
+    with loader.session():
+        with loader._acquire_connection() as connection:
+            backend_pid = connection.get_backend_pid()
+        server_started = backend_cpu_time(backend_pid)
+        started, cpu_started = time.perf_counter(), time.process_time()
+        loader.load_data(file_path, column_types=column_types, copy_format=copy_format)
+        elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+        server_finished = backend_cpu_time(backend_pid)
+
+        with loader._acquire_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("DROP TABLE {};".format(loader._generate_table_name(file_path)))
+            connection.commit()
+            cursor.close()
+    server = None if server_started is None or server_finished is None else server_finished - server_started
+    return elapsed, cpu, server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", default=5440)
+    parser.add_argument("--dbname", default="tests")
+    parser.add_argument("--user", default="tests")
+    parser.add_argument("--password")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--columns", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory, \
+            CsvLoader(args.host, args.port, args.dbname, args.user, args.password) as loader:
+        file_path = os.path.join(directory, "wide_numeric.csv")
+        generate_numeric_file(file_path, args.rows, args.columns)
+        size = os.path.getsize(file_path) / (1024 * 1024)
+        column_types = {"c{}".format(index): "integer" if index % 2 == 0 else "numeric"
+                        for index in range(args.columns)}
+
+        print("{} rows x {} columns, {:.1f} MB".format(args.rows, args.columns, size))
+        print("{:<8} {:>10} {:>10} {:>16} {:>16}".format("format", "wall [s]", "MB/s", "client CPU [s]",
+                                                           "server CPU [s]"))
+        for copy_format in CsvLoader.COPY_FORMATS:
+            results = [run(loader, file_path, column_types, copy_format) for _ in range(args.repeat)]
+            elapsed, cpu, server = min(results, key=lambda result: result[0])
+            print("{:<8} {:>10.2f} {:>10.1f} {:>16.2f} {:>16}".format(
+                copy_format, elapsed, size / elapsed, cpu, "n/a" if server is None else "{:.2f}".format(server)))
+
+
+if __name__ == "__main__":
+    main()
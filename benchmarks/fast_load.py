@@ -0,0 +1,106 @@
+"""
+    Measures WAL written by a normal load, a fast load (COPY FREEZE) and a fast load into an UNLOGGED table.
+
+    WAL is measured as the difference of pg_current_wal_insert_lsn() before and after the load, so other activity
+    on the server is counted as well. Results depend on wal_level: with wal_level=minimal a table created in the
+    loading transaction is not WAL-logged at all.
+
+    Usage: python benchmarks/fast_load.py --host localhost --port 5440 --dbname tests --user tests
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from binary_copy import generate_numeric_file  # noqa: E402
+from postgresql_csv_loader import CsvLoader  # noqa: E402
+
+MODES = [
+    ("normal", {}),
+    ("fast_load", {"fast_load": True}),
+    ("unlogged", {"fast_load": True, "unlogged": True}),
+]
+
+
+def wal_position(loader):
+    with loader._acquire_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT pg_current_wal_insert_lsn();")
+        position = cursor.fetchone()[0]
+        connection.commit()
+        cursor.close()
+    return position
+
+
+def wal_bytes_since(loader, position):
+    with loader._acquire_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT pg_wal_lsn_diff(pg_current_wal_insert_lsn(), %s);", (position,))
+        written = int(cursor.fetchone()[0])
+        connection.commit()
+        cursor.close()
+    return written
+
+
+def run(loader, file_path, column_types, options):
+    """
+    Loads file once and measures time and WAL.
+
+    :return: tuple of wall time in seconds and WAL bytes
+    """
+    with loader.session():
+        position = wal_position(loader)
+        started = time.perf_counter()
+        loader.load_data(file_path, column_types=column_types, analyze=False, **options)
+        elapsed = time.perf_counter() - started
+        written = wal_bytes_since(loader, position)
+
+        with loader._acquire_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("DROP TABLE {};".format(loader._generate_table_name(file_path)))
+            connection.commit()
+            cursor.close()
+    return elapsed, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", default=5440)
+    parser.add_argument("--dbname", default="tests")
+    parser.add_argument("--user", default="tests")
+    parser.add_argument("--password")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory, \
+            CsvLoader(args.host, args.port, args.dbname, args.user, args.password) as loader:
+        file_path = os.path.join(directory, "fast_load.csv")
+        generate_numeric_file(file_path, args.rows, args.columns)
+        size = os.path.getsize(file_path) / (1024 * 1024)
+        column_types = {"c{}".format(index): "integer" if index % 2 == 0 else "numeric"
+                        for index in range(args.columns)}
+        with loader._acquire_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SHOW wal_level;")
+            wal_level = cursor.fetchone()[0]
+            connection.commit()
+            cursor.close()
+
+        print("{} rows x {} columns, {:.1f} MB, wal_level={}".format(args.rows, args.columns, size, wal_level))
+        print("{:<10} {:>10} {:>10} {:>12}".format("mode", "wall [s]", "MB/s", "WAL [MB]"))
+        for name, options in MODES:
+            results = [run(loader, file_path, column_types, options) for _ in range(args.repeat)]
+            elapsed, written = min(results, key=lambda result: result[0])
+            print("{:<10} {:>10.2f} {:>10.1f} {:>12.1f}".format(name, elapsed, size / elapsed,
+                                                                 written / (1024 * 1024)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+    Generates synthetic CSV files for benchmarks.
+
+    Usage: python benchmarks/generate.py data.csv --size 100MB --columns 20 --types int,numeric,text,date
+"""
+
+import argparse
+import csv
+import random
+from datetime import date, datetime, timedelta
+
+TYPES = ("int", "bigint", "numeric", "bool", "date", "timestamp", "uuid", "text")
+DEFAULT_TYPES = ("int", "numeric", "text", "date", "timestamp", "bool")
+
+# words with national characters, only those representable in the file encoding are used
+WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "café", "naïve", "Zürich", "gęś", "żółw", "łódź",
+         "Straße", "smörgås", "ñandú", "Dvořák", "Ελλάδα", "Москва", "東京"]
+# characters that force a value to be quoted
+SPECIAL = [",", '"', "\n"]
+
+START_DATE = date(2000, 1, 1)
+START_TIME = datetime(2000, 1, 1)
+
+
+def parse_size(text):
+    """
+    Parses size with optional unit, e.g. '64MB', '1.5GB' or '1000'.
+
+    :param text: size
+    :return: number of bytes
+    """
+    units = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+    text = text.strip().upper()
+    for unit, multiplier in units.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * multiplier)
+    return int(text)
+
+
+def column_types(columns, types=DEFAULT_TYPES):
+    """
+    Assigns types to columns in rotation.
+
+    :param columns: number of columns
+    :param types: list of type names from TYPES
+    :return: list of type names, one per column
+    """
+    unknown = [name for name in types if name not in TYPES]
+    if unknown:
+        raise ValueError("Unknown types: {}, use: {}".format(", ".join(unknown), ", ".join(TYPES)))
+    return [types[index % len(types)] for index in range(columns)]
+
+
+def _value_factories(generator, encoding, quote_ratio):
+    words = []
+    for word in WORDS:
+        try:
+            word.encode(encoding)
+            words.append(word)
+        except UnicodeEncodeError:
+            pass
+
+    def text():
+        value = " ".join(generator.choice(words) for _ in range(generator.randint(1, 4)))
+        if generator.random() < quote_ratio:
+            position = generator.randint(0, len(value))
+            value = value[:position] + generator.choice(SPECIAL) + value[position:]
+        return value
+
+    return {
+        "int": lambda: str(generator.randint(-2 ** 31, 2 ** 31 - 1)),
+        "bigint": lambda: str(generator.randint(-2 ** 63, 2 ** 63 - 1)),
+        "numeric": lambda: "{:.4f}".format(generator.uniform(-10 ** 6, 10 ** 6)),
+        "bool": lambda: generator.choice(("true", "false")),
+        "date": lambda: (START_DATE + timedelta(days=generator.randint(0, 9000))).isoformat(),
+        "timestamp": lambda: (START_TIME + timedelta(seconds=generator.randint(0, 9000 * 86400))).isoformat(" "),
+        "uuid": lambda: "-".join(_uuid_parts(generator.getrandbits(128))),
+        "text": text,
+    }
+
+
+def _uuid_parts(number):
+    text = "{:032x}".format(number)
+    return text[:8], text[8:12], text[12:16], text[16:20], text[20:]
+
+
+def generate_csv(file_path, size=None, rows=None, columns=10, types=DEFAULT_TYPES, quote_ratio=0.1,
+                 encoding="utf-8", seed=0):
+    """
+    Writes CSV file with random values.
+
+    :param file_path: path of the created file
+    :param size: approximate file size in bytes, used if rows is None
+    :param rows: number of records
+    :param columns: number of columns
+    :param types: list of type names from TYPES, assigned to columns in rotation
+    :param quote_ratio: fraction of text values containing a delimiter, quote or new line, so they are quoted
+    :param encoding: file encoding, text uses only words representable in it
+    :param seed: random seed, the same arguments always give the same file
+    :return: number of records written
+    """
+    if rows is None and size is None:
+        raise ValueError("Either size or rows must be given")
+    generator = random.Random(seed)
+    factories = _value_factories(generator, encoding, quote_ratio)
+    column_factories = [factories[name] for name in column_types(columns, types)]
+    written = 0
+    with open(file_path, "w", encoding=encoding, newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["{}_{}".format(name, index) for index, name in enumerate(column_types(columns, types))])
+        while rows is None or written < rows:
+            # tell() of a text file is slow, so size is checked once per batch
+            if rows is None and written % 1000 == 0 and csv_file.tell() >= size:
+                break
+            writer.writerow([factory() for factory in column_factories])
+            written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file_path")
+    parser.add_argument("--size", type=parse_size, default=parse_size("10MB"))
+    parser.add_argument("--rows", type=int)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--types", default=",".join(DEFAULT_TYPES), help="comma separated: " + ", ".join(TYPES))
+    parser.add_argument("--quote-ratio", type=float, default=0.1)
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = generate_csv(args.file_path, args.size, args.rows, args.columns, args.types.split(","), args.quote_ratio,
+                        args.encoding, args.seed)
+    print("{} rows written to {}".format(rows, args.file_path))
+
+
+if __name__ == "__main__":
+    main()
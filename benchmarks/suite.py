@@ -0,0 +1,176 @@
+"""
+    Runs a synthetic CSV file through CsvLoader.load_data in several modes and saves results as JSON.
+
+    Every run is done in a new process, so peak RSS belongs to that run only. Client CPU includes all threads
+    of the process (decompression, parallel workers). Results of two commits can be compared with --compare.
+
+    Usage:
+        python benchmarks/suite.py --size 200MB --columns 20 --output before.json
+        python benchmarks/suite.py --size 200MB --columns 20 --output after.json --compare before.json
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from generate import DEFAULT_TYPES, TYPES, generate_csv, parse_size  # noqa: E402
+from postgresql_csv_loader import CsvLoader  # noqa: E402
+
+# load_data arguments of each mode
+MODES = {
+    "csv": {},
+    "passthrough": {"passthrough": True},
+    "binary": {"copy_format": "binary", "infer_types": True},
+    "infer_types": {"infer_types": True, "passthrough": True},
+    "parallel": {"workers": 4},
+    "fast_load": {"fast_load": True, "passthrough": True},
+    # loads the first tenth of the columns, selected in main() from the generated header
+    "projection": {},
+}
+PROJECTED_FRACTION = 0.1
+DEFAULT_MODES = ("csv", "passthrough", "binary", "parallel", "fast_load")
+
+
+def run(connection_args, file_path, options):
+    """
+    Loads file once in the current process and drops the table.
+
+    :param connection_args: CsvLoader constructor arguments
+    :param file_path: path to a CSV file
+    :param options: load_data arguments
+    :return: dictionary of measurements
+    """
+    with CsvLoader(*connection_args) as loader:
+        started, cpu_started = time.perf_counter(), time.process_time()
+        result = loader.load_data(file_path, analyze=False, **options)
+        elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+
+        with loader._acquire_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("DROP TABLE {};".format(result.table_name))
+            connection.commit()
+            cursor.close()
+    # kilobytes on Linux, bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return {"rows": result.rows, "bytes": result.bytes_read, "seconds": elapsed, "client_cpu": cpu,
+            "peak_rss_mb": peak_rss / (1024 * 1024), "phases": result.phases}
+
+
+def run_isolated(connection_args, file_path, options):
+    """
+    Runs a load in a new process.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run, connection_args, file_path, options).result()
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """
+    Prints change of throughput and resources against results saved by an earlier run.
+
+    :param results: list of result dictionaries
+    :param baseline: dictionary loaded from JSON file
+    """
+    previous = {result["mode"]: result for result in baseline["results"]}
+    print("\nCompared with {} ({}):".format(baseline.get("commit"), baseline.get("timestamp")))
+    print("{:<12} {:>12} {:>12} {:>12}".format("mode", "rows/s", "client CPU", "peak RSS"))
+    for result in results:
+        before = previous.get(result["mode"])
+        if before is None:
+            continue
+        print("{:<12} {:>+11.1f}% {:>+11.1f}% {:>+11.1f}%".format(
+            result["mode"], _change(before["rows_per_second"], result["rows_per_second"]),
+            _change(before["client_cpu"], result["client_cpu"]), _change(before["peak_rss_mb"], result["peak_rss_mb"])))
+
+
+def _change(before, after):
+    return (after - before) / before * 100 if before else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", default=5440)
+    parser.add_argument("--dbname", default="tests")
+    parser.add_argument("--user", default="tests")
+    parser.add_argument("--password")
+    parser.add_argument("--size", type=parse_size, default=parse_size("50MB"))
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--types", default=",".join(DEFAULT_TYPES), help="comma separated: " + ", ".join(TYPES))
+    parser.add_argument("--quote-ratio", type=float, default=0.1)
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--modes", default=",".join(DEFAULT_MODES), help="comma separated: " + ", ".join(MODES))
+    parser.add_argument("--repeat", type=int, default=3, help="the fastest run of each mode is reported")
+    parser.add_argument("--output", help="JSON file for results")
+    parser.add_argument("--compare", help="JSON file saved by an earlier run")
+    args = parser.parse_args()
+
+    modes = args.modes.split(",")
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error("unknown modes: {}".format(", ".join(unknown)))
+    connection_args = (args.host, args.port, args.dbname, args.user, args.password)
+    dataset = {"size": args.size, "columns": args.columns, "types": args.types.split(","),
+               "quote_ratio": args.quote_ratio, "encoding": args.encoding, "seed": args.seed}
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "benchmark.csv")
+        dataset["rows"] = generate_csv(file_path, args.size, None, args.columns, dataset["types"], args.quote_ratio,
+                                       args.encoding, args.seed)
+        dataset["bytes"] = os.path.getsize(file_path)
+        print("{rows} rows x {columns} columns, {0:.1f} MB, {encoding}, quote ratio {quote_ratio}".format(
+            dataset["bytes"] / (1024 * 1024), **dataset))
+        print("{:<12} {:>10} {:>12} {:>10} {:>12} {:>14}".format("mode", "wall [s]", "rows/s", "MB/s",
+                                                                  "client CPU [s]", "peak RSS [MB]"))
+
+        results = []
+        for mode in modes:
+            options = dict(MODES[mode], encoding=args.encoding)
+            if mode == "projection":
+                with open(file_path, encoding=args.encoding, newline="") as csv_file:
+                    header = next(csv.reader(csv_file))
+                options["columns"] = header[:max(1, int(len(header) * PROJECTED_FRACTION))]
+            runs = [run_isolated(connection_args, file_path, options) for _ in range(args.repeat)]
+            best = min(runs, key=lambda measurement: measurement["seconds"])
+            best.update(mode=mode, options=options, rows_per_second=best["rows"] / best["seconds"],
+                        megabytes_per_second=dataset["bytes"] / (1024 * 1024) / best["seconds"],
+                        all_seconds=[measurement["seconds"] for measurement in runs])
+            results.append(best)
+            print("{:<12} {:>10.2f} {:>12.0f} {:>10.1f} {:>12.2f} {:>14.1f}".format(
+                mode, best["seconds"], best["rows_per_second"], best["megabytes_per_second"], best["client_cpu"],
+                best["peak_rss_mb"]))
+
+    report = {"commit": git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "python": platform.python_version(), "platform": platform.platform(), "dataset": dataset,
+              "results": results}
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(results, json.load(baseline))
+
+
+if __name__ == "__main__":
+    main()
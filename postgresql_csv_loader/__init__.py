@@ -5,4 +5,10 @@
     It works only with PostgreSQL for now.
 """
 
-from .csv_loader import CsvLoader
+from .async_loader import AsyncCsvLoader
+from .batch import BatchResult, FileOutcome
+from .connection_pool import ConnectionPool
+from .csv_loader import CsvLoader, MergeCounts, PreparedTransactionError
+from .manifest import Manifest
+from .progress import LoadResult, Progress
+from .quarantine import RejectLimitError
@@ -0,0 +1,269 @@
+"""
+    asyncio counterpart of CsvLoader, based on psycopg 3 (pip3 install psycopg).
+
+    Connecting, creating tables and COPY run on the event loop. Blocking file reads and decompression run in
+    the default executor, one block ahead of the block being sent, so reading overlaps with sending.
+"""
+
+import asyncio
+import io
+import logging
+
+from .base_loader import (DEFAULT_BLOCK_SIZE, DEFAULT_CONCURRENCY, DEFAULT_DELIMITER, DEFAULT_ESCAPE_CHAR,
+                          DEFAULT_QUOTE_CHAR, DEFAULT_SAMPLE_SIZE, DEFAULT_TABLE_PREFIX, BaseCsvLoader)
+from .batch import find_files
+from .compression import DecompressingReader, compression_of
+from .progress import LoadMonitor, ProgressReader
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+
+class AsyncCsvLoader(BaseCsvLoader):
+    """
+    Loads CSV files to PostgreSQL from asyncio code, many files at once.
+
+    Every load uses its own connection. Column and table names are generated the same way as by CsvLoader.
+    """
+
+    def __init__(self, database_host=None, database_port=None, database_name=None, user=None, password=None,
+                 table_prefix=DEFAULT_TABLE_PREFIX, concurrency=DEFAULT_CONCURRENCY):
+        """
+        Constructs loader with given database details. No connection is opened until a file is loaded.
+
+        :param database_host: database host address
+        :param database_port: connection port number
+        :param database_name: the database name
+        :param user: user name used to authenticate
+        :param password: password used to authenticate
+        :param table_prefix: prefix for database tables that will be created by loader
+        :param concurrency: maximum number of files loaded at once by load_many
+        """
+        if psycopg is None:
+            raise ImportError("AsyncCsvLoader requires psycopg 3: pip3 install psycopg")
+        super(AsyncCsvLoader, self).__init__(database_host, database_port, database_name, user, password,
+                                             table_prefix)
+        self._concurrency = concurrency
+
+    async def load_many(self, file_paths, concurrency=None, return_exceptions=False, **load_kwargs):
+        """
+        Loads files concurrently, at most concurrency at once.
+
+        :param file_paths: list of paths to CSV files
+        :param concurrency: maximum number of files loaded at once, loader's concurrency if None
+        :param return_exceptions: if True, an exception raised by a load is returned in place of its result and
+        other loads continue, otherwise the first exception is raised when all started loads have finished
+        :param load_kwargs: load_data arguments used for every file, e.g. encoding
+        :return: list of LoadResult in the order of file_paths
+        """
+        semaphore = asyncio.Semaphore(concurrency or self._concurrency)
+
+        async def load(file_path):
+            async with semaphore:
+                return await self.load_data(file_path, **load_kwargs)
+
+        results = await asyncio.gather(*[load(file_path) for file_path in file_paths], return_exceptions=True)
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+        return results
+
+    async def load_directory(self, directory, pattern="*.csv", recursive=False, concurrency=None,
+                             return_exceptions=False, **load_kwargs):
+        """
+        Loads files of a directory matching a glob pattern, see load_many.
+
+        :param directory: path to a directory
+        :param pattern: glob pattern of file names, e.g. '*.csv.gz'
+        :param recursive: if True, files in subdirectories are loaded too
+        :param concurrency: maximum number of files loaded at once, loader's concurrency if None
+        :param return_exceptions: if True, an exception raised by a load is returned in place of its result
+        :param load_kwargs: load_data arguments used for every file
+        :return: list of LoadResult in the order of found files
+        """
+        return await self.load_many(find_files([directory], pattern, recursive), concurrency, return_exceptions,
+                                    **load_kwargs)
+
+    async def load_data(self, file_path, delimiter=DEFAULT_DELIMITER, quote_char=DEFAULT_QUOTE_CHAR,
+                        escape_char=DEFAULT_ESCAPE_CHAR, create_table=True, encoding="utf-8", column_types=None,
+                        infer_types=False, sample_size=DEFAULT_SAMPLE_SIZE, passthrough=False,
+                        block_size=DEFAULT_BLOCK_SIZE, table_name=None, analyze=True, progress_callback=None,
+                        progress_interval=LoadMonitor.DEFAULT_INTERVAL):
+        """
+        Loads data from CSV file to the database.
+
+        Arguments have the same meaning as in CsvLoader.load_data.
+
+        :param file_path: path to a CSV file, optionally compressed (.gz, .bz2, .xz or .zst)
+        :param delimiter: a one-character string used to separate fields. It defaults to ','
+        :param quote_char: a one-character string used to quote fields containing special characters,
+        such as the delimiter or quotechar, or which contain new-line characters
+        :param escape_char: a one-character string used by the writer to escape the delimiter
+        :param create_table: if True, table will be created
+        :param encoding: file encoding
+        :param column_types: dictionary of column types by simplified column name, used when table is created
+        :param infer_types: if True, types of columns not listed in column_types are detected from data.
+        If a value does not fit a detected type, the column is changed to varchar and the load is repeated
+        :param sample_size: number of bytes read to detect types, None to read the whole file
+        :param passthrough: if True, the file is sent as raw bytes and the server converts it from the file encoding
+        :param block_size: number of bytes read from the file and sent to the server at once
+        :param table_name: a table name, generated from file name if None
+        :param analyze: if True, table statistics are collected after the load
+        :param progress_callback: function called with Progress while the file is read, at most once per
+        progress_interval seconds, and once when the load is finished. It is called from executor threads
+        :param progress_interval: minimum number of seconds between progress callbacks
+        :return: LoadResult with bytes read, rows copied and seconds spent in each phase
+        """
+        loop = asyncio.get_running_loop()
+        escape_char = None if (escape_char == quote_char) else escape_char
+
+        monitor = LoadMonitor(table_name, file_path, progress_callback, progress_interval)
+        with monitor.phase("header"):
+            original_headers = await loop.run_in_executor(None, self._read_headers, file_path, delimiter,
+                                                          quote_char, escape_char, encoding)
+            headers = self._normalize_headers(original_headers)
+        table_name = monitor.table_name = table_name or self._generate_table_name(file_path)
+
+        column_types = dict(column_types or {})
+        inferred_columns = set()
+        if create_table and infer_types:
+            logging.getLogger('AsyncCsvLoader').info('Detecting column types of "{}"...'.format(file_path))
+            with monitor.phase("infer"):
+                schema = await loop.run_in_executor(None, self._infer_schema, file_path, headers, delimiter,
+                                                    quote_char, escape_char, encoding, sample_size)
+            inferred_columns = {column for column, data_type in schema
+                                if column not in column_types and data_type != self.DEFAULT_DATA_TYPE}
+            column_types = dict(schema, **column_types)
+
+        with monitor.phase("connect"):
+            connection = await self._connect()
+        async with connection:
+            if create_table:
+                logging.getLogger('AsyncCsvLoader').info('Creating table "{}"...'.format(table_name))
+                with monitor.phase("create"):
+                    await self._execute(connection, self._create_table_statement(headers, table_name, column_types))
+
+            logging.getLogger('AsyncCsvLoader').info('Loading data to table "{}"...'.format(table_name))
+            while True:
+                try:
+                    with monitor.phase("copy"):
+                        rows = await self._copy_from_csv_async(connection, file_path, table_name, headers,
+                                                               delimiter, quote_char, escape_char, encoding,
+                                                               passthrough, block_size, monitor)
+                    with monitor.phase("commit"):
+                        await connection.commit()
+                    monitor.add_rows(rows)
+                    break
+                except psycopg.DataError as error:
+                    await connection.rollback()
+                    if not await self._widen_column_async(connection, error, table_name, inferred_columns):
+                        raise
+
+            if analyze:
+                logging.getLogger('AsyncCsvLoader').info('Analyzing table "{}"...'.format(table_name))
+                with monitor.phase("analyze"):
+                    await self._execute(connection, self.ANALYZE_STMT.format(table_name))
+
+        result = monitor.finish()
+        logging.getLogger('AsyncCsvLoader').info(
+            'Finished loading to table "{}": {} rows, {:.1f} MB in {:.3f}s.'.format(
+                table_name, result.rows, result.bytes_read / (1024 * 1024), result.elapsed))
+        return result
+
+    async def _connect(self):
+        """
+        Opens a new connection.
+
+        :return: psycopg.AsyncConnection
+        """
+        return await psycopg.AsyncConnection.connect(host=self._database_host, port=self._database_port,
+                                                     dbname=self._database_name, user=self._user,
+                                                     password=self._password)
+
+    async def _execute(self, connection, statement):
+        """
+        Executes statement and commits.
+
+        :param connection: open connection
+        :param statement: SQL statement
+        """
+        async with connection.cursor() as cursor:
+            await cursor.execute(statement)
+        await connection.commit()
+
+    async def _widen_column_async(self, connection, error, table_name, columns):
+        """
+        Changes type of the column reported by failed COPY to varchar.
+
+        :param connection: open connection, not in a transaction
+        :param error: DataError raised by COPY
+        :param table_name: a table name
+        :param columns: columns which may be changed, the changed column is removed
+        :return: True if column was changed and COPY can be repeated
+        """
+        column = self._failed_column(error)
+        if column not in columns:
+            return False
+        columns.discard(column)
+        logging.getLogger('AsyncCsvLoader').warning('Value does not fit detected type of column "{}", '
+                                                    'changing it to {}: {}'.format(column, self.DEFAULT_DATA_TYPE,
+                                                                                  str(error).strip()))
+        await self._execute(connection, self.ALTER_TYPE_STMT.format(table_name, column, self.DEFAULT_DATA_TYPE))
+        return True
+
+    async def _copy_from_csv_async(self, connection, file_path, table_name, headers, delimiter, quote_char,
+                                   escape_char, encoding, passthrough=False, block_size=DEFAULT_BLOCK_SIZE,
+                                   monitor=None):
+        """
+        Copies data from CSV to database without committing.
+
+        The next block is read in an executor while the current one is sent.
+
+        :param connection: open connection
+        :param file_path: path to a CSV file
+        :param table_name: a table name
+        :param headers: a list of columns
+        :param delimiter: a one-character string used to separate fields
+        :param quote_char: a one-character string used to quote fields
+        :param escape_char: a one-character string used by the writer to escape the delimiter
+        :param encoding: file encoding
+        :param passthrough: if True, file is sent as raw bytes with COPY ENCODING option
+        :param block_size: number of bytes read from the file at once
+        :param monitor: LoadMonitor counting data read from the file
+        :return: number of copied rows
+        """
+        loop = asyncio.get_running_loop()
+        command = self._copy_command(table_name, headers, delimiter, quote_char, escape_char,
+                                     encoding=encoding if passthrough else None)
+        monitor = monitor or LoadMonitor(table_name, file_path)
+
+        def open_file():
+            if compression_of(file_path):
+                raw_file = ProgressReader(DecompressingReader(file_path, block_size=block_size), monitor)
+            else:
+                raw_file = ProgressReader(open(file_path, "rb", buffering=0), monitor)
+            if passthrough:
+                return raw_file
+            return io.TextIOWrapper(io.BufferedReader(raw_file, block_size), encoding=encoding)
+
+        csv_file = await loop.run_in_executor(None, open_file)
+        try:
+            async with connection.cursor() as cursor:
+                async with cursor.copy(command) as copy:
+                    next_block = loop.run_in_executor(None, csv_file.read, block_size)
+                    try:
+                        while True:
+                            block = await next_block
+                            if not block:
+                                break
+                            next_block = loop.run_in_executor(None, csv_file.read, block_size)
+                            await copy.write(block)
+                    finally:
+                        # the file is not closed while a block is being read from it
+                        await asyncio.wait([next_block])
+                return cursor.rowcount
+        finally:
+            await loop.run_in_executor(None, csv_file.close)
@@ -0,0 +1,279 @@
+"""
+    Reading CSV headers and naming tables and columns, shared by CsvLoader and AsyncCsvLoader.
+
+    Nothing here needs a database connection: both loaders build the same statements from the same file
+    and connect in their own way.
+"""
+
+import codecs
+import csv
+import io
+import itertools
+import os
+import re
+
+from .binary_copy import BinaryEncodingError
+from .chunking import FileRange, find_record_boundaries
+from .compression import DecompressingReader, compression_of, strip_compression_extension
+from .type_inference import infer_column_types
+
+
+DEFAULT_DELIMITER = ','
+DEFAULT_QUOTE_CHAR = '"'
+DEFAULT_ESCAPE_CHAR = None
+DEFAULT_TABLE_PREFIX = "csv_"
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+DEFAULT_SAMPLE_SIZE = 64 * 1024 * 1024
+DEFAULT_CONCURRENCY = 4
+
+
+class BaseCsvLoader(object):
+    """
+    Column and table names, CSV headers, type detection and statements common to loaders of CSV files.
+    """
+
+    DEFAULT_DELIMITER = DEFAULT_DELIMITER
+    DEFAULT_QUOTE_CHAR = DEFAULT_QUOTE_CHAR
+    DEFAULT_ESCAPE_CHAR = DEFAULT_ESCAPE_CHAR
+    DEFAULT_TABLE_PREFIX = DEFAULT_TABLE_PREFIX
+    DEFAULT_DOUBLE_QUOTE = True
+    DEFAULT_DATA_TYPE = "varchar"
+    DEFAULT_BLOCK_SIZE = DEFAULT_BLOCK_SIZE
+    DEFAULT_SAMPLE_SIZE = DEFAULT_SAMPLE_SIZE
+    DEFAULT_CONCURRENCY = DEFAULT_CONCURRENCY
+    HEADER_SCAN_BLOCK_SIZE = 64 * 1024
+
+    CREATE_STMT = "CREATE {}TABLE {} ({});"
+    ALTER_TYPE_STMT = "ALTER TABLE {} ALTER COLUMN \"{}\" TYPE {};"
+    ANALYZE_STMT = "ANALYZE {};"
+    COPY_STMT = "COPY {} ({}) FROM stdin WITH ({})"
+
+    # Python codec names which are not recognised by PostgreSQL as encoding aliases
+    PG_ENCODINGS = {"cp866": "WIN866", "cp874": "WIN874", "cp1250": "WIN1250", "cp1251": "WIN1251",
+                    "cp1252": "WIN1252", "cp1253": "WIN1253", "cp1254": "WIN1254", "cp1255": "WIN1255",
+                    "cp1256": "WIN1256", "cp1257": "WIN1257", "cp1258": "WIN1258", "koi8-r": "KOI8R",
+                    "koi8-u": "KOI8U", "big5": "BIG5", "gbk": "GBK", "gb18030": "GB18030",
+                    "shift_jis": "SJIS", "euc_jp": "EUC_JP", "euc_kr": "EUC_KR", "utf-8-sig": "UTF8"}
+
+    def __init__(self, database_host=None, database_port=None, database_name=None, user=None, password=None,
+                 table_prefix=DEFAULT_TABLE_PREFIX):
+        """
+        Constructs loader with given database details.
+
+        :param database_host: database host address
+        :param database_port: connection port number
+        :param database_name: the database name
+        :param user: user name used to authenticate
+        :param password: password used to authenticate
+        :param table_prefix: prefix for database tables that will be created by loader
+        """
+        self._database_host = database_host
+        self._database_port = database_port
+        self._database_name = database_name
+        self._user = user
+        self._password = password
+        self._table_prefix = table_prefix
+
+    def infer_schema(self, file_path, delimiter=DEFAULT_DELIMITER, quote_char=DEFAULT_QUOTE_CHAR,
+                     escape_char=DEFAULT_ESCAPE_CHAR, encoding="utf-8", sample_size=DEFAULT_SAMPLE_SIZE):
+        """
+        Detects column types from CSV data, without connecting to the database.
+
+        Result can be modified and passed to load_data as column_types.
+
+        :param file_path: path to a CSV file
+        :param delimiter: a one-character string used to separate fields. It defaults to ','
+        :param quote_char: a one-character string used to quote fields containing special characters,
+        such as the delimiter or quotechar, or which contain new-line characters
+        :param escape_char: a one-character string used by the writer to escape the delimiter
+        :param encoding file encoding
+        :param sample_size: number of bytes read to detect types, None to read the whole file
+        :return: list of (simplified column name, PostgreSQL type) tuples
+        """
+        escape_char = None if (escape_char == quote_char) else escape_char
+        headers = self._normalize_headers(self._read_headers(file_path, delimiter, quote_char, escape_char,
+                                                             encoding))
+        return self._infer_schema(file_path, headers, delimiter, quote_char, escape_char, encoding, sample_size)
+
+    def _infer_schema(self, file_path, headers, delimiter, quote_char, escape_char, encoding, sample_size):
+        """
+        Detects column types from the beginning of CSV file.
+
+        :param file_path: path to a CSV file
+        :param headers: a list of columns
+        :param delimiter: a one-character string used to separate fields
+        :param quote_char: a one-character string used to quote fields
+        :param escape_char: a one-character string used by the writer to escape the delimiter
+        :param encoding: file encoding
+        :param sample_size: number of bytes read, None to read the whole file
+        :return: list of (column, type) tuples
+        """
+        if compression_of(file_path):
+            source = DecompressingReader(file_path)
+        else:
+            end = os.path.getsize(file_path)
+            if sample_size is not None and sample_size < end:
+                end = find_record_boundaries(file_path, [sample_size], quote_char, escape_char, encoding)[0]
+            source = FileRange(file_path, 0, end)
+
+        with io.TextIOWrapper(io.BufferedReader(source, self.DEFAULT_BLOCK_SIZE), encoding=encoding,
+                              newline='') as csv_file:
+            reader = csv.reader(csv_file, delimiter=delimiter, quotechar=quote_char, escapechar=escape_char)
+            next(reader, None)
+            if isinstance(source, DecompressingReader) and sample_size is not None:
+                # stop after the record which crosses the sample size
+                reader = itertools.takewhile(lambda row: source.uncompressed_bytes <= sample_size, reader)
+            types = infer_column_types(reader, len(headers))
+        return list(zip(headers, types))
+
+    @staticmethod
+    def _failed_column(error):
+        """
+        Finds the column whose value could not be loaded.
+
+        :param error: DataError raised by COPY or BinaryEncodingError
+        :return: column name or None if it is not known
+        """
+        if isinstance(error, BinaryEncodingError):
+            return error.column
+        match = re.search(r", column ([^:]+):", error.diag.context or "")
+        return match.group(1) if match else None
+
+    def _create_table_statement(self, headers, table_name, column_types=None, unlogged=False):
+        """
+        Builds CREATE TABLE statement.
+
+        :param headers: a list of columns
+        :param table_name: a table name
+        :param column_types: dictionary of column types, missing columns are created as varchar
+        :param unlogged: if True, table is created as UNLOGGED
+        :return: CREATE TABLE statement
+        """
+        column_types = column_types or {}
+        columns = ['"{}" {}'.format(column, column_types.get(column, self.DEFAULT_DATA_TYPE)) for column in headers]
+        return self.CREATE_STMT.format("UNLOGGED " if unlogged else "", table_name, ",".join(columns))
+
+    def _copy_command(self, table_name, headers, delimiter=DEFAULT_DELIMITER, quote_char=DEFAULT_QUOTE_CHAR,
+                      escape_char=DEFAULT_ESCAPE_CHAR, copy_format="csv", header=True, encoding=None, freeze=False,
+                      on_error=None):
+        """
+        Builds COPY command.
+
+        :param table_name: a table name
+        :param headers: a list of columns
+        :param delimiter: a one-character string used to separate fields
+        :param quote_char: a one-character string used to quote fields
+        :param escape_char: a one-character string used by the writer to escape the delimiter
+        :param copy_format: 'csv' or 'binary'
+        :param header: if True, the first CSV record is skipped
+        :param encoding: Python name of the encoding of sent bytes, None if the data is sent as text
+        :param freeze: if True, rows are copied with FREEZE option
+        :param on_error: 'ignore' to skip rows with values of wrong type and report each of them in a notice
+        (PostgreSQL 17+), None to fail
+        :return: COPY command
+        """
+        columns_def = ",".join(['"{}"'.format(column) for column in headers])
+        options = ["FORMAT {}".format(copy_format)]
+        if copy_format == "csv":
+            if header:
+                options.append("HEADER")
+            copy_from_escape_char = escape_char or quote_char  # use quote if escape is None
+            options += ["DELIMITER '{}'".format(delimiter), "QUOTE '{}'".format(quote_char),
+                        "ESCAPE '{}'".format(copy_from_escape_char)]
+            if encoding:
+                options.append("ENCODING '{}'".format(self._pg_encoding(encoding)))
+        if freeze:
+            options.append("FREEZE")
+        if on_error:
+            options += ["ON_ERROR {}".format(on_error), "LOG_VERBOSITY verbose"]
+        # https://www.postgresql.org/docs/current/static/sql-copy.html
+        return self.COPY_STMT.format(table_name, columns_def, ", ".join(options))
+
+    def _read_headers(self, file_path, delimiter=DEFAULT_DELIMITER, quote_char=DEFAULT_QUOTE_CHAR,
+                      escape_char=DEFAULT_ESCAPE_CHAR, encoding="utf-8"):
+        """
+        Reads CSV header and provides a list of columns.
+
+        :param file_path: path to a CSV file
+        :param delimiter: a one-character string used to separate fields. It defaults to ','
+        :param quote_char: a one-character string used to quote fields containing special characters,
+        such as the delimiter or quotechar, or which contain new-line characters
+        :param escape_char: a one-character string used by the writer to escape the delimiter
+        :param encoding file encoding
+        :return: list of CSV columns
+        """
+        if compression_of(file_path):
+            with io.TextIOWrapper(io.BufferedReader(DecompressingReader(file_path, queue_size=1)),
+                                  encoding=encoding, newline='') as csv_file:
+                reader = csv.reader(csv_file, delimiter=delimiter, quotechar=quote_char, escapechar=escape_char)
+                return next(reader)
+
+        try:
+            header_end = find_record_boundaries(file_path, [0], quote_char, escape_char, encoding,
+                                                self.HEADER_SCAN_BLOCK_SIZE)[0]
+        except ValueError:
+            # quote character is not a single byte, e.g. UTF-16
+            with open(file_path, "r", encoding=encoding) as csv_file:
+                reader = csv.reader(csv_file, delimiter=delimiter, quotechar=quote_char, escapechar=escape_char)
+                return next(reader)
+
+        # decode only the header record
+        with open(file_path, "rb") as csv_file:
+            header = csv_file.read(header_end).decode(encoding)
+        reader = csv.reader(io.StringIO(header, newline=''), delimiter=delimiter, quotechar=quote_char,
+                            escapechar=escape_char)
+        original_headers = next(reader)
+        return original_headers
+
+    def _normalize_headers(self, original_headers):
+        """
+        Simplifies column names:
+        - all uppercase letters are replaced with underscore and lowercase letters.
+        - special characters are replaced with underscore.
+
+        :param original_headers: list of CSV columns
+        :return: simplified headers
+        """
+        headers = [self._simplify_text(header) for header in original_headers]
+        return headers
+
+    def _generate_table_name(self, file_path):
+        """
+        Generates table name based on CSV file name.
+
+        :param file_path: path to a CSV file
+        :return: generated table name
+        """
+        base = os.path.splitext(os.path.basename(strip_compression_extension(file_path)))[0]
+        return self._table_prefix + self._simplify_text(base)
+
+    def _pg_encoding(self, encoding):
+        """
+        Translates Python codec name to PostgreSQL encoding name.
+
+        :param encoding: Python codec name, e.g. 'iso-8859-2'
+        :return: encoding name accepted by COPY ENCODING option
+        """
+        name = codecs.lookup(encoding).name
+        return self.PG_ENCODINGS.get(name, name)
+
+    @staticmethod
+    def _simplify_text(text):
+        """
+        Simplifies text:
+        - all uppercase letters are replaced with underscore and lowercase letters.
+        - special characters are replaced with underscore.
+
+        :param text: text to simplify
+        :return: simplified text
+        """
+        # replace <letter in uppercase> with <letter in lowercase prefixed by underscore>)
+        # e.g. SimpleText -> _simple_text
+        unified = re.sub('([A-Z]{1})', r'_\1', text).lower()
+        # replace all special characters with underscore
+        unified = re.sub('[^0-9a-zA-Z]+', '_', unified)
+
+        # remove underscore at the beginning
+        if unified.startswith("_"):
+            unified = unified[1:]
+        return unified
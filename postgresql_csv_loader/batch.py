@@ -0,0 +1,110 @@
+"""
+    Loading many files at once.
+
+    Files are found by glob patterns and scheduled largest first, so the longest loads start early and small
+    files fill the gaps at the end. A failure of one file is recorded and does not stop the others.
+"""
+
+import glob
+import os
+from collections import namedtuple
+
+
+FileOutcome = namedtuple("FileOutcome", ["file_path", "size", "result", "error"])
+
+
+class BatchResult(object):
+    """
+    Summary of a batch of loads returned by CsvLoader.load_many.
+    """
+
+    def __init__(self, outcomes, elapsed):
+        """
+        Constructs result.
+
+        :param outcomes: list of FileOutcome, each with LoadResult or the exception raised by the load
+        :param elapsed: total time in seconds
+        """
+        self.outcomes = outcomes
+        self.elapsed = elapsed
+
+    @property
+    def results(self):
+        """
+        LoadResults of loaded files.
+        """
+        return [outcome.result for outcome in self.outcomes if outcome.error is None]
+
+    @property
+    def failed(self):
+        """
+        FileOutcomes of files which could not be loaded.
+        """
+        return [outcome for outcome in self.outcomes if outcome.error is not None]
+
+    @property
+    def rows(self):
+        return sum(result.rows for result in self.results)
+
+    @property
+    def bytes_read(self):
+        return sum(result.bytes_read for result in self.results)
+
+    @property
+    def megabytes_per_second(self):
+        """
+        Aggregate throughput of the batch, bytes read from all files by wall-clock time.
+        """
+        return self.bytes_read / (1024 * 1024) / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return "BatchResult(files={}, failed={}, rows={}, bytes_read={}, elapsed={:.3f})".format(
+            len(self.outcomes), len(self.failed), self.rows, self.bytes_read, self.elapsed)
+
+
+def find_files(paths, pattern="*.csv", recursive=False):
+    """
+    Finds files to load.
+
+    :param paths: list of file paths, directories searched with pattern, or glob patterns, e.g. 'data/2018-*.csv'
+    :param pattern: glob pattern of file names in directories
+    :param recursive: if True, subdirectories of directories are searched too
+    :return: list of file paths, without duplicates, in the order they were found
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            matches = sorted(glob.glob(os.path.join(path, "**", pattern) if recursive
+                                       else os.path.join(path, pattern), recursive=recursive))
+        elif glob.has_magic(path):
+            matches = sorted(glob.glob(path, recursive=True))
+        else:
+            matches = [path]
+        found += [match for match in matches if not os.path.isdir(match)]
+    return list(dict.fromkeys(found))
+
+
+def largest_first(file_paths):
+    """
+    Orders files by size, largest first.
+
+    :param file_paths: list of file paths
+    :return: list of (file path, size in bytes) tuples, size None if the file cannot be read
+    """
+    sizes = [(file_path, os.path.getsize(file_path) if os.path.isfile(file_path) else None)
+             for file_path in file_paths]
+    return sorted(sizes, key=lambda item: -(item[1] or 0))
+
+
+# loader of a worker process, created once per process by _init_process
+_process_loader = None
+
+
+def _init_process(loader_args):
+    global _process_loader
+    from .csv_loader import CsvLoader
+    _process_loader = CsvLoader(*loader_args)
+
+
+def _load_in_process(file_path, load_kwargs):
+    return _process_loader.load_data(file_path, **load_kwargs)
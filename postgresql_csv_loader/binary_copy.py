@@ -0,0 +1,308 @@
+"""
+    Encoding CSV rows into PostgreSQL binary COPY format.
+
+    https://www.postgresql.org/docs/current/static/sql-copy.html#id-1.9.3.55.9.4
+"""
+
+import functools
+import re
+import struct
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .type_inference import TypeInferrer
+
+
+SIGNATURE = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+TRAILER = struct.pack("!h", -1)
+NULL = struct.pack("!i", -1)
+
+POSTGRES_EPOCH_DAYS = date(2000, 1, 1).toordinal()
+POSTGRES_EPOCH = datetime(2000, 1, 1)
+POSTGRES_EPOCH_UTC = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+_INT2 = struct.Struct("!ih").pack
+_INT4 = struct.Struct("!ii").pack
+_INT8 = struct.Struct("!iq").pack
+_FLOAT4 = struct.Struct("!if").pack
+_FLOAT8 = struct.Struct("!id").pack
+_BOOL = struct.Struct("!i?").pack
+_LENGTH = struct.Struct("!i").pack
+_FIELD_COUNT = struct.Struct("!h").pack
+
+NUMERIC_POS = 0x0000
+NUMERIC_NEG = 0x4000
+NUMERIC_NAN = 0xC000
+
+_NUMERIC_PACKERS = {0: struct.Struct("!ihhHh").pack}
+_PLAIN_NUMBER = re.compile(r"([+-]?)(\d*)(?:\.(\d*))?").fullmatch
+
+# numbers are accepted in the format of type detection, not in every format int() and float() parse,
+# e.g. '1_000' or ' 5 ', so the binary format loads the same values as the server parsing CSV
+_PATTERNS = dict(TypeInferrer.PATTERNS)
+_INTEGER = re.compile(_PATTERNS["integer"]).fullmatch
+_BIGINT = re.compile(_PATTERNS["bigint"]).fullmatch
+_NUMERIC = re.compile(_PATTERNS["numeric"]).fullmatch
+_FLOAT = re.compile(r"{}|[+-]?(?i:inf|infinity)|(?i:nan)".format(_PATTERNS["numeric"])).fullmatch
+
+BOOLEAN_VALUES = {"true": True, "t": True, "yes": True, "y": True, "on": True, "1": True,
+                  "false": False, "f": False, "no": False, "n": False, "off": False, "0": False}
+
+
+def session_time_zone(name):
+    """
+    Provides time zone of the TimeZone setting of a session, used by the server for timestamps without offset.
+
+    :param name: value of TimeZone, e.g. 'Europe/Warsaw'
+    :return: tzinfo
+    :raise ValueError: if the time zone is not known to Python
+    """
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError('Binary COPY cannot read timestamptz values without offset in time zone "{}", '
+                         'use csv format or set TimeZone to a named zone'.format(name))
+
+
+class BinaryEncodingError(ValueError):
+    """
+    Value which cannot be encoded as its column type.
+    """
+
+    def __init__(self, record_number, column, data_type, value):
+        super(BinaryEncodingError, self).__init__('Record {}, column "{}": invalid {} value {!r}'.format(
+            record_number, column, data_type, value))
+        self.record_number = record_number
+        self.column = column
+        self.data_type = data_type
+        self.value = value
+
+
+def _encode_text(value):
+    data = value.encode("utf-8")
+    return _LENGTH(len(data)) + data
+
+
+def _encode_bool(value):
+    return _BOOL(1, BOOLEAN_VALUES[value.lower()])
+
+
+def _encode_numeric(value):
+    match = _PLAIN_NUMBER(value)
+    if match is None:
+        if _NUMERIC(value) is None and value.lower() != "nan":
+            raise ValueError("invalid numeric")
+        return _encode_decimal(Decimal(value))
+    sign, integer, fraction = match.groups()
+    fraction = fraction or ""
+    if not (integer or fraction):
+        raise ValueError("invalid numeric")
+
+    # base 10000 digits: pad the integer part on the left and the fraction on the right
+    integer = integer.lstrip("0")
+    integer = "0" * (-len(integer) % 4) + integer
+    digits = integer + fraction + "0" * (-len(fraction) % 4)
+    return _pack_numeric([int(digits[i:i + 4]) for i in range(0, len(digits), 4)], len(integer) // 4 - 1,
+                         sign == "-", len(fraction))
+
+
+def _encode_decimal(number):
+    if number.is_nan():
+        return struct.pack("!ihhHh", 8, 0, 0, NUMERIC_NAN, 0)
+    if number.is_infinite():
+        raise ValueError("infinite numeric")
+    sign, digits, exponent = number.as_tuple()
+    text = "".join(map(str, digits))
+    if exponent >= 0:
+        integer, fraction = text + "0" * exponent, ""
+    else:
+        text = "0" * max(-exponent - len(text), 0) + text
+        integer, fraction = text[:exponent], text[exponent:]
+    integer = integer.lstrip("0")
+    integer = "0" * (-len(integer) % 4) + integer
+    digits = integer + fraction + "0" * (-len(fraction) % 4)
+    return _pack_numeric([int(digits[i:i + 4]) for i in range(0, len(digits), 4)], len(integer) // 4 - 1,
+                         bool(sign), len(fraction))
+
+
+def _pack_numeric(groups, weight, negative, scale):
+    while groups and groups[-1] == 0:
+        groups.pop()
+    leading = 0
+    while leading < len(groups) and groups[leading] == 0:
+        leading += 1
+    if leading:
+        groups = groups[leading:]
+        weight -= leading
+    count = len(groups)
+    if not count:
+        return _NUMERIC_PACKERS[0](8, 0, 0, NUMERIC_POS, scale)
+    packer = _NUMERIC_PACKERS.get(count)
+    if packer is None:
+        packer = _NUMERIC_PACKERS[count] = struct.Struct("!ihhHh{}h".format(count)).pack
+    return packer(8 + 2 * count, count, weight, NUMERIC_NEG if negative else NUMERIC_POS, scale, *groups)
+
+
+def _encode_int2(value):
+    if _INTEGER(value) is None:
+        raise ValueError("invalid smallint")
+    return _INT2(2, int(value))
+
+
+def _encode_int4(value):
+    if _INTEGER(value) is None:
+        raise ValueError("invalid integer")
+    return _INT4(4, int(value))
+
+
+def _encode_int8(value):
+    if _BIGINT(value) is None:
+        raise ValueError("invalid bigint")
+    return _INT8(8, int(value))
+
+
+def _encode_float4(value):
+    if _FLOAT(value) is None:
+        raise ValueError("invalid real")
+    return _FLOAT4(4, float(value))
+
+
+def _encode_float8(value):
+    if _FLOAT(value) is None:
+        raise ValueError("invalid double precision")
+    return _FLOAT8(8, float(value))
+
+
+def _encode_date(value):
+    return _INT4(4, date.fromisoformat(value).toordinal() - POSTGRES_EPOCH_DAYS)
+
+
+def _encode_timestamp(value):
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        raise ValueError("timestamp with time zone")
+    delta = moment - POSTGRES_EPOCH
+    return _INT8(8, (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+
+
+def _encode_timestamptz(value, time_zone=timezone.utc):
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=time_zone)
+    delta = moment - POSTGRES_EPOCH_UTC
+    return _INT8(8, (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+
+
+def _encode_uuid(value):
+    return _LENGTH(16) + uuid.UUID(value).bytes
+
+
+# encoders by pg_type.typname
+ENCODERS = {
+    "int2": _encode_int2,
+    "int4": _encode_int4,
+    "int8": _encode_int8,
+    "float4": _encode_float4,
+    "float8": _encode_float8,
+    "numeric": _encode_numeric,
+    "bool": _encode_bool,
+    "date": _encode_date,
+    "timestamp": _encode_timestamp,
+    "timestamptz": _encode_timestamptz,
+    "uuid": _encode_uuid,
+    "varchar": _encode_text,
+    "text": _encode_text,
+    "bpchar": _encode_text,
+    "name": _encode_text,
+}
+
+
+class BinaryCopyReader(object):
+    """
+    File-like object providing CSV rows encoded in binary COPY format.
+
+    Rows are encoded into a reusable buffer of block size, so memory use does not depend on the number of rows.
+    Empty values are sent as NULL. Text is sent as UTF-8, so the connection must use UTF8 client encoding.
+    Timestamptz values without offset are read in given time zone, which should be the TimeZone of the session.
+    """
+
+    DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+    def __init__(self, rows, columns, type_names, buffer_size=DEFAULT_BUFFER_SIZE, time_zone=timezone.utc):
+        """
+        Constructs reader of given rows.
+
+        :param rows: iterable of rows, each a list of string values
+        :param columns: a list of columns, used in error messages
+        :param type_names: a list of pg_type.typname of the columns, e.g. 'int4'
+        :param buffer_size: size of encoded data collected before it is returned
+        :param time_zone: tzinfo of timestamptz values without offset
+        """
+        unsupported = [name for name in type_names if name not in ENCODERS]
+        if unsupported:
+            raise ValueError("Binary COPY does not support types: {}".format(", ".join(sorted(set(unsupported)))))
+        self._rows = iter(rows)
+        self._columns = columns
+        self._type_names = type_names
+        encoders = dict(ENCODERS, timestamptz=functools.partial(_encode_timestamptz, time_zone=time_zone))
+        self._encoders = [encoders[name] for name in type_names]
+        self._record_number = 0
+        self._buffer_size = buffer_size
+        self._buffer = bytearray(SIGNATURE)
+        self._field_count = _FIELD_COUNT(len(columns))
+        self._finished = False
+        self.error = None
+
+    def read(self, size=-1):
+        """
+        Reads encoded data.
+
+        :param size: number of bytes requested, at least one block is encoded at a time
+        :return: bytes, empty when all rows were read
+        """
+        target = self._buffer_size if size is None or size < 0 else max(size, self._buffer_size)
+        try:
+            while not self._finished and len(self._buffer) < target:
+                self._encode_rows(target)
+        except Exception as error:
+            # psycopg2 replaces errors raised by read() with QueryCanceled, keep the original one
+            self.error = error
+            raise
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+    def _encode_rows(self, target):
+        """
+        Encodes rows until buffer reaches target size or rows run out.
+
+        :param target: requested buffer size
+        """
+        buffer = self._buffer
+        field_count = self._field_count
+        encoders = self._encoders
+        for row in self._rows:
+            self._record_number += 1
+            buffer += field_count
+            try:
+                for encoder, value in zip(encoders, row):
+                    buffer += encoder(value) if value else NULL
+            except (ValueError, KeyError, ArithmeticError, struct.error):
+                self._raise_encoding_error(row)
+            if len(row) != len(encoders):
+                raise ValueError("Record {}: expected {} values, found {}".format(
+                    self._record_number, len(encoders), len(row)))
+            if len(buffer) >= target:
+                return
+        buffer += TRAILER
+        self._finished = True
+
+    def _raise_encoding_error(self, row):
+        for column, data_type, encoder, value in zip(self._columns, self._type_names, self._encoders, row):
+            try:
+                if value:
+                    encoder(value)
+            except (ValueError, KeyError, ArithmeticError, struct.error):
+                raise BinaryEncodingError(self._record_number, column, data_type, value)
@@ -0,0 +1,177 @@
+"""
+    Splitting CSV files into byte ranges aligned to record boundaries.
+
+    Ranges are computed on raw bytes, so the quote and escape characters must be single-byte in the file
+    encoding (true for UTF-8, the ISO-8859 family and Windows code pages).
+"""
+
+import io
+import os
+import re
+
+
+DEFAULT_SCAN_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+def find_record_boundaries(file_path, targets, quote_char='"', escape_char=None, encoding="utf-8",
+                           block_size=DEFAULT_SCAN_BLOCK_SIZE, start=0):
+    """
+    Finds record boundaries at or after the given byte offsets.
+
+    For every target offset, the returned offset points just after the first new line that is not part of a quoted
+    value and starts at or after the target. A target of 0 therefore gives the end of the header record.
+    Blocks without targets are skipped by counting quote characters, so the scan runs at close to disk speed
+    unless the file uses a separate escape character.
+
+    :param file_path: path to a CSV file
+    :param targets: sorted list of byte offsets
+    :param quote_char: a one-character string used to quote fields
+    :param escape_char: a one-character string used to escape quote characters inside quoted fields,
+    None if quotes are doubled
+    :param encoding: file encoding
+    :param block_size: number of bytes scanned at once
+    :param start: offset of a record start where the scan begins, targets must not be smaller
+    :return: list of boundary offsets, one per target; file size if there is no boundary after a target
+    """
+    quote = quote_char.encode(encoding)
+    escape = escape_char.encode(encoding) if escape_char and escape_char != quote_char else None
+    if len(quote) != 1 or (escape is not None and len(escape) != 1):
+        raise ValueError("Quote and escape characters must be single bytes in encoding '{}'".format(encoding))
+
+    specials = re.compile(b"[" + re.escape(quote) + (re.escape(escape) if escape else b"") + b"\n]")
+    boundaries = []
+    pending = list(targets)
+    in_quote = False
+    skip_next = False  # escape character was the last byte of the previous block
+    block_start = start
+
+    with open(file_path, "rb") as csv_file:
+        csv_file.seek(start)
+        while pending:
+            block = csv_file.read(block_size)
+            if not block:
+                break
+            block_end = block_start + len(block)
+            position = 0
+            if skip_next:
+                position = 1
+                skip_next = False
+
+            if pending[0] >= block_end and (escape is None or escape not in block):
+                # fast path: quoted new lines cannot start a record, only the quote state matters
+                in_quote ^= bool(block.count(quote, position) & 1)
+                block_start = block_end
+                continue
+
+            for match in specials.finditer(block, position):
+                index = match.start()
+                if index < position:
+                    continue  # byte consumed by an escape character
+                char = match.group()
+                if char == quote:
+                    in_quote = not in_quote
+                elif escape is not None and char == escape:
+                    if in_quote:
+                        position = index + 2
+                        if position > len(block):
+                            skip_next = True
+                elif not in_quote and block_start + index >= pending[0]:
+                    boundary = block_start + index + 1
+                    while pending and pending[0] <= block_start + index:
+                        boundaries.append(boundary)
+                        pending.pop(0)
+                    if not pending:
+                        break
+            block_start = block_end
+
+    file_size = os.path.getsize(file_path)
+    boundaries.extend([file_size] * len(pending))
+    return boundaries
+
+
+def split_file(file_path, chunk_count, quote_char='"', escape_char=None, encoding="utf-8",
+               block_size=DEFAULT_SCAN_BLOCK_SIZE):
+    """
+    Splits CSV file into byte ranges of similar size, each containing whole records.
+
+    The header record is not included in any range.
+
+    :param file_path: path to a CSV file
+    :param chunk_count: requested number of ranges
+    :param quote_char: a one-character string used to quote fields
+    :param escape_char: a one-character string used to escape quote characters inside quoted fields
+    :param encoding: file encoding
+    :param block_size: number of bytes scanned at once
+    :return: list of (start, end) tuples, possibly shorter than chunk_count for small files
+    """
+    file_size = os.path.getsize(file_path)
+    targets = [0] + [file_size * index // chunk_count for index in range(1, chunk_count)]
+    boundaries = find_record_boundaries(file_path, targets, quote_char, escape_char, encoding, block_size)
+    boundaries.append(file_size)
+
+    ranges = []
+    start = boundaries[0]
+    for end in boundaries[1:]:
+        if end > start:
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+class FileRange(io.RawIOBase):
+    """
+    Read-only binary file object limited to a byte range of a file.
+
+    Wrap it with io.BufferedReader and io.TextIOWrapper to read the range as text.
+    """
+
+    def __init__(self, file_path, start, end):
+        """
+        Opens file and moves to the beginning of the range.
+
+        :param file_path: path to a file
+        :param start: first byte of the range
+        :param end: byte after the last byte of the range
+        """
+        super(FileRange, self).__init__()
+        self._file = open(file_path, "rb")
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def read(self, size=-1):
+        """
+        Reads up to size bytes, or to the end of the range when size is negative.
+
+        :param size: number of bytes to read
+        :return: bytes, empty at the end of the range
+        """
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def readline(self, size=-1):
+        """
+        Reads a single line, without crossing the end of the range.
+
+        :param size: maximum number of bytes to read
+        :return: bytes, empty at the end of the range
+        """
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.readline(size)
+        self._remaining -= len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def readable(self):
+        return True
+
+    def close(self):
+        self._file.close()
+        super(FileRange, self).close()
@@ -0,0 +1,101 @@
+"""
+    Command line interface: loads CSV files, directories or glob patterns, several files at once.
+
+    Usage:
+        csv-loader --host localhost --dbname db_name --user user data/*.csv
+        csv-loader --dbname db_name --jobs 8 --processes --pattern '*.csv.gz' --recursive data/
+
+    The password is read from PGPASSWORD or ~/.pgpass when --password is not given.
+"""
+
+import argparse
+import logging
+import sys
+
+from .batch import find_files
+from .csv_loader import CsvLoader
+
+_HEADER_FORMAT = "{:<40} {:<30} {:>12} {:>10} {:>9} {:>8}"
+_ROW_FORMAT = "{:<40} {:<30} {:>12} {:>10.1f} {:>9.2f} {:>8.1f}"
+
+
+def main(argv=None):
+    """
+    Runs the loader with command line arguments.
+
+    :param argv: list of arguments, sys.argv[1:] if None
+    :return: exit status, 0 if all files were loaded, 1 if any failed, 2 if no file was found
+    """
+    parser = argparse.ArgumentParser(prog="csv-loader", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="CSV files, directories or glob patterns")
+    parser.add_argument("--host")
+    parser.add_argument("--port")
+    parser.add_argument("--dbname")
+    parser.add_argument("--user")
+    parser.add_argument("--password")
+    parser.add_argument("--table-prefix", default=CsvLoader.DEFAULT_TABLE_PREFIX)
+    parser.add_argument("--pattern", default="*.csv", help="file names searched in directories (default: *.csv)")
+    parser.add_argument("--recursive", action="store_true", help="search subdirectories of directories")
+    parser.add_argument("-j", "--jobs", type=int, default=CsvLoader.DEFAULT_CONCURRENCY,
+                        help="number of files loaded at once (default: %(default)s)")
+    parser.add_argument("--processes", action="store_true", help="load files in worker processes, not threads")
+    parser.add_argument("--workers", type=int, default=CsvLoader.DEFAULT_WORKERS,
+                        help="connections loading each file (default: %(default)s)")
+    parser.add_argument("--delimiter", default=CsvLoader.DEFAULT_DELIMITER)
+    parser.add_argument("--quote-char", default=CsvLoader.DEFAULT_QUOTE_CHAR)
+    parser.add_argument("--escape-char", default=CsvLoader.DEFAULT_ESCAPE_CHAR)
+    parser.add_argument("--encoding", default="utf-8")
+    parser.add_argument("--infer-types", action="store_true", help="detect column types from data")
+    parser.add_argument("--copy-format", choices=CsvLoader.COPY_FORMATS, default="csv")
+    parser.add_argument("--fast-load", action="store_true", help="create and load each table in one transaction")
+    parser.add_argument("--unlogged", action="store_true", help="create tables as UNLOGGED until loaded")
+    parser.add_argument("--no-analyze", dest="analyze", action="store_false", help="do not analyze loaded tables")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress of every load")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format='%(asctime)s | %(name)s | %(levelname)s | %(message)s',
+                        level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr)
+
+    file_paths = find_files(args.paths, args.pattern, args.recursive)
+    if not file_paths:
+        print("No files found", file=sys.stderr)
+        return 2
+
+    load_kwargs = dict(delimiter=args.delimiter, quote_char=args.quote_char, escape_char=args.escape_char,
+                       encoding=args.encoding, workers=args.workers, infer_types=args.infer_types,
+                       copy_format=args.copy_format, fast_load=args.fast_load, unlogged=args.unlogged,
+                       analyze=args.analyze)
+    print(_HEADER_FORMAT.format("file", "table", "rows", "MB", "seconds", "MB/s"))
+    with CsvLoader(args.host, args.port, args.dbname, args.user, args.password, args.table_prefix,
+                   pool_size=max(1, args.jobs * args.workers)) as loader:
+        result = loader.load_many(file_paths, args.jobs, args.processes, _print_outcome, **load_kwargs)
+
+    print(_ROW_FORMAT.format("total", "{} files".format(len(result.results)), result.rows,
+                             result.bytes_read / (1024 * 1024), result.elapsed, result.megabytes_per_second))
+    if result.failed:
+        print("{} of {} files failed:".format(len(result.failed), len(result.outcomes)), file=sys.stderr)
+        for outcome in result.failed:
+            print("  {}: {}".format(outcome.file_path, str(outcome.error).strip()), file=sys.stderr)
+        return 1
+    return 0
+
+
+def _print_outcome(outcome):
+    """
+    Prints a line of the summary when a file is loaded.
+
+    :param outcome: FileOutcome
+    """
+    if outcome.error is not None:
+        message = str(outcome.error).strip().splitlines() or [repr(outcome.error)]
+        print("{:<40} FAILED: {}".format(outcome.file_path, message[0]), flush=True)
+        return
+    result = outcome.result
+    megabytes = result.bytes_read / (1024 * 1024)
+    print(_ROW_FORMAT.format(outcome.file_path, result.table_name, result.rows, megabytes, result.elapsed,
+                             megabytes / result.elapsed if result.elapsed else 0.0), flush=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
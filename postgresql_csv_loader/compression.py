@@ -0,0 +1,207 @@
+"""
+    Reading and writing compressed CSV files.
+
+    Compression is recognised by file extension: .gz, .bz2, .xz and .zst. Zstandard needs the optional
+    zstandard package (pip3 install zstandard).
+"""
+
+import bz2
+import gzip
+import io
+import logging
+import lzma
+import os
+import queue
+import threading
+import time
+
+
+EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
+
+
+def compression_of(file_path):
+    """
+    Recognises compression by file extension.
+
+    :param file_path: path to a file
+    :return: 'gzip', 'bz2', 'xz', 'zstd' or None for uncompressed files
+    """
+    return EXTENSIONS.get(os.path.splitext(file_path)[1].lower())
+
+
+def strip_compression_extension(file_path):
+    """
+    Removes compression extension, e.g. stats.csv.gz -> stats.csv
+
+    :param file_path: path to a file
+    :return: path without compression extension
+    """
+    base, extension = os.path.splitext(file_path)
+    return base if extension.lower() in EXTENSIONS else file_path
+
+
+def open_decompressed(raw_file, compression):
+    """
+    Wraps binary file with a decompressing reader.
+
+    :param raw_file: file opened in binary mode
+    :param compression: compression name returned by compression_of
+    :return: binary file object providing decompressed data
+    """
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw_file, mode="rb")
+    if compression == "bz2":
+        return bz2.BZ2File(raw_file, mode="rb")
+    if compression == "xz":
+        return lzma.LZMAFile(raw_file, mode="rb")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Reading .zst files requires zstandard package: pip3 install zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(raw_file, read_across_frames=True)
+    raise ValueError("Unknown compression '{}'".format(compression))
+
+
+def open_compressed(raw_file, compression):
+    """
+    Wraps binary file with a compressing writer. Closing the writer flushes it, but does not close raw_file.
+
+    Compressed streams written one after another form a valid file of every supported format, so files
+    written in parts can be joined by copying their bytes.
+
+    :param raw_file: file opened in binary mode for writing
+    :param compression: compression name returned by compression_of
+    :return: binary file object compressing written data
+    """
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw_file, mode="wb", compresslevel=6)
+    if compression == "bz2":
+        return bz2.BZ2File(raw_file, mode="wb")
+    if compression == "xz":
+        return lzma.LZMAFile(raw_file, mode="wb")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Writing .zst files requires zstandard package: pip3 install zstandard")
+        return zstandard.ZstdCompressor().stream_writer(raw_file, closefd=False)
+    raise ValueError("Unknown compression '{}'".format(compression))
+
+
+class DecompressingReader(io.RawIOBase):
+    """
+    Binary file object decompressing a file in a background thread.
+
+    Decompressed blocks are passed through a bounded queue, so decompression overlaps with sending data
+    to the server while memory use stays limited to queue_size blocks.
+    Wrap it with io.BufferedReader and io.TextIOWrapper to read it as text.
+    """
+
+    DEFAULT_BLOCK_SIZE = 1024 * 1024
+    DEFAULT_QUEUE_SIZE = 8
+
+    def __init__(self, file_path, compression=None, block_size=DEFAULT_BLOCK_SIZE, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        Opens file and starts decompression.
+
+        :param file_path: path to a compressed file
+        :param compression: compression name, recognised by file extension if None
+        :param block_size: size of decompressed blocks
+        :param queue_size: maximum number of decompressed blocks waiting to be read
+        """
+        super(DecompressingReader, self).__init__()
+        self._raw_file = open(file_path, "rb")
+        try:
+            self._decompressed = open_decompressed(self._raw_file, compression or compression_of(file_path))
+        except Exception:
+            self._raw_file.close()
+            raise
+        self._block_size = block_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pending = b""
+        self._finished = False
+        self._stopped = threading.Event()
+        self.compressed_bytes = 0
+        self.uncompressed_bytes = 0
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._decompress, name="CsvLoader-decompress", daemon=True)
+        self._thread.start()
+
+    def _decompress(self):
+        try:
+            while not self._stopped.is_set():
+                block = self._decompressed.read(self._block_size)
+                self.compressed_bytes = self._raw_file.tell()
+                if not block:
+                    break
+                self._put(block)
+            self._put(None)
+        except Exception as error:
+            self._put(error)
+
+    def _put(self, item):
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def read(self, size=-1):
+        """
+        Reads decompressed data.
+
+        :param size: maximum number of bytes, all remaining data if negative
+        :return: bytes, empty at the end of the file
+        """
+        chunks = [self._pending]
+        length = len(self._pending)
+        while not self._finished and (size is None or size < 0 or length < size):
+            item = self._queue.get()
+            if item is None:
+                self._finished = True
+            elif isinstance(item, Exception):
+                self._finished = True
+                raise item
+            else:
+                chunks.append(item)
+                length += len(item)
+        data = b"".join(chunks)
+        if size is not None and 0 <= size < len(data):
+            data, self._pending = data[:size], data[size:]
+        else:
+            self._pending = b""
+        self.uncompressed_bytes += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def readable(self):
+        return True
+
+    def log_throughput(self, name):
+        """
+        Logs compressed and uncompressed throughput since the file was opened.
+
+        :param name: name used in the message, e.g. table name
+        """
+        elapsed = time.perf_counter() - self.started
+        megabytes = 1024 * 1024
+        logging.getLogger('CsvLoader').info(
+            'Read {:.1f} MB compressed ({:.1f} MB/s), {:.1f} MB uncompressed ({:.1f} MB/s) for "{}"'.format(
+                self.compressed_bytes / megabytes, self.compressed_bytes / megabytes / elapsed if elapsed else 0,
+                self.uncompressed_bytes / megabytes, self.uncompressed_bytes / megabytes / elapsed if elapsed else 0,
+                name))
+
+    def close(self):
+        if self.closed:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._decompressed.close()
+        self._raw_file.close()
+        super(DecompressingReader, self).close()
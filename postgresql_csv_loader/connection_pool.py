@@ -0,0 +1,164 @@
+"""
+    Thread-safe pool of database connections reused between loads.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from psycopg2 import connect, extensions
+from psycopg2.pool import PoolError
+
+
+class ConnectionPool(object):
+    """
+    Thread-safe pool of database connections.
+
+    Connections are opened on demand, up to max_size at once, and kept open for reuse when returned.
+    The pool has the same getconn/putconn/closeall interface as psycopg2.pool, so both can be used by CsvLoader.
+    """
+
+    DEFAULT_MAX_SIZE = 10
+    DEFAULT_TIMEOUT = 60
+    HEALTH_CHECK_STMT = "SELECT 1"
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, health_check=True, timeout=DEFAULT_TIMEOUT, **connect_kwargs):
+        """
+        Constructs pool with given connection parameters. No connection is opened until requested.
+
+        :param max_size: maximum number of open connections
+        :param health_check: if True, idle connections are checked with a simple query before reuse
+        :param timeout: number of seconds to wait for a free connection, None to wait forever
+        :param connect_kwargs: parameters passed to psycopg2.connect, e.g. dbname, user, host
+        """
+        self.max_size = max_size
+        self._health_check = health_check
+        self._timeout = timeout
+        self._connect_kwargs = connect_kwargs
+        self._idle = []
+        self._in_use = set()
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def getconn(self):
+        """
+        Provides an idle connection, opening a new one if none is available.
+
+        Blocks while max_size connections are in use.
+
+        :return: open connection
+        """
+        deadline = None if self._timeout is None else time.monotonic() + self._timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+                if self._idle:
+                    connection = self._idle.pop()
+                    break
+                if len(self._in_use) < self.max_size:
+                    connection = None
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolError("connection pool exhausted, {} connections in use".format(self.max_size))
+                self._condition.wait(remaining)
+            # reserve the slot before connecting outside of the lock
+            placeholder = object()
+            self._in_use.add(placeholder)
+
+        try:
+            if connection is not None and not self._is_healthy(connection):
+                self._discard(connection)
+                connection = None
+            if connection is None:
+                connection = connect(**self._connect_kwargs)
+        except Exception:
+            with self._condition:
+                self._in_use.discard(placeholder)
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._in_use.discard(placeholder)
+            self._in_use.add(connection)
+        return connection
+
+    def putconn(self, connection, close=False):
+        """
+        Returns connection to the pool. Open transaction is rolled back.
+
+        :param connection: connection provided by getconn
+        :param close: if True, connection is closed instead of being kept for reuse
+        """
+        if not close and not connection.closed:
+            try:
+                if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except Exception as error:
+                logging.getLogger('CsvLoader').warning('Dropping broken connection: {}'.format(error))
+                close = True
+
+        with self._condition:
+            self._in_use.discard(connection)
+            if close or connection.closed or self._closed:
+                self._discard(connection)
+            else:
+                self._idle.append(connection)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Provides a connection for the duration of with block.
+        """
+        connection = self.getconn()
+        try:
+            yield connection
+        finally:
+            self.putconn(connection)
+
+    def closeall(self):
+        """
+        Closes idle connections and prevents opening new ones. Connections in use are closed when returned.
+        """
+        with self._condition:
+            self._closed = True
+            for connection in self._idle:
+                self._discard(connection)
+            self._idle = []
+            self._condition.notify_all()
+
+    def _is_healthy(self, connection):
+        """
+        Checks whether idle connection can be reused.
+
+        :param connection: idle connection
+        :return: True if connection works
+        """
+        if connection.closed:
+            return False
+        if not self._health_check:
+            return True
+        try:
+            cursor = connection.cursor()
+            cursor.execute(self.HEALTH_CHECK_STMT)
+            cursor.close()
+            connection.rollback()
+            return True
+        except Exception as error:
+            logging.getLogger('CsvLoader').info('Replacing broken connection: {}'.format(error))
+            return False
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.closeall()
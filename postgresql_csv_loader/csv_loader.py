@@ -1,11 +1,51 @@
 import csv
+import functools
+import hashlib
+import io
 import logging
 import os
 import re
-from psycopg2 import connect
+import shutil
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from psycopg2 import DataError, IntegrityError
+from psycopg2.extensions import STATUS_PREPARED
 
+from .base_loader import (DEFAULT_BLOCK_SIZE, DEFAULT_CONCURRENCY, DEFAULT_DELIMITER, DEFAULT_ESCAPE_CHAR,
+                          DEFAULT_QUOTE_CHAR, DEFAULT_SAMPLE_SIZE, DEFAULT_TABLE_PREFIX, BaseCsvLoader)
+from .batch import BatchResult, FileOutcome, _init_process, _load_in_process, find_files, largest_first
+from .binary_copy import BinaryCopyReader, BinaryEncodingError, session_time_zone
+from .chunking import FileRange, find_record_boundaries, split_file
+from .compression import DecompressingReader, compression_of, open_compressed
+from .connection_pool import ConnectionPool
+from .manifest import Manifest
+from .progress import LoadMonitor, ProgressReader, ProgressWriter
+from .projection import Projection
+from .quarantine import LineCounter, Reject, RejectWriter
+from .row_source import (DEFAULT_BATCH_SIZE, RowStreamReader, column_names, encode_array, encode_frame, encode_rows,
+                         is_frame, is_structured_array, postgres_types)
 
-class CsvLoader(object):
+
+ChunkTiming = namedtuple("ChunkTiming", ["index", "start", "end", "seconds", "rows"])
+MergeCounts = namedtuple("MergeCounts", ["inserted", "updated", "deleted"])
+
+
+class PreparedTransactionError(Exception):
+    """
+    Prepared transactions of a parallel load could not be committed. They hold their rows and locks until they
+    are committed with COMMIT PREPARED or rolled back with ROLLBACK PREPARED, e.g. by an administrator.
+    """
+
+    def __init__(self, gids):
+        super(PreparedTransactionError, self).__init__(
+            "Could not commit prepared transactions, run COMMIT PREPARED for each of: {}".format(", ".join(gids)))
+        self.gids = gids
+
+
+class CsvLoader(BaseCsvLoader):
     """
     Automatically create tables and load data from CSV files to your database.
 
@@ -13,130 +53,1509 @@ class CsvLoader(object):
     It works only with PostgreSQL for now.
     """
 
-    DEFAULT_DELIMITER = ','
-    DEFAULT_QUOTE_CHAR = '"'
-    DEFAULT_ESCAPE_CHAR = None
-    DEFAULT_TABLE_PREFIX = "csv_"
-    DEFAULT_DOUBLE_QUOTE = True
-    DEFAULT_DATA_TYPE = "varchar"
+    DEFAULT_WORKERS = 1
+    DEFAULT_CHUNK_SIZE = 256 * 1024 * 1024
+    DEFAULT_BATCH_SIZE = DEFAULT_BATCH_SIZE
+    COMMIT_PREPARED_ATTEMPTS = 3
+    COMMIT_PREPARED_DELAY = 1
+
+    TRUNCATE_STMT = "TRUNCATE {};"
+    DROP_STMT = "DROP TABLE IF EXISTS {};"
+    SET_LOGGED_STMT = "ALTER TABLE {} SET LOGGED;"
+    SYNCHRONOUS_COMMIT_OFF_STMT = "SET LOCAL synchronous_commit TO OFF;"
+    CREATE_INDEX_STMT = "CREATE {}INDEX \"{}\" ON {} {};"
+    ADD_CONSTRAINT_STMT = "ALTER TABLE {} ADD CONSTRAINT \"{}\" {} USING INDEX \"{}\";"
+    MAINTENANCE_WORK_MEM_STMT = "SET LOCAL maintenance_work_mem = %s;"
+    TABLE_EXISTS_STMT = "SELECT to_regclass(%s) IS NOT NULL;"
+    STAGING_STMT = "CREATE TEMPORARY TABLE {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DROP;"
+    UNIQUE_INDEXES_STMT = "SELECT array_agg(a.attname::text) FROM pg_index i " \
+                          "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) " \
+                          "WHERE i.indrelid = %s::regclass AND i.indisunique AND i.indpred IS NULL " \
+                          "AND i.indexprs IS NULL GROUP BY i.indexrelid;"
+    # xmax of a row inserted by the statement is 0, of an updated row it is the locking transaction
+    UPSERT_STMT = "WITH upserted AS (INSERT INTO {} ({}) SELECT {} FROM {} ON CONFLICT ({}) DO {} " \
+                  "RETURNING xmax = 0 AS inserted) " \
+                  "SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM upserted;"
+    MERGE_STMT = "MERGE INTO {} AS t USING {} AS s ON {} {}WHEN NOT MATCHED THEN INSERT ({}) VALUES ({});"
+    MATCHED_COUNT_STMT = "SELECT count(*) FROM {} AS s JOIN {} AS t ON {};"
+    DELETE_MISSING_STMT = "DELETE FROM {} AS t WHERE NOT EXISTS (SELECT 1 FROM {} AS s WHERE {});"
+    MERGE_METHODS = ("upsert", "merge")
+    PARTITION_KEY_STMT = "SELECT p.partstrat, p.partnatts, a.attname FROM pg_partitioned_table p " \
+                         "LEFT JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0] " \
+                         "WHERE p.partrelid = %s::regclass;"
+    PARTITION_PARENT_STMT = "SELECT inhparent::regclass::text FROM pg_inherits WHERE inhrelid = %s::regclass;"
+    PARTITION_TABLE_STMT = "CREATE {}TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS);"
+    PARTITIONED_INDEXES_STMT = "SELECT c.relname, pg_get_indexdef(i.indexrelid), n.contype FROM pg_index i " \
+                               "JOIN pg_class c ON c.oid = i.indexrelid " \
+                               "LEFT JOIN pg_constraint n ON n.conindid = i.indexrelid AND n.conrelid = i.indrelid " \
+                               "WHERE i.indrelid = %s::regclass;"
+    # definition of a partitioned index, e.g. CREATE UNIQUE INDEX name ON ONLY public.parent USING btree (id)
+    PARTITIONED_INDEX_DEF = re.compile(r'^CREATE (UNIQUE )?INDEX .+? ON ONLY .+? (USING .+)$')
+    ADD_CHECK_STMT = "ALTER TABLE {} ADD CONSTRAINT \"{}\" CHECK ({});"
+    DROP_CONSTRAINT_STMT = "ALTER TABLE {} DROP CONSTRAINT \"{}\";"
+    DETACH_PARTITION_STMT = "ALTER TABLE {} DETACH PARTITION {};"
+    RENAME_STMT = "ALTER TABLE {} RENAME TO {};"
+    RENAME_INDEX_STMT = "ALTER INDEX {} RENAME TO \"{}\";"
+    ATTACH_PARTITION_STMT = "ALTER TABLE {} ATTACH PARTITION {} FOR VALUES {};"
+    PARTITION_STRATEGIES = {"r": "range", "l": "list"}
+    ON_ERROR_VERSION = 170000
+    # notice of a row skipped by COPY ... ON_ERROR ignore
+    SKIPPED_ROW_NOTICE = re.compile(r'skipping row due to data type incompatibility at line (\d+) for (.*)')
+    MAX_IDENTIFIER_LENGTH = 63
+    EXPORT_STMT = "COPY ({}) TO STDOUT WITH ({})"
+    SELECT_STMT = "SELECT {} FROM {}{}"
+    REPEATABLE_READ_STMT = "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY;"
+    EXPORT_SNAPSHOT_STMT = "SELECT pg_export_snapshot();"
+    SET_SNAPSHOT_STMT = "SET TRANSACTION SNAPSHOT %s;"
+    RELATION_PAGES_STMT = "SELECT pg_relation_size(%s::regclass) / current_setting('block_size')::bigint;"
+    COLUMN_TYPES_STMT = "SELECT a.attname, t.typname FROM pg_attribute a JOIN pg_type t ON t.oid = a.atttypid " \
+                        "WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped"
+    TIME_ZONE_STMT = "SHOW TimeZone;"
 
-    CREATE_STMT = "CREATE TABLE {} ({});"
-    COPY_STMT = "COPY {} ({}) FROM stdin WITH CSV HEADER DELIMITER '{}' QUOTE '{}' ESCAPE '{}'"
+    COPY_FORMATS = ("csv", "binary")
 
-    def __init__(self, database_host, database_port, database_name, user, password=None,
-                 table_prefix=DEFAULT_TABLE_PREFIX):
+    def __init__(self, database_host=None, database_port=None, database_name=None, user=None, password=None,
+                 table_prefix=DEFAULT_TABLE_PREFIX, pool=None, connection=None,
+                 pool_size=ConnectionPool.DEFAULT_MAX_SIZE, health_check=True):
         """
         Constructs document with given database details.
 
+        Connections are taken from a pool owned by the loader and reused between load_data calls.
+        Close the loader, or use it as a context manager, to close them. The pool is created when a connection
+        is first needed, so a loader given a pool or a connection does not create one.
+
         :param database_host: database host address
         :param database_port: connection port number
         :param database_name: the database name
         :param user: user name used to authenticate
         :param password: password used to authenticate
         :param table_prefix: prefix for database tables that will be created by loader
+        :param pool: external pool with getconn/putconn methods, e.g. psycopg2.pool.ThreadedConnectionPool.
+        It is not closed by the loader
+        :param connection: external connection used for every load. It is not closed by the loader
+        :param pool_size: maximum number of connections in the pool owned by the loader
+        :param health_check: if True, pooled connections are checked before reuse
         """
-        self._database_host = database_host
-        self._database_port = database_port
-        self._database_name = database_name
-        self._user = user
-        self._password = password
-        self._table_prefix = table_prefix
+        super(CsvLoader, self).__init__(database_host, database_port, database_name, user, password, table_prefix)
+        self._connection = connection
+        self._session_connection = None
+        self._owns_pool = pool is None and connection is None
+        self._pool = pool
+        self._pool_kwargs = dict(max_size=pool_size, health_check=health_check, dbname=database_name, user=user,
+                                 password=password, host=database_host, port=database_port)
+        self._pool_lock = threading.Lock()
+
+    def close(self):
+        """
+        Closes connections of the pool owned by the loader. External pool and connection stay open.
+        """
+        if self._owns_pool and self._pool is not None:
+            self._pool.closeall()
+
+    @contextmanager
+    def session(self):
+        """
+        Keeps a single connection for all loads inside with block, e.g. a batch of small files.
+        """
+        if self._session_connection is not None or self._connection is not None:
+            yield self
+            return
+        pool = self._connection_pool()
+        self._session_connection = pool.getconn()
+        try:
+            yield self
+        finally:
+            connection, self._session_connection = self._session_connection, None
+            pool.putconn(connection)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def load_data(self, file_path, delimiter=DEFAULT_DELIMITER, quote_char=DEFAULT_QUOTE_CHAR,
-                  escape_char=DEFAULT_ESCAPE_CHAR, create_table=True, encoding="utf-8"):
+                  escape_char=DEFAULT_ESCAPE_CHAR, create_table=True, encoding="utf-8",
+                  workers=DEFAULT_WORKERS, two_phase_commit=False, column_types=None, infer_types=False,
+                  sample_size=DEFAULT_SAMPLE_SIZE, copy_format="csv", passthrough=False,
+                  block_size=DEFAULT_BLOCK_SIZE, indexes=None, primary_key=None, unique=None, index_workers=1,
+                  maintenance_work_mem=None, analyze=True, fast_load=False, unlogged=False, incremental=False,
+                  manifest=None, chunk_size=DEFAULT_CHUNK_SIZE, table_name=None, merge_key=None,
+                  delete_missing=False, merge_method=None, progress_callback=None,
+                  progress_interval=LoadMonitor.DEFAULT_INTERVAL, quarantine=False, max_rejects=None,
+                  reject_file=None, reject_table=None, partition_of=None, partition_bounds=None,
+                  replace_partition=False, columns=None, row_filter=None):
         """
         Loads data from CSV file to the database.
 
         Table column names are based on CSV header and names are simplified:
         - all uppercase letters are replaced with underscore and lowercase letters.
         - special characters are replaced with underscore.
-        Table name is specified based on CSV file name.
+        Table name is specified based on CSV file name, unless given.
 
-        :param file_path: path to a CSV file
+        :param file_path: path to a CSV file, optionally compressed (.gz, .bz2, .xz or .zst)
         :param delimiter: a one-character string used to separate fields. It defaults to ','
         :param quote_char: a one-character string used to quote fields containing special characters,
         such as the delimiter or quotechar, or which contain new-line characters
         :param escape_char: a one-character string used by the writer to escape the delimiter
         :param create_table: if True, table will be created
         :param encoding file encoding
+        :param workers: number of connections loading the file in parallel. With more than one worker, the file
+        is split into byte ranges aligned to records, each copied in its own transaction. Transactions are
+        committed one after another only when all ranges have been copied, so a failure while copying leaves
+        the table unchanged, but a failure while committing leaves the ranges committed before it in the table
+        :param two_phase_commit: if True, parallel workers prepare their transactions before any of them is
+        committed, so a failure while copying or preparing leaves the table unchanged. Prepared transactions
+        are never rolled back: a transaction which cannot be committed is committed again by another
+        connection, and if it still fails, PreparedTransactionError names the prepared transactions left to be
+        committed with COMMIT PREPARED. Requires max_prepared_transactions > 0 on the server
+        :param column_types: dictionary of column types by simplified column name, used when table is created.
+        Other columns are created as varchar
+        :param infer_types: if True, types of columns not listed in column_types are detected from data.
+        If a value does not fit a detected type, the column is changed to varchar and the load is repeated
+        :param sample_size: number of bytes read to detect types, None to read the whole file
+        :param copy_format: 'csv' to send the file as it is, or 'binary' to parse it on the client and send values
+        in binary COPY format, so the server does not parse numbers and dates. With 'binary', empty values are
+        loaded as NULL and values must be in the format used by type detection (e.g. ISO dates)
+        :param passthrough: if True, the file is sent as raw bytes and the server converts it from the file encoding,
+        so the client does not decode and re-encode the data. Invalid bytes are then reported by the server.
+        Parallel loads always work this way
+        :param block_size: number of bytes read from the file and sent to the server at once
+        :param indexes: list of indexes built after the data is loaded, each a column name or a list of column names
+        :param primary_key: column name or list of column names of primary key added after the data is loaded
+        :param unique: list of unique constraints added after the data is loaded, each a column name or a list
+        of column names
+        :param index_workers: number of connections building indexes at the same time
+        :param maintenance_work_mem: memory used to build each index, e.g. '1GB'; server setting if None
+        :param analyze: if True, table statistics are collected after the load
+        :param fast_load: if True, the table is created (or truncated, if create_table is False) and loaded with
+        COPY FREEZE in a single transaction with synchronous_commit off. Rows are stored already frozen, so
+        the table is not rewritten by later vacuums, and with wal_level=minimal the load writes almost no WAL.
+        A crash just after commit may lose the whole load, and concurrent transactions see the table empty
+        until it is committed
+        :param unlogged: if True, the table is created as UNLOGGED and switched to LOGGED after indexes are built.
+        Switching writes the whole table to WAL unless wal_level=minimal
+        :param incremental: if True, the file is recorded in a manifest table and loaded in chunks, each committed
+        with its end offset. A file whose size, modification time and fingerprint are unchanged since it was
+        completely loaded is skipped; an interrupted load of an unchanged file resumes after the last committed
+        chunk. A changed file is loaded again, into a recreated table if create_table is True
+        :param manifest: Manifest used by incremental load, by default stored in table csv_loader_manifest
+        :param chunk_size: number of bytes committed at once by incremental load. Compressed files are committed
+        as a whole
+        :param table_name: a table name, generated from file name if None
+        :param merge_key: column name or list of column names. If given, the file is copied to a temporary
+        staging table and merged into the table in one statement: rows with a matching key are updated,
+        other rows are inserted. If the table does not exist and create_table is True, it is created with
+        the key as primary key
+        :param delete_missing: if True, merge also deletes rows whose key is not in the file
+        :param merge_method: 'upsert' for INSERT ... ON CONFLICT, which needs a unique index on the key, or
+        'merge' for MERGE (PostgreSQL 15+). If None, upsert is used when such index exists
+        :param progress_callback: function called with Progress while the file is read, at most once per
+        progress_interval seconds, and once when the load is finished
+        :param progress_interval: minimum number of seconds between progress callbacks
+        :param quarantine: if True, rows the server cannot load are rejected instead of aborting the load.
+        The file is loaded in committed chunks of chunk_size bytes; a failing chunk is split in halves until
+        the failing rows are isolated. On PostgreSQL 17+ COPY skips values of wrong type itself (ON_ERROR ignore),
+        unless a detected column type can still change to varchar
+        :param max_rejects: maximum number of rejected rows, None for no limit. When it is exceeded,
+        RejectLimitError is raised and the chunks loaded so far stay committed
+        :param reject_file: path to a CSV file rejected rows are appended to, with line number and error
+        :param reject_table: name of a table rejected rows are inserted to, created if it does not exist
+        :param partition_of: name of a table partitioned by range or list of a single column. The file is loaded
+        into a standalone table with columns and defaults of the partitioned table, which is not locked while
+        the data is copied. Indexes of the partitioned table are built on the new table, its rows are validated
+        with a CHECK constraint matching partition_bounds, and then it is attached as a partition without
+        scanning it again
+        :param partition_bounds: bounds of the partition: (from, to) tuple for range partitioning, where None
+        stands for MINVALUE or MAXVALUE, or a list of values for list partitioning
+        :param replace_partition: if True and the table already exists, the file is loaded into another table,
+        which replaces the existing partition in a single transaction. Readers of the partitioned table see
+        either the old or the new partition
+        :param columns: list of simplified column names loaded from the file, or a dictionary of table column
+        names by simplified file column name, in table column order. The table is created with these columns
+        only. Other columns are dropped on the client while the file is read, so they are not sent to the server.
+        Empty values of projected columns are loaded as NULL
+        :param row_filter: dictionary of conditions by simplified file column name, each a value, a set of values
+        or a function called with the value as read from the file. Only records meeting all conditions are loaded
+        :return: LoadResult with bytes read, rows copied and seconds spent in each phase
         """
+        if copy_format not in self.COPY_FORMATS:
+            raise ValueError("Unknown copy format '{}', use one of: {}".format(copy_format,
+                                                                             ", ".join(self.COPY_FORMATS)))
         # doublequote=True by default
         # don't define escape char if it's the same as quote char
         escape_char = None if (escape_char == quote_char) else escape_char
 
-        original_headers = self._read_headers(file_path, delimiter, quote_char, escape_char, encoding)
-        headers = self._normalize_headers(original_headers)
-        table_name = self._generate_table_name(file_path)
+        monitor = LoadMonitor(table_name, file_path, progress_callback, progress_interval)
+        with monitor.phase("header"):
+            original_headers = self._read_headers(file_path, delimiter, quote_char, escape_char, encoding)
+            headers = self._normalize_headers(original_headers)
+        table_name = monitor.table_name = table_name or self._generate_table_name(file_path)
+        if workers > 1 and (self._connection is not None or self._session_connection is not None):
+            raise ValueError("Parallel load needs a connection pool, not a single connection")
+        if workers > 1 and compression_of(file_path):
+            raise ValueError("Compressed files cannot be split for parallel load")
+        if workers > 1 and fast_load:
+            raise ValueError("Fast load uses a single transaction and cannot be parallel")
+        if incremental and (workers > 1 or fast_load):
+            raise ValueError("Incremental load commits chunks one by one and cannot be parallel or fast")
+        if merge_key is not None and (workers > 1 or fast_load or incremental):
+            raise ValueError("Merge copies into a staging table and cannot be parallel, fast or incremental")
+        if quarantine and (workers > 1 or fast_load or incremental or merge_key is not None):
+            raise ValueError("Quarantine commits chunks one by one and cannot be parallel, fast, incremental or merge")
+        if quarantine and (copy_format != "csv" or compression_of(file_path)):
+            raise ValueError("Quarantine needs an uncompressed file loaded in csv format")
+        if partition_of is not None and (fast_load or incremental or quarantine or merge_key is not None):
+            raise ValueError("Partition is loaded into a new table and cannot be fast, incremental, quarantined or "
+                             "merged")
+        if partition_of is not None and (indexes or primary_key or unique):
+            raise ValueError("Indexes of a partition are defined on the partitioned table")
+        if partition_of is not None and partition_bounds is None:
+            raise ValueError("Partition bounds are required to attach a partition")
+        projection = None
+        if columns is not None or row_filter is not None:
+            if workers > 1 or copy_format != "csv":
+                raise ValueError("Projection is applied by a single reader and needs csv format")
+            if incremental or quarantine or merge_key is not None:
+                raise ValueError("Projection cannot be used with incremental, quarantined or merge load")
+            projection = Projection(headers, columns, row_filter)
+        # columns of the file, and of the table, which has only the projected ones
+        file_headers = headers
+        if projection is not None:
+            headers = projection.headers
+        if merge_method not in (None,) + self.MERGE_METHODS:
+            raise ValueError("Unknown merge method '{}', use one of: {}".format(merge_method,
+                                                                              ", ".join(self.MERGE_METHODS)))
+
+        entry = identity = None
+        resuming = False
+        if incremental:
+            manifest = manifest or Manifest()
+            with monitor.phase("fingerprint"):
+                identity = manifest.identify(file_path)
+            with self._acquire_connection(monitor) as connection:
+                manifest.create(connection)
+                entry = manifest.get(connection, os.path.abspath(file_path))
+                connection.commit()
+            resuming = Manifest.matches(entry, identity)
+            if resuming and entry.completed:
+                logging.getLogger('CsvLoader').info('File "{}" is unchanged since it was loaded, skipping.'.format(
+                    file_path))
+                return monitor.finish(skipped=True)
+
+        missing = [key for key in self._column_list(merge_key or []) if key not in headers]
+        if missing:
+            raise ValueError("Merge key columns not found in file: {}".format(", ".join(missing)))
+        if merge_key is not None and create_table:
+            with self._acquire_connection(monitor) as connection:
+                create_table = not self._table_exists(connection, table_name)
+
+        partition = partition_name = None
+        if partition_of is not None:
+            with self._acquire_connection(monitor) as connection:
+                partition = self._partition_key(connection, partition_of)
+                exists = self._table_exists(connection, table_name)
+            if partition[1] not in headers:
+                raise ValueError("Partition key column not found in file: {}".format(partition[1]))
+            # the existing partition stays attached until the new one is loaded
+            partition_name = table_name
+            if exists and replace_partition:
+                # the generated name has no schema, the table is loaded next to the partition it replaces
+                schema = partition_name.rpartition(".")[0]
+                table_name = self._index_name(partition_name, [], "load")
+                table_name = schema + "." + table_name if schema else table_name
+                with self._acquire_connection(monitor) as connection:
+                    cursor = connection.cursor()
+                    cursor.execute(self.DROP_STMT.format(table_name))
+                    connection.commit()
+                    cursor.close()
+            create_table = True
+
+        column_types = dict(column_types or {})
+        inferred_columns = set()
+        if create_table and infer_types and not resuming and partition_of is None:
+            logging.getLogger('CsvLoader').info('Detecting column types of "{}"...'.format(file_path))
+            with monitor.phase("infer"):
+                schema = self._infer_schema(file_path, file_headers, delimiter, quote_char, escape_char, encoding,
+                                            sample_size)
+            if projection is not None:
+                schema = [(projection.table_column(column), data_type) for column, data_type in schema
+                          if projection.table_column(column) is not None]
+            inferred_columns = {column for column, data_type in schema
+                                if column not in column_types and data_type != self.DEFAULT_DATA_TYPE}
+            column_types = dict(schema, **column_types)
+
         logging.getLogger('CsvLoader').info('Connecting to database "{}"...'.format(self._database_name))
-        connection = connect(dbname=self._database_name, user=self._user, password= self._password,
-                             host=self._database_host, port=self._database_port)
-        if create_table:
-            logging.getLogger('CsvLoader').info('Creating table "{}"...'.format(table_name))
-            self._create_table(connection, headers, table_name)
+        timings = merge_counts = None
+        rejected = 0
+        if fast_load:
+            self._fast_load(file_path, table_name, headers, column_types, inferred_columns, create_table, unlogged,
+                            delimiter, quote_char, escape_char, encoding, copy_format, passthrough, block_size,
+                            monitor, projection)
+        elif merge_key is not None:
+            if create_table:
+                with self._acquire_connection(monitor) as connection, monitor.phase("create"):
+                    logging.getLogger('CsvLoader').info('Creating table "{}"...'.format(table_name))
+                    self._create_table(connection, headers, table_name, column_types, unlogged)
+                with monitor.phase("create"):
+                    self._create_indexes(table_name, primary_key=merge_key)
+            merge_counts = self._merge(file_path, table_name, headers, merge_key, delete_missing, merge_method,
+                                       delimiter, quote_char, escape_char, encoding, copy_format, passthrough,
+                                       block_size, monitor)
+        elif quarantine:
+            rejects = RejectWriter(file_path, max_rejects, reject_file, reject_table)
+            self._load_quarantined(file_path, table_name, headers, column_types, inferred_columns, create_table,
+                                   unlogged, rejects, delimiter, quote_char, escape_char, encoding, block_size,
+                                   chunk_size, monitor)
+            rejected = rejects.count
+        elif incremental:
+            self._load_incremental(file_path, table_name, headers, column_types, inferred_columns, create_table,
+                                   unlogged, manifest, entry, identity, delimiter, quote_char, escape_char, encoding,
+                                   copy_format, passthrough, block_size, chunk_size, monitor)
+        else:
+            if create_table:
+                with self._acquire_connection(monitor) as connection, monitor.phase("create"):
+                    logging.getLogger('CsvLoader').info('Creating table "{}"...'.format(table_name))
+                    if partition_of is not None:
+                        self._create_partition_table(connection, table_name, partition_of, unlogged)
+                    else:
+                        self._create_table(connection, headers, table_name, column_types, unlogged)
+
+            while True:
+                try:
+                    if workers > 1:
+                        logging.getLogger('CsvLoader').info('Loading data to table "{}" using {} workers...'.format(
+                            table_name, workers))
+                        timings = self._copy_parallel(file_path, table_name, headers, delimiter, quote_char,
+                                                      escape_char, encoding, workers, two_phase_commit, copy_format,
+                                                      block_size, monitor)
+                    else:
+                        logging.getLogger('CsvLoader').info('Loading data to table "{}"...'.format(table_name))
+                        with self._acquire_connection(monitor) as connection:
+                            with monitor.phase("copy"):
+                                rows = self._copy_file(connection, file_path, table_name, headers, delimiter,
+                                                       quote_char, escape_char, encoding, copy_format, passthrough,
+                                                       block_size, commit=False, monitor=monitor,
+                                                       projection=projection)
+                            with monitor.phase("commit"):
+                                connection.commit()
+                        monitor.add_rows(rows)
+                    break
+                except (DataError, BinaryEncodingError) as error:
+                    if not self._widen_column(error, table_name, inferred_columns):
+                        raise
+
+        if indexes or primary_key or unique:
+            with monitor.phase("index"):
+                self._create_indexes(table_name, indexes, primary_key, unique, index_workers, maintenance_work_mem)
+        if partition_of is not None:
+            with monitor.phase("index"):
+                index_suffixes = self._create_partition_indexes(table_name, partition_of, index_workers,
+                                                                maintenance_work_mem)
+        if unlogged and create_table:
+            logging.getLogger('CsvLoader').info('Switching table "{}" to LOGGED...'.format(table_name))
+            with self._acquire_connection(monitor) as connection, monitor.phase("set_logged"):
+                cursor = connection.cursor()
+                cursor.execute(self.SET_LOGGED_STMT.format(table_name))
+                connection.commit()
+                cursor.close()
+        if analyze:
+            logging.getLogger('CsvLoader').info('Analyzing table "{}"...'.format(table_name))
+            with self._acquire_connection(monitor) as connection, monitor.phase("analyze"):
+                self._analyze(connection, table_name)
+        if partition_of is not None:
+            with monitor.phase("attach"):
+                try:
+                    self._attach_partition(table_name, partition_name, partition_of, partition, partition_bounds,
+                                           index_suffixes)
+                except Exception:
+                    # the replaced partition stays attached, the table loaded to replace it is not kept
+                    if table_name != partition_name:
+                        with self._acquire_connection(monitor) as connection:
+                            cursor = connection.cursor()
+                            cursor.execute(self.DROP_STMT.format(table_name))
+                            connection.commit()
+                            cursor.close()
+                    raise
+            table_name = partition_name
+
+        result = monitor.finish(timings, merge_counts, rejected=rejected)
+        logging.getLogger('CsvLoader').info(
+            'Finished loading to table "{}": {} rows{}, {:.1f} MB in {:.3f}s ({}).'.format(
+                table_name, result.rows, " ({} rejected)".format(rejected) if quarantine else "",
+                result.bytes_read / (1024 * 1024), result.elapsed,
+                ", ".join("{} {:.3f}s".format(phase, seconds) for phase, seconds in result.phases.items())))
+        return result
+
+    def load_many(self, file_paths, concurrency=DEFAULT_CONCURRENCY, processes=False, file_callback=None,
+                  **load_kwargs):
+        """
+        Loads files at the same time, largest first, each into its own table.
+
+        A file which cannot be loaded is logged and recorded in the result, other files are loaded anyway.
+
+        :param file_paths: list of paths to CSV files
+        :param concurrency: maximum number of files loaded at once
+        :param processes: if True, files are loaded by worker processes, each with its own connections, so parsing
+        on the client (binary format, projection, type detection) is not limited to one CPU. Otherwise threads
+        share connections of the loader's pool
+        :param file_callback: function called with FileOutcome of each file when its load is finished
+        :param load_kwargs: load_data arguments used for every file, e.g. encoding. table_name cannot be given
+        :return: BatchResult with FileOutcome of every file, in the order the loads were started
+        """
+        if "table_name" in load_kwargs:
+            raise ValueError("Tables of many files are named after the files")
+        workers = load_kwargs.get("workers", self.DEFAULT_WORKERS)
+        if processes:
+            if not self._owns_pool:
+                raise ValueError("Worker processes open their own connections and cannot use given pool or "
+                                 "connection")
+        elif self._connection is not None or self._session_connection is not None:
+            concurrency = 1
+        else:
+            max_size = self._max_connections()
+            if max_size and concurrency * workers > max_size:
+                raise ValueError("Loading {} files with {} workers each needs a pool of {} connections, not {}".format(
+                    concurrency, workers, concurrency * workers, max_size))
+
+        started = time.perf_counter()
+        scheduled = largest_first(file_paths)
+        if processes:
+            loader_args = (self._database_host, self._database_port, self._database_name, self._user,
+                           self._password, self._table_prefix)
+            executor = ProcessPoolExecutor(max_workers=concurrency, initializer=_init_process,
+                                           initargs=(loader_args,))
+            load = functools.partial(_load_in_process, load_kwargs=load_kwargs)
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency)
+            load = functools.partial(self.load_data, **load_kwargs)
+
+        logging.getLogger('CsvLoader').info('Loading {} files using {} {}...'.format(
+            len(scheduled), concurrency, "processes" if processes else "threads"))
+        outcomes = {}
+        with executor:
+            futures = {executor.submit(load, file_path): (file_path, size) for file_path, size in scheduled}
+            for future in as_completed(futures):
+                file_path, size = futures[future]
+                try:
+                    outcome = FileOutcome(file_path, size, future.result(), None)
+                except Exception as error:
+                    logging.getLogger('CsvLoader').error('Failed to load "{}": {}'.format(file_path, error))
+                    outcome = FileOutcome(file_path, size, None, error)
+                outcomes[file_path] = outcome
+                if file_callback is not None:
+                    file_callback(outcome)
+
+        result = BatchResult([outcomes[file_path] for file_path, _ in scheduled], time.perf_counter() - started)
+        logging.getLogger('CsvLoader').info(
+            'Finished loading {} files ({} failed): {} rows, {:.1f} MB in {:.3f}s ({:.1f} MB/s).'.format(
+                len(scheduled), len(result.failed), result.rows, result.bytes_read / (1024 * 1024), result.elapsed,
+                result.megabytes_per_second))
+        return result
+
+    def load_directory(self, directory, pattern="*.csv", recursive=False, concurrency=DEFAULT_CONCURRENCY,
+                       processes=False, file_callback=None, **load_kwargs):
+        """
+        Loads files of a directory matching a glob pattern, see load_many.
+
+        :param directory: path to a directory
+        :param pattern: glob pattern of file names, e.g. '*.csv.gz'
+        :param recursive: if True, files in subdirectories are loaded too
+        :param concurrency: maximum number of files loaded at once
+        :param processes: if True, files are loaded by worker processes, otherwise by threads
+        :param file_callback: function called with FileOutcome of each file when its load is finished
+        :param load_kwargs: load_data arguments used for every file
+        :return: BatchResult
+        """
+        return self.load_many(find_files([directory], pattern, recursive), concurrency, processes, file_callback,
+                              **load_kwargs)
+
+    def load_rows(self, rows, columns, table_name, create_table=True, column_types=None,
+                  batch_size=DEFAULT_BATCH_SIZE, block_size=DEFAULT_BLOCK_SIZE, analyze=True,
+                  progress_callback=None, progress_interval=LoadMonitor.DEFAULT_INTERVAL):
+        """
+        Loads rows produced in memory, e.g. by a generator, without writing them to a file.
+
+        Rows are encoded as CSV a batch at a time while COPY reads them, so memory use does not depend on
+        the number of rows. None and empty strings are loaded as NULL.
+
+        :param rows: iterable of rows, each a sequence of values
+        :param columns: a list of column names, simplified the same way as CSV headers
+        :param table_name: a table name
+        :param create_table: if True, table will be created
+        :param column_types: dictionary of column types by simplified column name, used when table is created.
+        Other columns are created as varchar
+        :param batch_size: number of rows encoded at once
+        :param block_size: number of bytes sent to the server at once
+        :param analyze: if True, table statistics are collected after the load
+        :param progress_callback: function called with Progress while rows are sent, at most once per
+        progress_interval seconds, and once when the load is finished
+        :param progress_interval: minimum number of seconds between progress callbacks
+        :return: LoadResult with bytes sent, rows copied and seconds spent in each phase
+        """
+        headers = self._normalize_headers(columns)
+        return self._load_stream(encode_rows(rows, batch_size), headers, table_name, create_table,
+                                 dict(column_types or {}), block_size, analyze, progress_callback,
+                                 progress_interval)
+
+    def load_frame(self, frame, table_name, create_table=True, column_types=None, batch_size=DEFAULT_BATCH_SIZE,
+                   block_size=DEFAULT_BLOCK_SIZE, analyze=True, progress_callback=None,
+                   progress_interval=LoadMonitor.DEFAULT_INTERVAL):
+        """
+        Loads pandas DataFrame or NumPy structured array without writing it to a file.
+
+        The data is encoded as CSV a slice of rows at a time: DataFrames with pandas' CSV writer, structured arrays
+        column by column with vectorized NumPy operations. Columns are created with types matching their dtypes
+        (integer, floating point, boolean and datetime), other columns as varchar. Missing values (None, NaN,
+        NaT) and empty strings are loaded as NULL.
+
+        :param frame: pandas DataFrame or NumPy structured array
+        :param table_name: a table name
+        :param create_table: if True, table will be created
+        :param column_types: dictionary of column types by simplified column name, overriding types of dtypes
+        :param batch_size: number of rows encoded at once
+        :param block_size: number of bytes sent to the server at once
+        :param analyze: if True, table statistics are collected after the load
+        :param progress_callback: function called with Progress while rows are sent, at most once per
+        progress_interval seconds, and once when the load is finished
+        :param progress_interval: minimum number of seconds between progress callbacks
+        :return: LoadResult with bytes sent, rows copied and seconds spent in each phase
+        """
+        if is_frame(frame):
+            batches = encode_frame(frame, batch_size)
+        elif is_structured_array(frame):
+            batches = encode_array(frame, batch_size)
+        else:
+            raise ValueError("Expected pandas DataFrame or NumPy structured array, got {}".format(
+                type(frame).__name__))
+        headers = self._normalize_headers(column_names(frame))
+        types = {column: data_type for column, data_type in zip(headers, postgres_types(frame)) if data_type}
+        types.update(column_types or {})
+        return self._load_stream(batches, headers, table_name, create_table, types, block_size, analyze,
+                                 progress_callback, progress_interval)
+
+    def _load_stream(self, batches, headers, table_name, create_table, column_types, block_size, analyze,
+                     progress_callback=None, progress_interval=LoadMonitor.DEFAULT_INTERVAL):
+        """
+        Copies CSV encoded batches to the database in a single transaction.
+
+        :param batches: iterable of bytes, UTF-8 encoded CSV records without header
+        :param headers: a list of columns
+        :param table_name: a table name
+        :param create_table: if True, table will be created
+        :param column_types: dictionary of column types, missing columns are created as varchar
+        :param block_size: number of bytes sent to the server at once
+        :param analyze: if True, table statistics are collected after the load
+        :param progress_callback: function called with Progress
+        :param progress_interval: minimum number of seconds between progress callbacks
+        :return: LoadResult
+        """
+        monitor = LoadMonitor(table_name, None, progress_callback, progress_interval)
+        command = self._copy_command(table_name, headers, header=False, encoding="utf-8")
+        with self._acquire_connection(monitor) as connection:
+            if create_table:
+                with monitor.phase("create"):
+                    logging.getLogger('CsvLoader').info('Creating table "{}"...'.format(table_name))
+                    self._create_table(connection, headers, table_name, column_types)
+
+            logging.getLogger('CsvLoader').info('Loading data to table "{}"...'.format(table_name))
+            source = RowStreamReader(batches)
+            cursor = connection.cursor()
+            try:
+                with monitor.phase("copy"):
+                    cursor.copy_expert(command, ProgressReader(source, monitor), size=block_size)
+            except Exception as error:
+                connection.rollback()
+                if source.error is not None:
+                    raise source.error from error
+                raise
+            rows = cursor.rowcount
+            with monitor.phase("commit"):
+                connection.commit()
+            cursor.close()
+            monitor.add_rows(rows)
+
+            if analyze:
+                logging.getLogger('CsvLoader').info('Analyzing table "{}"...'.format(table_name))
+                with monitor.phase("analyze"):
+                    self._analyze(connection, table_name)
+
+        result = monitor.finish()
+        logging.getLogger('CsvLoader').info('Finished loading to table "{}": {} rows, {:.1f} MB in {:.3f}s.'.format(
+            table_name, result.rows, result.bytes_read / (1024 * 1024), result.elapsed))
+        return result
+
+    def export_data(self, table_name, file_path, columns=None, where=None, delimiter=DEFAULT_DELIMITER,
+                    quote_char=DEFAULT_QUOTE_CHAR, escape_char=DEFAULT_ESCAPE_CHAR, header=True, encoding="utf-8",
+                    workers=DEFAULT_WORKERS, block_size=DEFAULT_BLOCK_SIZE, progress_callback=None,
+                    progress_interval=LoadMonitor.DEFAULT_INTERVAL):
+        """
+        Exports table, or some of its columns and rows, to a CSV file with COPY TO.
+
+        Data is written as it is received, a block at a time, compressed if the file name ends with .gz, .bz2,
+        .xz or .zst. The file is written under a temporary name and renamed when it is complete.
+
+        With more than one worker, the table is split into ranges of pages (ctid), each exported by its own
+        connection to a part file. All connections use a snapshot exported by the first one, so together they
+        see the table as it was at one moment. The parts are then joined in order, which for compressed files
+        gives a valid multi-stream file. Page ranges are read with TID range scans on PostgreSQL 14+;
+        older servers scan the whole table for every range.
+
+        :param table_name: a table name
+        :param file_path: path to the written CSV file, optionally with compression extension
+        :param columns: list of exported columns, all columns if None
+        :param where: SQL condition of exported rows, e.g. "country = 'Poland'"
+        :param delimiter: a one-character string used to separate fields
+        :param quote_char: a one-character string used to quote fields
+        :param escape_char: a one-character string used to escape quote_char, quote_char if None
+        :param header: if True, the first line contains column names
+        :param encoding: encoding of the file, converted by the server
+        :param workers: number of connections exporting the table in parallel
+        :param block_size: number of bytes written to the file at once
+        :param progress_callback: function called with Progress while data is received, at most once per
+        progress_interval seconds, and once when the export is finished
+        :param progress_interval: minimum number of seconds between progress callbacks
+        :return: LoadResult with bytes received from the server (uncompressed) as bytes_read, rows written and
+        seconds spent in each phase
+        """
+        if workers > 1 and (self._connection is not None or self._session_connection is not None):
+            raise ValueError("Parallel export needs a connection pool, not a single connection")
+        escape_char = None if (escape_char == quote_char) else escape_char
+        workers = max(1, min(workers, self._max_connections() or workers))
+
+        monitor = LoadMonitor(table_name, file_path, progress_callback, progress_interval)
+        columns_def = ", ".join(['"{}"'.format(column) for column in columns]) if columns else "*"
+        export = functools.partial(self._export_range, table_name=table_name, columns_def=columns_def, where=where,
+                                   delimiter=delimiter, quote_char=quote_char, escape_char=escape_char,
+                                   encoding=encoding, compression=compression_of(file_path), block_size=block_size,
+                                   monitor=monitor)
+        part_paths = ["{}.part{}".format(file_path, index) for index in range(workers)]
+        timings = None
+        try:
+            if workers > 1:
+                logging.getLogger('CsvLoader').info('Exporting table "{}" using {} workers...'.format(
+                    table_name, workers))
+                timings = self._export_parallel(table_name, part_paths, header, export, monitor)
+            else:
+                logging.getLogger('CsvLoader').info('Exporting table "{}"...'.format(table_name))
+                with self._acquire_connection(monitor) as connection:
+                    with monitor.phase("copy"):
+                        rows = export(connection, part_paths[0], header=header)
+                    connection.rollback()
+                monitor.add_rows(rows)
+            if workers > 1:
+                with monitor.phase("join"):
+                    self._join_files(part_paths, block_size)
+            os.replace(part_paths[0], file_path)
+        except BaseException:
+            for part_path in part_paths:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+            raise
+
+        result = monitor.finish(timings)
+        logging.getLogger('CsvLoader').info(
+            'Finished exporting table "{}": {} rows, {:.1f} MB in {:.3f}s ({}).'.format(
+                table_name, result.rows, result.bytes_read / (1024 * 1024), result.elapsed,
+                ", ".join("{} {:.3f}s".format(phase, seconds) for phase, seconds in result.phases.items())))
+        return result
+
+    def _export_parallel(self, table_name, part_paths, header, export, monitor):
+        """
+        Exports ranges of table pages to part files, using connections sharing one snapshot.
+
+        The first range is exported by the connection which exported the snapshot, the others by threads.
+
+        :param table_name: a table name
+        :param part_paths: list of paths to part files, one per range
+        :param header: if True, the first part starts with column names
+        :param export: function exporting a range, see _export_range
+        :param monitor: LoadMonitor counting received data
+        :return: list of ChunkTiming, with first and last page of each range as start and end
+        """
+        with self._acquire_connection(monitor) as connection:
+            cursor = connection.cursor()
+            with monitor.phase("snapshot"):
+                cursor.execute(self.REPEATABLE_READ_STMT)
+                cursor.execute(self.EXPORT_SNAPSHOT_STMT)
+                snapshot = cursor.fetchone()[0]
+                # pages added after the snapshot hold only rows it does not see, so the last range is open
+                cursor.execute(self.RELATION_PAGES_STMT, (table_name,))
+                pages = cursor.fetchone()[0]
+            cursor.close()
+            workers = len(part_paths)
+            bounds = [pages * index // workers for index in range(workers)] + [None]
+
+            def export_range(index, range_connection):
+                started = time.perf_counter()
+                rows = export(range_connection, part_paths[index], header=header and index == 0,
+                              first_page=bounds[index] if index > 0 else None, end_page=bounds[index + 1])
+                monitor.add_rows(rows)
+                return ChunkTiming(index, bounds[index], bounds[index + 1], time.perf_counter() - started, rows)
+
+            def export_shared(index):
+                with self._acquire_connection() as range_connection:
+                    range_cursor = range_connection.cursor()
+                    try:
+                        range_cursor.execute(self.REPEATABLE_READ_STMT)
+                        range_cursor.execute(self.SET_SNAPSHOT_STMT, (snapshot,))
+                        return export_range(index, range_connection)
+                    finally:
+                        range_connection.rollback()
+                        range_cursor.close()
+
+            try:
+                with monitor.phase("copy"), ThreadPoolExecutor(max_workers=workers - 1) as executor:
+                    futures = [executor.submit(export_shared, index) for index in range(1, workers)]
+                    timings = [export_range(0, connection)] + [future.result() for future in futures]
+            finally:
+                connection.rollback()
+        for timing in timings:
+            logging.getLogger('CsvLoader').info('Exported pages {}-{} of "{}": {} rows in {:.3f}s'.format(
+                timing.start, "" if timing.end is None else timing.end, table_name, timing.rows, timing.seconds))
+        return timings
+
+    def _export_range(self, connection, part_path, table_name, columns_def, where, delimiter, quote_char,
+                      escape_char, encoding, compression, block_size, monitor, header=True, first_page=None,
+                      end_page=None):
+        """
+        Writes rows of a table, or of a range of its pages, to a file.
+
+        :param connection: open connection
+        :param part_path: path to the written file
+        :param table_name: a table name
+        :param columns_def: list of columns of SELECT
+        :param where: SQL condition of exported rows, None for all rows
+        :param delimiter: a one-character string used to separate fields
+        :param quote_char: a one-character string used to quote fields
+        :param escape_char: a one-character string used to escape quote_char
+        :param encoding: encoding of the file
+        :param compression: compression name returned by compression_of, None for an uncompressed file
+        :param block_size: number of bytes written to the file at once
+        :param monitor: LoadMonitor counting received data
+        :param header: if True, the first line contains column names
+        :param first_page: first page of the range, None to start from the beginning of the table
+        :param end_page: page after the range, None to read to the end of the table
+        :return: number of written rows
+        """
+        conditions = ["({})".format(where)] if where else []
+        if first_page is not None:
+            conditions.append("ctid >= '({},0)'::tid".format(first_page))
+        if end_page is not None:
+            conditions.append("ctid < '({},0)'::tid".format(end_page))
+        query = self.SELECT_STMT.format(columns_def, table_name,
+                                        " WHERE " + " AND ".join(conditions) if conditions else "")
+        options = ["FORMAT csv", "DELIMITER '{}'".format(delimiter), "QUOTE '{}'".format(quote_char),
+                   "ESCAPE '{}'".format(escape_char or quote_char), "ENCODING '{}'".format(self._pg_encoding(encoding))]
+        if header:
+            options.append("HEADER")
+
+        cursor = connection.cursor()
+        with open(part_path, "wb") as raw_file:
+            compressed_file = open_compressed(raw_file, compression) if compression else None
+            writer = io.BufferedWriter(ProgressWriter(compressed_file or raw_file, monitor), block_size)
+            try:
+                cursor.copy_expert(self.EXPORT_STMT.format(query, ", ".join(options)), writer)
+            finally:
+                writer.close()
+        rows = cursor.rowcount
+        cursor.close()
+        return rows
+
+    @staticmethod
+    def _join_files(file_paths, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        Appends files to the first one, removing them.
+
+        :param file_paths: list of paths to files, in order
+        :param block_size: number of bytes copied at once
+        """
+        with open(file_paths[0], "ab") as joined_file:
+            for file_path in file_paths[1:]:
+                with open(file_path, "rb") as part_file:
+                    shutil.copyfileobj(part_file, joined_file, block_size)
+                os.remove(file_path)
 
-        logging.getLogger('CsvLoader').info('Loading data to table "{}"...'.format(table_name))
-        self._copy_from_csv(connection, file_path, table_name, headers, delimiter, quote_char, escape_char, encoding)
+    def _widen_column(self, error, table_name, columns):
+        """
+        Changes type of the column reported by failed COPY to varchar.
 
-        logging.getLogger('CsvLoader').info('Finished loading to table "{}", closing connection.'.format(table_name))
-        connection.close()
+        :param error: DataError raised by COPY or BinaryEncodingError
+        :param table_name: a table name
+        :param columns: columns which may be changed, the changed column is removed
+        :return: True if column was changed and COPY can be repeated
+        """
+        column = self._failed_column(error)
+        if column not in columns:
+            return False
+        columns.discard(column)
+        logging.getLogger('CsvLoader').warning('Value does not fit detected type of column "{}", '
+                                               'changing it to {}: {}'.format(column, self.DEFAULT_DATA_TYPE,
+                                                                             str(error).strip()))
+        with self._acquire_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(self.ALTER_TYPE_STMT.format(table_name, column, self.DEFAULT_DATA_TYPE))
+            connection.commit()
+            cursor.close()
+        return True
 
-    def _read_headers(self, file_path, delimiter=DEFAULT_DELIMITER, quote_char=DEFAULT_QUOTE_CHAR,
-                      escape_char=DEFAULT_ESCAPE_CHAR, encoding="utf-8"):
+    def _fast_load(self, file_path, table_name, headers, column_types, inferred_columns, create_table, unlogged,
+                   delimiter, quote_char, escape_char, encoding, copy_format, passthrough, block_size, monitor=None,
+                   projection=None):
         """
-        Reads CSV header and provides a list of columns.
+        Creates or truncates table and copies data with FREEZE in a single transaction.
+
+        If a value does not fit a detected column type, the whole transaction is repeated with the column
+        created as varchar.
 
         :param file_path: path to a CSV file
-        :param delimiter: a one-character string used to separate fields. It defaults to ','
-        :param quote_char: a one-character string used to quote fields containing special characters,
-        such as the delimiter or quotechar, or which contain new-line characters
+        :param table_name: a table name
+        :param headers: a list of columns
+        :param column_types: dictionary of column types, changed when a column falls back to varchar
+        :param inferred_columns: columns whose type was detected and may fall back to varchar
+        :param create_table: if True, table is created, otherwise it is truncated
+        :param unlogged: if True, table is created as UNLOGGED
+        :param delimiter: a one-character string used to separate fields
+        :param quote_char: a one-character string used to quote fields
         :param escape_char: a one-character string used by the writer to escape the delimiter
-        :param encoding file encoding
-        :return: list of CSV columns
+        :param encoding: file encoding
+        :param copy_format: 'csv' or 'binary'
+        :param passthrough: if True, file is sent as raw bytes
+        :param block_size: number of bytes read from the file at once
+        :param monitor: LoadMonitor counting the load
+        :param projection: Projection of file columns, None to load all of them
         """
-        with open(file_path, "r", encoding=encoding) as csv_file:
-            reader = csv.reader(csv_file, delimiter=delimiter, quotechar=quote_char, escapechar=escape_char)
-            original_headers = next(reader)
-        return original_headers
+        monitor = monitor or LoadMonitor(table_name, file_path)
+        while True:
+            with self._acquire_connection(monitor) as connection:
+                try:
+                    with monitor.phase("create"):
+                        cursor = connection.cursor()
+                        cursor.execute(self.SYNCHRONOUS_COMMIT_OFF_STMT)
+                        if create_table:
+                            logging.getLogger('CsvLoader').info('Creating table "{}"...'.format(table_name))
+                            self._create_table(connection, headers, table_name, column_types, unlogged,
+                                               commit=False)
+                        else:
+                            logging.getLogger('CsvLoader').info('Truncating table "{}"...'.format(table_name))
+                            cursor.execute(self.TRUNCATE_STMT.format(table_name))
+                        cursor.close()
+
+                    logging.getLogger('CsvLoader').info('Loading data to table "{}" with FREEZE...'.format(
+                        table_name))
+                    with monitor.phase("copy"):
+                        rows = self._copy_file(connection, file_path, table_name, headers, delimiter, quote_char,
+                                               escape_char, encoding, copy_format, passthrough, block_size,
+                                               freeze=True, commit=False, monitor=monitor, projection=projection)
+                    with monitor.phase("commit"):
+                        connection.commit()
+                    monitor.add_rows(rows)
+                    return
+                except (DataError, BinaryEncodingError) as error:
+                    connection.rollback()
+                    column = self._failed_column(error)
+                    if column not in inferred_columns:
+                        raise
+                    inferred_columns.discard(column)
+                    column_types[column] = self.DEFAULT_DATA_TYPE
+                    logging.getLogger('CsvLoader').warning(
+                        'Value does not fit detected type of column "{}", changing it to {}: {}'.format(
+                            column, self.DEFAULT_DATA_TYPE, str(error).strip()))
 
-    def _normalize_headers(self, original_headers):
+    def _load_incremental(self, file_path, table_name, headers, column_types, inferred_columns, create_table,
+                          unlogged, manifest, entry, identity, delimiter, quote_char, escape_char, encoding,
+                          copy_format, passthrough, block_size, chunk_size, monitor=None):
         """
-        Simplifies column names:
-        - all uppercase letters are replaced with underscore and lowercase letters.
-        - special characters are replaced with underscore.
+        Loads file in chunks, committing each chunk together with its end offset in the manifest.
 
-        :param original_headers: list of CSV columns
-        :return: simplified headers
+        :param file_path: path to a CSV file
+        :param table_name: a table name
+        :param headers: a list of columns
+        :param column_types: dictionary of column types
+        :param inferred_columns: columns whose type was detected and may fall back to varchar
+        :param create_table: if True, table is created, replacing the table of a previous load of the file
+        :param unlogged: if True, table is created as UNLOGGED
+        :param manifest: Manifest
+        :param entry: ManifestEntry of a previous load of the file or None
+        :param identity: FileIdentity of the file
+        :param delimiter: a one-character string used to separate fields
+        :param quote_char: a one-character string used to quote fields
+        :param escape_char: a one-character string used by the writer to escape the delimiter
+        :param encoding: file encoding
+        :param copy_format: 'csv' or 'binary'
+        :param passthrough: if True, compressed file is sent as raw bytes
+        :param block_size: number of bytes read from the file at once
+        :param chunk_size: number of bytes committed at once
+        :param monitor: LoadMonitor counting the load
+        """
+        monitor = monitor or LoadMonitor(table_name, file_path)
+        file_key = os.path.abspath(file_path)
+        compressed = compression_of(file_path)
+        if Manifest.matches(entry, identity):
+            offset = entry.committed_offset
+            logging.getLogger('CsvLoader').info('Resuming load of "{}" from byte {}...'.format(file_path, offset))
+        else:
+            offset = 0 if compressed else find_record_boundaries(file_path, [0], quote_char, escape_char,
+                                                                   encoding)[0]
+            with self._acquire_connection(monitor) as connection, monitor.phase("create"):
+                if create_table:
+                    logging.getLogger('CsvLoader').info('Creating table "{}"...'.format(table_name))
+                    if entry is not None:
+                        cursor = connection.cursor()
+                        cursor.execute(self.DROP_STMT.format(table_name))
+                        cursor.close()
+                    self._create_table(connection, headers, table_name, column_types, unlogged, commit=False)
+                manifest.start(connection, file_key, table_name, identity, offset)
+                connection.commit()
+
+        if compressed:
+            chunks = [(None, identity.size)]
+        else:
+            targets = list(range(offset + chunk_size, identity.size, chunk_size))
+            boundaries = find_record_boundaries(file_path, targets, quote_char, escape_char, encoding)
+            chunks = []
+            for end in boundaries + [identity.size]:
+                if end > offset:
+                    chunks.append((offset, end))
+                    offset = end
+        command = self._copy_command(table_name, headers, delimiter, quote_char, escape_char, header=False,
+                                     encoding=encoding)
+
+        for index, (start, end) in enumerate(chunks):
+            while True:
+                try:
+                    with self._acquire_connection(monitor) as connection:
+                        with monitor.phase("copy"):
+                            if start is None:
+                                rows = self._copy_file(connection, file_path, table_name, headers, delimiter,
+                                                       quote_char, escape_char, encoding, copy_format, passthrough,
+                                                       block_size, commit=False, monitor=monitor)
+                            elif copy_format == "binary":
+                                rows = self._copy_binary(connection, file_path, table_name, headers, delimiter,
+                                                         quote_char, escape_char, encoding, start, end, commit=False,
+                                                         block_size=block_size, monitor=monitor)
+                            else:
+                                rows = self._copy_csv_range(connection, file_path, command, start, end, block_size,
+                                                            monitor)
+                        with monitor.phase("commit"):
+                            manifest.commit_offset(connection, file_key, end, completed=index == len(chunks) - 1)
+                            connection.commit()
+                    monitor.add_rows(rows)
+                    break
+                except (DataError, BinaryEncodingError) as error:
+                    if not self._widen_column(error, table_name, inferred_columns):
+                        raise
+            logging.getLogger('CsvLoader').info('Committed chunk {}/{} of "{}" up to byte {}.'.format(
+                index + 1, len(chunks), file_path, end))
+        if not chunks:
+            with self._acquire_connection(monitor) as connection:
+                manifest.commit_offset(connection, file_key, identity.size, completed=True)
+                connection.commit()
+
+    def _load_quarantined(self, file_path, table_name, headers, column_types, inferred_columns, create_table,
+                          unlogged, rejects, delimiter, quote_char, escape_char, encoding, block_size, chunk_size,
+                          monitor=None):
+        """
+        Loads file in committed chunks, rejecting rows which cannot be loaded instead of failing.
+
+        :param file_path: path to a CSV file
+        :param table_name: a table name
+        :param headers: a list of columns
+        :param column_types: dictionary of column types
+        :param inferred_columns: columns whose type was detected and may fall back to varchar
+        :param create_table: if True, table will be created
+        :param unlogged: if True, table is created as UNLOGGED
+        :param rejects: RejectWriter
+        :param delimiter: a one-character string used to separate fields
+        :param quote_char: a one-character string used to quote fields
+        :param escape_char: a one-character string used by the writer to escape the delimiter
+        :param encoding: file encoding
+        :param block_size: number of bytes read from the file at once
+        :param chunk_size: number of bytes committed at once
+        :param monitor: LoadMonitor counting the load
         """
-        headers = [self._simplify_text(header) for header in original_headers]
-        return headers
+        monitor = monitor or LoadMonitor(table_name, file_path)
+        with self._acquire_connection(monitor) as connection, monitor.phase("create"):
+            if create_table:
+                logging.getLogger('CsvLoader').info('Creating table "{}"...'.format(table_name))
+                self._create_table(connection, headers, table_name, column_types, unlogged, commit=False)
+            rejects.create(connection)
+            connection.commit()
+            on_error = "ignore" if connection.server_version >= self.ON_ERROR_VERSION else None
+
+        offset = find_record_boundaries(file_path, [0], quote_char, escape_char, encoding)[0]
+        file_size = os.path.getsize(file_path)
+        targets = list(range(offset + chunk_size, file_size, chunk_size))
+        # a failing command, and a command skipping rows of wrong type, which are then not seen by type fallback
+        commands = (self._copy_command(table_name, headers, delimiter, quote_char, escape_char, header=False,
+                                       encoding=encoding),
+                    self._copy_command(table_name, headers, delimiter, quote_char, escape_char, header=False,
+                                       encoding=encoding, on_error=on_error) if on_error else None)
+        boundaries = find_record_boundaries(file_path, targets, quote_char, escape_char, encoding)
+        lines = LineCounter(file_path)
+        for end in boundaries + [file_size]:
+            if end > offset:
+                self._copy_quarantined(file_path, table_name, commands, offset, end, inferred_columns, rejects,
+                                       lines, quote_char, escape_char, encoding, block_size, monitor)
+                offset = end
 
-    def _generate_table_name(self, file_path):
+    def _copy_quarantined(self, file_path, table_name, commands, start, end, inferred_columns, rejects, lines,
+                          quote_char, escape_char, encoding, block_size, monitor, reread=False):
         """
-        Generates table name based on CSV file name.
+        Copies and commits a byte range of records. If it fails, the range is split in two halves at a record
+        boundary and both are copied the same way, until the failing record is alone and can be rejected.
 
         :param file_path: path to a CSV file
-        :return: generated table name
+        :param table_name: a table name
+        :param commands: tuple of COPY command and COPY command skipping rows with values of wrong type,
+        None if the server cannot skip them
+        :param start: first byte of the range, at a record start
+        :param end: byte after the last byte of the range
+        :param inferred_columns: columns whose type was detected and may fall back to varchar
+        :param rejects: RejectWriter
+        :param lines: LineCounter of the file
+        :param quote_char: a one-character string used to quote fields
+        :param escape_char: a one-character string used by the writer to escape the delimiter
+        :param encoding: file encoding
+        :param block_size: number of bytes read from the file at once
+        :param monitor: LoadMonitor counting the load
+        :param reread: if True, the range was already counted by monitor
         """
-        base = os.path.splitext(os.path.basename(file_path))[0]
-        return self._table_prefix + CsvLoader._simplify_text(base)
+        error = self._try_copy_range(file_path, table_name, commands, start, end, inferred_columns, rejects, lines,
+                                     encoding, block_size, monitor, reread)
+        if error is None:
+            return
+        first_end = find_record_boundaries(file_path, [start], quote_char, escape_char, encoding, start=start)[0]
+        if first_end >= end:
+            with open(file_path, "rb") as csv_file:
+                csv_file.seek(start)
+                record = csv_file.read(end - start).decode(encoding, errors="replace").rstrip("\r\n")
+            with self._acquire_connection(monitor) as connection:
+                rejects.write(connection, Reject(lines.line_at(start), self._reject_error(error), record))
+                connection.commit()
+            return
+        middle = find_record_boundaries(file_path, [(start + end) // 2], quote_char, escape_char, encoding,
+                                        start=start)[0]
+        if middle >= end:
+            middle = first_end
+        logging.getLogger('CsvLoader').info('Splitting bytes {}-{} of "{}" to find rejected rows...'.format(
+            start, end, file_path))
+        for range_start, range_end in ((start, middle), (middle, end)):
+            self._copy_quarantined(file_path, table_name, commands, range_start, range_end, inferred_columns,
+                                   rejects, lines, quote_char, escape_char, encoding, block_size, monitor, True)
 
-    def _create_table(self, connection, headers, table_name):
+    def _try_copy_range(self, file_path, table_name, commands, start, end, inferred_columns, rejects, lines,
+                        encoding, block_size, monitor, reread=False):
         """
-        Creates database table.
+        Copies and commits a byte range of records, together with rows reported as skipped by the server.
+
+        Rows are skipped by the server only when no column can fall back to varchar, otherwise a value which does
+        not fit a detected type would be rejected instead of changing the column.
+
+        :param file_path: path to a CSV file
+        :param table_name: a table name
+        :param commands: tuple of COPY command and COPY command skipping rows with values of wrong type,
+        None if the server cannot skip them
+        :param start: first byte of the range
+        :param end: byte after the last byte of the range
+        :param inferred_columns: columns whose type was detected and may fall back to varchar
+        :param rejects: RejectWriter
+        :param lines: LineCounter of the file
+        :param encoding: file encoding
+        :param block_size: number of bytes read from the file at once
+        :param monitor: LoadMonitor counting the load
+        :param reread: if True, the range was already counted by monitor
+        :return: None if the range was committed, otherwise DataError or IntegrityError raised by COPY
+        """
+        while True:
+            command = commands[0] if inferred_columns or commands[1] is None else commands[1]
+            with self._acquire_connection(monitor) as connection:
+                # psycopg2 keeps only the last 50 notices of a list, a deque keeps all of them
+                notices, connection.notices = connection.notices, deque()
+                try:
+                    with monitor.phase("copy"):
+                        rows = self._copy_csv_range(connection, file_path, command, start, end, block_size,
+                                                    None if reread else monitor)
+                    for notice in connection.notices:
+                        skipped = self.SKIPPED_ROW_NOTICE.search(notice)
+                        if skipped:
+                            line = lines.line_at(start) + int(skipped.group(1)) - 1
+                            record = self._read_line(file_path, lines.offset_of(line), encoding)
+                            rejects.write(connection, Reject(line, skipped.group(0).strip(), record))
+                    with monitor.phase("commit"):
+                        connection.commit()
+                except (DataError, IntegrityError) as error:
+                    connection.rollback()
+                    if self._widen_column(error, table_name, inferred_columns):
+                        continue
+                    return error
+                except Exception:
+                    connection.rollback()
+                    raise
+                finally:
+                    connection.notices = notices
+            monitor.add_rows(rows)
+            return None
+
+    @staticmethod
+    def _read_line(file_path, offset, encoding):
+        """
+        Reads a single line of a file.
+
+        :param file_path: path to a file
+        :param offset: offset of the line start
+        :param encoding: file encoding
+        :return: line without new line characters
+        """
+        with open(file_path, "rb") as text_file:
+            text_file.seek(offset)
+            return text_file.readline().decode(encoding, errors="replace").rstrip("\r\n")
+
+    def _reject_error(self, error):
+        """
+        Describes error of a rejected row without the line number, which refers to the copied range.
+
+        :param error: DataError or IntegrityError raised by COPY
+        :return: error message with column name, if it is known
+        """
+        message = (error.diag.message_primary or str(error)).strip()
+        column = self._failed_column(error)
+        return '{} (column "{}")'.format(message, column) if column else message
+
+    def _merge(self, file_path, table_name, headers, merge_key, delete_missing, merge_method, delimiter, quote_char,
+               escape_char, encoding, copy_format, passthrough, block_size, monitor=None):
+        """
+        Copies file to a temporary staging table and merges it into the table in a single transaction.
+
+        :param file_path: path to a CSV file
+        :param table_name: a table name
+        :param headers: a list of columns
+        :param merge_key: column name or list of column names identifying rows
+        :param delete_missing: if True, rows whose key is not in the file are deleted
+        :param merge_method: 'upsert', 'merge' or None to choose by available indexes
+        :param delimiter: a one-character string used to separate fields
+        :param quote_char: a one-character string used to quote fields
+        :param escape_char: a one-character string used by the writer to escape the delimiter
+        :param encoding: file encoding
+        :param copy_format: 'csv' or 'binary'
+        :param passthrough: if True, file is sent as raw bytes
+        :param block_size: number of bytes read from the file at once
+        :param monitor: LoadMonitor counting the load
+        :return: MergeCounts
+        """
+        monitor = monitor or LoadMonitor(table_name, file_path)
+        keys = self._column_list(merge_key)
+        # temporary tables are created in their own schema, never in the schema of the target table
+        staging_name = self._index_name(table_name.rpartition(".")[2], [], "staging")
+
+        with self._acquire_connection(monitor) as connection:
+            if copy_format == "binary" and connection.encoding != "UTF8":
+                # client encoding cannot change inside a transaction
+                connection.set_client_encoding("UTF8")
+            cursor = connection.cursor()
+            logging.getLogger('CsvLoader').info('Loading data to staging table "{}"...'.format(staging_name))
+            with monitor.phase("copy"):
+                cursor.execute(self.STAGING_STMT.format(staging_name, table_name))
+                rows = self._copy_file(connection, file_path, staging_name, headers, delimiter, quote_char,
+                                       escape_char, encoding, copy_format, passthrough, block_size, commit=False,
+                                       monitor=monitor)
+                cursor.execute(self.ANALYZE_STMT.format(staging_name))
+
+            if merge_method is None:
+                merge_method = "upsert" if self._has_unique_index(connection, table_name, keys) else "merge"
+            logging.getLogger('CsvLoader').info('Merging "{}" into table "{}" using {}...'.format(
+                staging_name, table_name, merge_method))
+            with monitor.phase("merge"):
+                counts = self._apply_merge(connection, table_name, staging_name, headers, keys, delete_missing,
+                                           merge_method)
+            with monitor.phase("commit"):
+                connection.commit()
+            cursor.close()
+        monitor.add_rows(rows)
+
+        logging.getLogger('CsvLoader').info('Merged into table "{}": {} inserted, {} updated, {} deleted.'.format(
+            table_name, counts.inserted, counts.updated, counts.deleted))
+        return counts
+
+    def _apply_merge(self, connection, table_name, staging_name, headers, keys, delete_missing, merge_method):
+        """
+        Merges staging table into the table, without committing.
 
         :param connection: open connection
+        :param table_name: a table name
+        :param staging_name: name of staging table
         :param headers: a list of columns
+        :param keys: list of key columns
+        :param delete_missing: if True, rows whose key is not in staging table are deleted
+        :param merge_method: 'upsert' or 'merge'
+        :return: MergeCounts
+        """
+        columns = ",".join(['"{}"'.format(column) for column in headers])
+        condition = " AND ".join(['t."{0}" = s."{0}"'.format(key) for key in keys])
+        assignments = ", ".join(['"{0}" = {1}."{0}"'.format(column, "EXCLUDED" if merge_method == "upsert" else "s")
+                                 for column in headers if column not in keys])
+
+        cursor = connection.cursor()
+        deleted = 0
+        if delete_missing:
+            cursor.execute(self.DELETE_MISSING_STMT.format(table_name, staging_name, condition))
+            deleted = cursor.rowcount
+
+        if merge_method == "upsert":
+            action = "UPDATE SET " + assignments if assignments else "NOTHING"
+            cursor.execute(self.UPSERT_STMT.format(table_name, columns, columns, staging_name,
+                                                   ",".join(['"{}"'.format(key) for key in keys]), action))
+            inserted, updated = cursor.fetchone()
+        else:
+            if connection.server_version < 150000:
+                raise ValueError("MERGE needs PostgreSQL 15 or later, add a unique index on the merge key")
+            updated = 0
+            matched = ""
+            if assignments:
+                # MERGE reports only the total, so matching rows are counted first
+                cursor.execute(self.MATCHED_COUNT_STMT.format(staging_name, table_name, condition))
+                updated = cursor.fetchone()[0]
+                matched = "WHEN MATCHED THEN UPDATE SET {} ".format(assignments)
+            values = ",".join(['s."{}"'.format(column) for column in headers])
+            cursor.execute(self.MERGE_STMT.format(table_name, staging_name, condition, matched, columns, values))
+            inserted = cursor.rowcount - updated
+        cursor.close()
+        return MergeCounts(inserted, updated, deleted)
+
+    def _partition_key(self, connection, table_name):
+        """
+        Provides partitioning strategy and key column of a partitioned table.
+
+        :param connection: open connection
+        :param table_name: name of a partitioned table
+        :return: tuple of strategy ('r' for range, 'l' for list) and key column name
+        :raise ValueError: if table is not partitioned by range or list of a single column
+        """
+        cursor = connection.cursor()
+        cursor.execute(self.PARTITION_KEY_STMT, (table_name,))
+        row = cursor.fetchone()
+        connection.commit()
+        cursor.close()
+        if row is None:
+            raise ValueError("Table {} is not partitioned".format(table_name))
+        strategy, key_columns, key = row
+        if strategy not in self.PARTITION_STRATEGIES or key_columns != 1 or key is None:
+            raise ValueError("Table {} is not partitioned by range or list of a single column".format(table_name))
+        return strategy, key
+
+    def _create_partition_table(self, connection, table_name, partitioned_table, unlogged=False):
+        """
+        Creates table with columns, defaults and constraints of a partitioned table.
+
+        :param connection: open connection
+        :param table_name: a table name
+        :param partitioned_table: name of a partitioned table
+        :param unlogged: if True, table is created as UNLOGGED
+        """
+        cursor = connection.cursor()
+        cursor.execute(self.PARTITION_TABLE_STMT.format("UNLOGGED " if unlogged else "", table_name,
+                                                        partitioned_table))
+        connection.commit()
+        cursor.close()
+
+    def _create_partition_indexes(self, table_name, partitioned_table, index_workers=1, maintenance_work_mem=None):
+        """
+        Builds indexes and constraints of a partitioned table on a table to be attached, so attaching only
+        matches them. A partitioned index backing a primary key or a unique constraint matches only an index
+        backing the same constraint.
+
+        Indexes are named like those of the partitioned table, with the table name replaced,
+        e.g. parent_country_idx becomes table_country_idx.
+
         :param table_name: a table name
+        :param partitioned_table: name of a partitioned table
+        :param index_workers: number of connections building indexes at the same time
+        :param maintenance_work_mem: memory used to build each index, e.g. '1GB'
+        :return: list of index name suffixes, e.g. ['pkey', 'country_idx']
+        """
+        parent_prefix = partitioned_table.rpartition(".")[2] + "_"
+        with self._acquire_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(self.PARTITIONED_INDEXES_STMT, (partitioned_table,))
+            suffixes = []
+            definitions = []
+            for index_name, definition, constraint_type in cursor.fetchall():
+                match = self.PARTITIONED_INDEX_DEF.match(definition)
+                if match:
+                    suffix = index_name[len(parent_prefix):] if index_name.startswith(parent_prefix) else index_name
+                    suffixes.append(suffix)
+                    definitions.append((self._index_name(table_name, [], suffix), bool(match.group(1)),
+                                        match.group(2), {"p": "PRIMARY KEY", "u": "UNIQUE"}.get(constraint_type)))
+            connection.commit()
+            cursor.close()
+        if definitions:
+            self._create_indexes(table_name, index_workers=index_workers, maintenance_work_mem=maintenance_work_mem,
+                                 definitions=definitions)
+        return suffixes
+
+    def _attach_partition(self, table_name, partition_name, partitioned_table, partition, bounds,
+                          index_suffixes=()):
         """
-        columns = ['"{}" {}'.format(column, self.DEFAULT_DATA_TYPE) for column in headers]
-        columns_def = ",".join(columns)
+        Attaches loaded table as a partition, replacing existing partition if the table was loaded under
+        another name.
+
+        Rows are first validated by a CHECK constraint matching the bounds, which scans only the loaded table.
+        ATTACH PARTITION then finds the partition constraint implied by it and does not scan the table while
+        holding a lock on the partitioned table. The CHECK constraint is dropped afterwards.
 
+        :param table_name: name of the loaded table
+        :param partition_name: name of the partition, different from table_name when replacing a partition
+        :param partitioned_table: name of a partitioned table
+        :param partition: tuple of strategy and key column, see _partition_key
+        :param bounds: (from, to) tuple for range partitioning, list of values for list partitioning
+        :param index_suffixes: suffixes of index names, see _create_partition_indexes. When replacing
+        a partition, indexes are renamed after the table
+        """
+        strategy, key = partition
+        bound, bound_params, check, check_params = self._partition_bound(strategy, key, bounds)
+        check_name = self._index_name(table_name.rpartition(".")[2], [], "bound")
+
+        with self._acquire_connection() as connection:
+            cursor = connection.cursor()
+            logging.getLogger('CsvLoader').info('Validating bounds of table "{}"...'.format(table_name))
+            cursor.execute(self.ADD_CHECK_STMT.format(table_name, check_name, check), check_params)
+            connection.commit()
+
+            logging.getLogger('CsvLoader').info('Attaching table "{}" to "{}"...'.format(partition_name,
+                                                                                       partitioned_table))
+            if table_name != partition_name:
+                cursor.execute(self.PARTITION_PARENT_STMT, (partition_name,))
+                if cursor.fetchone() is not None:
+                    cursor.execute(self.DETACH_PARTITION_STMT.format(partitioned_table, partition_name))
+                cursor.execute(self.DROP_STMT.format(partition_name))
+                schema, _, partition_base = partition_name.rpartition(".")
+                cursor.execute(self.RENAME_STMT.format(table_name, partition_base))
+                for suffix in index_suffixes:
+                    index_name = self._index_name(table_name.rpartition(".")[2], [], suffix)
+                    cursor.execute(self.RENAME_INDEX_STMT.format(
+                        '{}"{}"'.format(schema + "." if schema else "", index_name),
+                        self._index_name(partition_base, [], suffix)))
+            cursor.execute(self.ATTACH_PARTITION_STMT.format(partitioned_table, partition_name, bound), bound_params)
+            cursor.execute(self.DROP_CONSTRAINT_STMT.format(partition_name, check_name))
+            connection.commit()
+            cursor.close()
+
+    def _partition_bound(self, strategy, key, bounds):
+        """
+        Builds partition bound clause and CHECK constraint accepting the same rows.
+
+        :param strategy: 'r' for range, 'l' for list
+        :param key: partition key column
+        :param bounds: (from, to) tuple for range partitioning, list of values for list partitioning
+        :return: tuple of bound clause, its parameters, CHECK condition and its parameters
+        """
+        column = '"{}"'.format(key)
+        if strategy == "r":
+            lower, upper = bounds
+            bound = "FROM ({}) TO ({})".format("MINVALUE" if lower is None else "%s",
+                                                "MAXVALUE" if upper is None else "%s")
+            conditions = ["{} IS NOT NULL".format(column)]
+            if lower is not None:
+                conditions.append("{} >= %s".format(column))
+            if upper is not None:
+                conditions.append("{} < %s".format(column))
+            params = [value for value in (lower, upper) if value is not None]
+            return bound, params, " AND ".join(conditions), params
+
+        values = list(bounds)
+        if not values:
+            raise ValueError("List partition needs at least one value")
+        present = [value for value in values if value is not None]
+        conditions = []
+        if present:
+            conditions.append("{} IN ({})".format(column, ", ".join(["%s"] * len(present))))
+        if len(present) < len(values):
+            conditions.append("{} IS NULL".format(column))
+        bound = "IN ({})".format(", ".join(["%s"] * len(values)))
+        return bound, values, " OR ".join(conditions), present
+
+    def _table_exists(self, connection, table_name):
+        """
+        Checks whether table exists.
+
+        :param connection: open connection
+        :param table_name: a table name
+        :return: True if table exists
+        """
         cursor = connection.cursor()
-        cursor.execute(self.CREATE_STMT.format(table_name, columns_def))
+        cursor.execute(self.TABLE_EXISTS_STMT, (table_name,))
+        exists = cursor.fetchone()[0]
         connection.commit()
         cursor.close()
+        return exists
+
+    def _has_unique_index(self, connection, table_name, columns):
+        """
+        Checks whether table has a unique index on exactly given columns, usable by ON CONFLICT.
+
+        :param connection: open connection
+        :param table_name: a table name
+        :param columns: list of columns
+        :return: True if such index exists
+        """
+        cursor = connection.cursor()
+        cursor.execute(self.UNIQUE_INDEXES_STMT, (table_name,))
+        indexes = [set(index_columns) for index_columns, in cursor.fetchall()]
+        cursor.close()
+        return set(columns) in indexes
 
-    def _copy_from_csv(self, connection, file_path, table_name, headers, delimiter, quote_char, escape_char, encoding):
+    def _copy_file(self, connection, file_path, table_name, headers, delimiter, quote_char, escape_char, encoding,
+                   copy_format="csv", passthrough=False, block_size=DEFAULT_BLOCK_SIZE, freeze=False, commit=True,
+                   monitor=None, projection=None):
+        """
+        Copies whole CSV file in given format.
+
+        :param connection: open connection
+        :param file_path: path to a CSV file
+        :param table_name: a table name
+        :param headers: a list of columns
+        :param delimiter: a one-character string used to separate fields
+        :param quote_char: a one-character string used to quote fields
+        :param escape_char: a one-character string used by the writer to escape the delimiter
+        :param encoding: file encoding
+        :param copy_format: 'csv' or 'binary'
+        :param passthrough: if True, file is sent as raw bytes
+        :param block_size: number of bytes read from the file at once
+        :param freeze: if True, rows are copied with FREEZE option
+        :param commit: if True, transaction is committed
+        :param monitor: LoadMonitor counting data read from the file
+        :param projection: Projection of file columns, None to send the file as it is
+        :return: number of copied rows
+        """
+        if projection is not None:
+            return self._copy_projected(connection, file_path, table_name, projection, delimiter, quote_char,
+                                        escape_char, encoding, block_size, freeze=freeze, commit=commit,
+                                        monitor=monitor)
+        if copy_format == "binary":
+            return self._copy_binary(connection, file_path, table_name, headers, delimiter, quote_char, escape_char,
+                                     encoding, commit=commit, block_size=block_size, freeze=freeze, monitor=monitor)
+        return self._copy_from_csv(connection, file_path, table_name, headers, delimiter, quote_char, escape_char,
+                                   encoding, passthrough, block_size, freeze=freeze, commit=commit, monitor=monitor)
+
+    def _create_table(self, connection, headers, table_name, column_types=None, unlogged=False, commit=True):
+        """
+        Creates database table.
+
+        :param connection: open connection
+        :param headers: a list of columns
+        :param table_name: a table name
+        :param column_types: dictionary of column types, missing columns are created as varchar
+        :param unlogged: if True, table is created as UNLOGGED
+        :param commit: if True, transaction is committed
+        """
+        cursor = connection.cursor()
+        cursor.execute(self._create_table_statement(headers, table_name, column_types, unlogged))
+        if commit:
+            connection.commit()
+        cursor.close()
+
+    def _copy_from_csv(self, connection, file_path, table_name, headers, delimiter, quote_char, escape_char, encoding,
+                       passthrough=False, block_size=DEFAULT_BLOCK_SIZE, freeze=False, commit=True, monitor=None):
         """
         Copies data from CSV to database.
 
@@ -149,42 +1568,513 @@ class CsvLoader(object):
         such as the delimiter or quotechar, or which contain new-line characters
         :param escape_char: a one-character string used by the writer to escape the delimiter
         :param encoding file encoding
+        :param passthrough: if True, file is sent as raw bytes with COPY ENCODING option
+        :param block_size: number of bytes read from the file at once
+        :param freeze: if True, rows are copied with FREEZE option
+        :param commit: if True, transaction is committed, otherwise it is left open, also after a failure
+        :param monitor: LoadMonitor counting data read from the file
+        :return: number of copied rows
         """
-        columns = ['"{}"'.format(column) for column in headers]
-        columns_def = ",".join(columns)
-
-        copy_from_escape_char = escape_char or quote_char  # use quote if escape is None
-        command = self.COPY_STMT.format(table_name, columns_def, delimiter,
-                                        quote_char, copy_from_escape_char)
-        # https://www.postgresql.org/docs/current/static/sql-copy.html
+        command = self._copy_command(table_name, headers, delimiter, quote_char, escape_char,
+                                     encoding=encoding if passthrough else None, freeze=freeze)
+        monitor = monitor or LoadMonitor(table_name, file_path)
 
         cursor = connection.cursor()
-        with open(file_path, "r", encoding=encoding) as csv_file:
+        decompressing_reader = None
+        if compression_of(file_path):
+            decompressing_reader = DecompressingReader(file_path, block_size=block_size)
+            raw_file = ProgressReader(decompressing_reader, monitor)
+        else:
+            raw_file = ProgressReader(open(file_path, "rb", buffering=0), monitor)
+        if passthrough:
+            csv_file = raw_file
+        else:
+            csv_file = io.TextIOWrapper(io.BufferedReader(raw_file, block_size), encoding=encoding)
+        with csv_file:
             # cursor.copy_from(csv_file, table_name, columns=headers, sep=delimiter)
-            cursor.copy_expert(command, csv_file)
+            try:
+                cursor.copy_expert(command, csv_file, size=block_size)
+            except Exception:
+                if commit:
+                    connection.rollback()
+                raise
+            rows = cursor.rowcount
+            if commit:
+                connection.commit()
+            if decompressing_reader is not None:
+                decompressing_reader.log_throughput(table_name)
+        cursor.close()
+        return rows
+
+    def _copy_projected(self, connection, file_path, table_name, projection, delimiter, quote_char, escape_char,
+                        encoding, block_size=DEFAULT_BLOCK_SIZE, freeze=False, commit=True, monitor=None):
+        """
+        Copies projected columns of accepted records. The file is parsed on the client and selected fields are
+        encoded again as UTF-8 CSV, a batch of records at a time.
+
+        :param connection: open connection
+        :param file_path: path to a CSV file
+        :param table_name: a table name
+        :param projection: Projection of file columns
+        :param delimiter: a one-character string used to separate fields
+        :param quote_char: a one-character string used to quote fields
+        :param escape_char: a one-character string used by the writer to escape the delimiter
+        :param encoding: file encoding
+        :param block_size: number of bytes read from the file and sent to the server at once
+        :param freeze: if True, rows are copied with FREEZE option
+        :param commit: if True, transaction is committed, otherwise it is left open, also after a failure
+        :param monitor: LoadMonitor counting data read from the file
+        :return: number of copied rows
+        """
+        command = self._copy_command(table_name, projection.headers, header=False, encoding="utf-8", freeze=freeze)
+        monitor = monitor or LoadMonitor(table_name, file_path)
+
+        if compression_of(file_path):
+            raw_file = ProgressReader(DecompressingReader(file_path, block_size=block_size), monitor)
+        else:
+            raw_file = ProgressReader(open(file_path, "rb", buffering=0), monitor)
+        cursor = connection.cursor()
+        with io.TextIOWrapper(io.BufferedReader(raw_file, block_size), encoding=encoding, newline='') as csv_file:
+            records = csv.reader(csv_file, delimiter=delimiter, quotechar=quote_char, escapechar=escape_char)
+            next(records, None)
+            source = RowStreamReader(projection.encode(records))
+            try:
+                cursor.copy_expert(command, source, size=block_size)
+            except Exception as error:
+                if commit:
+                    connection.rollback()
+                if source.error is not None:
+                    raise source.error from error
+                raise
+        rows = cursor.rowcount
+        if commit:
             connection.commit()
+        cursor.close()
+        return rows
 
-    def _create_index(self, original_header):
-        # TODO: implement indexing
-        pass
+    def _copy_binary(self, connection, file_path, table_name, headers, delimiter, quote_char, escape_char, encoding,
+                     start=None, end=None, commit=True, block_size=DEFAULT_BLOCK_SIZE, freeze=False, monitor=None):
+        """
+        Parses CSV on the client and copies values to database in binary format.
 
-    @staticmethod
-    def _simplify_text(text):
+        :param connection: open connection
+        :param file_path: path to a CSV file
+        :param table_name: a table name
+        :param headers: a list of columns
+        :param delimiter: a one-character string used to separate fields
+        :param quote_char: a one-character string used to quote fields
+        :param escape_char: a one-character string used by the writer to escape the delimiter
+        :param encoding: file encoding
+        :param start: first byte of a range of records, None to copy the whole file skipping the header
+        :param end: byte after the last byte of the range
+        :param commit: if True, transaction is committed, otherwise it is left open, also after a failure
+        :param block_size: number of bytes read from the file and sent to the server at once
+        :param freeze: if True, rows are copied with FREEZE option
+        :param monitor: LoadMonitor counting data read from the file
+        :return: number of copied rows
         """
-        Simplifies text:
-        - all uppercase letters are replaced with underscore and lowercase letters.
-        - special characters are replaced with underscore.
+        command = self._copy_command(table_name, headers, copy_format="binary", freeze=freeze)
+        type_names = self._table_type_names(connection, table_name, headers)
+        time_zone = self._session_time_zone(connection) if "timestamptz" in type_names else None
+        monitor = monitor or LoadMonitor(table_name, file_path)
+
+        if start is not None:
+            csv_source = FileRange(file_path, start, end)
+        elif compression_of(file_path):
+            csv_source = DecompressingReader(file_path, block_size=block_size)
+        else:
+            csv_source = FileRange(file_path, 0, os.path.getsize(file_path))
+        csv_source = ProgressReader(csv_source, monitor)
+        if connection.encoding != "UTF8":
+            connection.set_client_encoding("UTF8")
+        cursor = connection.cursor()
+        with io.TextIOWrapper(io.BufferedReader(csv_source, block_size), encoding=encoding,
+                              newline='') as csv_file:
+            reader = csv.reader(csv_file, delimiter=delimiter, quotechar=quote_char, escapechar=escape_char)
+            if not start:
+                next(reader, None)
+            source = BinaryCopyReader(reader, headers, type_names, block_size, time_zone)
+            try:
+                cursor.copy_expert(command, source, size=block_size)
+            except Exception as error:
+                if commit:
+                    connection.rollback()
+                if source.error is not None:
+                    raise source.error from error
+                raise
+        rows = cursor.rowcount
+        if commit:
+            connection.commit()
+        cursor.close()
+        return rows
+
+    def _table_type_names(self, connection, table_name, headers):
+        """
+        Reads types of table columns.
+
+        :param connection: open connection
+        :param table_name: a table name
+        :param headers: a list of columns
+        :return: list of pg_type.typname, one per column
+        """
+        cursor = connection.cursor()
+        cursor.execute(self.COLUMN_TYPES_STMT, (table_name,))
+        types = dict(cursor.fetchall())
+        cursor.close()
+        return [types[column] for column in headers]
+
+    def _session_time_zone(self, connection):
+        """
+        Reads time zone the server uses for timestamps without offset, so binary COPY loads the same instants.
+
+        :param connection: open connection
+        :return: tzinfo
+        :raise ValueError: if the time zone is not known to Python
+        """
+        cursor = connection.cursor()
+        cursor.execute(self.TIME_ZONE_STMT)
+        name = cursor.fetchone()[0]
+        cursor.close()
+        return session_time_zone(name)
 
-        :param text: text to simplify
-        :return: simplified text
+    def _copy_parallel(self, file_path, table_name, headers, delimiter, quote_char, escape_char, encoding,
+                       workers, two_phase_commit=False, copy_format="csv", block_size=DEFAULT_BLOCK_SIZE,
+                       monitor=None):
         """
-        # replace <letter in uppercase> with <letter in lowercase prefixed by underscore>)
-        # e.g. SimpleText -> _simple_text
-        unified = re.sub('([A-Z]{1})', r'_\1', text).lower()
-        # replace all special characters with underscore
-        unified = re.sub('[^0-9a-zA-Z]+', '_', unified)
+        Copies data from CSV to database using several connections at once.
 
-        # remove underscore at the beginning
-        if unified.startswith("_"):
-            unified = unified[1:]
-        return unified
+        The file is split into byte ranges containing whole records. Each range is sent as raw bytes by its own
+        connection and the server converts it from the file encoding. Transactions are committed only when all
+        ranges have been copied, one after another, or prepared first with two-phase commit.
+
+        :param file_path: path to a CSV file
+        :param table_name: a table name
+        :param headers: a list of columns
+        :param delimiter: a one-character string used to separate fields
+        :param quote_char: a one-character string used to quote fields
+        :param escape_char: a one-character string used by the writer to escape the delimiter
+        :param encoding: file encoding
+        :param workers: number of parallel connections
+        :param two_phase_commit: if True, transactions are prepared before any of them is committed
+        :param copy_format: 'csv' or 'binary'
+        :param block_size: number of bytes read from the file and sent to the server at once
+        :param monitor: LoadMonitor counting the load
+        :return: list of ChunkTiming, one per range
+        :raise PreparedTransactionError: if prepared transactions could not be committed
+        """
+        monitor = monitor or LoadMonitor(table_name, file_path)
+        # never wait for connections held by this load
+        ranges = split_file(file_path, min(workers, self._max_connections() or workers), quote_char, escape_char,
+                            encoding)
+        command = self._copy_command(table_name, headers, delimiter, quote_char, escape_char, header=False,
+                                     encoding=encoding)
+
+        pool = self._connection_pool()
+        connections = []
+        xids = []
+        # once every transaction is prepared, none of them may be rolled back
+        prepared = False
+        try:
+            with monitor.phase("connect"):
+                for _ in ranges:
+                    connections.append(pool.getconn())
+
+            if copy_format == "binary":
+                # client encoding cannot change inside a transaction
+                for connection in connections:
+                    if connection.encoding != "UTF8":
+                        connection.set_client_encoding("UTF8")
+                copy_range = functools.partial(self._copy_binary, file_path=file_path, table_name=table_name,
+                                               headers=headers, delimiter=delimiter, quote_char=quote_char,
+                                               escape_char=escape_char, encoding=encoding, commit=False,
+                                               block_size=block_size, monitor=monitor)
+            else:
+                copy_range = functools.partial(self._copy_csv_range, file_path=file_path, command=command,
+                                               block_size=block_size, monitor=monitor)
+
+            if two_phase_commit:
+                for index, connection in enumerate(connections):
+                    xids.append(connection.xid(0, "csv_loader_{}_{}".format(table_name, index), str(time.time())))
+                    connection.tpc_begin(xids[-1])
+
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor, monitor.phase("copy"):
+                futures = [executor.submit(self._copy_range, copy_range, connection, index, start, end)
+                           for index, (connection, (start, end)) in enumerate(zip(connections, ranges))]
+                # wait for every worker before deciding, so no transaction is left running
+                errors = [future.exception() for future in futures]
+            failed = [error for error in errors if error is not None]
+            if failed:
+                raise failed[0]
+
+            with monitor.phase("commit"):
+                if two_phase_commit:
+                    for connection in connections:
+                        connection.tpc_prepare()
+                    prepared = True
+                    self._commit_prepared(connections, xids)
+                else:
+                    for connection in connections:
+                        connection.commit()
+        except Exception:
+            for connection in connections if not prepared else []:
+                try:
+                    if two_phase_commit:
+                        connection.tpc_rollback()
+                    else:
+                        connection.rollback()
+                except Exception as rollback_error:
+                    logging.getLogger('CsvLoader').warning('Rollback of parallel load failed: {}'.format(
+                        rollback_error))
+            raise
+        finally:
+            for connection in connections:
+                if connection.status == STATUS_PREPARED:
+                    # its prepared transaction was committed by another connection, if at all
+                    pool.putconn(connection, close=True)
+                else:
+                    pool.putconn(connection)
+
+        timings = [future.result() for future in futures]
+        monitor.add_rows(sum(timing.rows for timing in timings))
+        for timing in timings:
+            size = timing.end - timing.start
+            logging.getLogger('CsvLoader').info(
+                'Chunk {}/{} of table "{}": {} bytes in {:.3f}s ({:.1f} MB/s)'.format(
+                    timing.index + 1, len(timings), table_name, size, timing.seconds,
+                    size / (1024 * 1024) / timing.seconds if timing.seconds else 0))
+        return timings
+
+    def _commit_prepared(self, connections, xids):
+        """
+        Commits prepared transactions. A transaction which its connection fails to commit is committed again
+        by another connection, unless it is no longer prepared.
+
+        :param connections: list of connections with prepared transactions
+        :param xids: list of transaction ids, one per connection
+        :raise PreparedTransactionError: if some transactions are still prepared after all attempts
+        """
+        pending = []
+        for connection, xid in zip(connections, xids):
+            try:
+                connection.tpc_commit()
+            except Exception as error:
+                logging.getLogger('CsvLoader').warning('Commit of prepared transaction {} failed: {}'.format(
+                    xid, str(error).strip()))
+                pending.append(xid)
+
+        for attempt in range(1, self.COMMIT_PREPARED_ATTEMPTS + 1):
+            if not pending:
+                return
+            time.sleep(self.COMMIT_PREPARED_DELAY * attempt)
+            try:
+                with self._acquire_connection() as connection:
+                    prepared = {tuple(xid) for xid in connection.tpc_recover()}
+                    for xid in list(pending):
+                        if tuple(xid) in prepared:
+                            connection.tpc_commit(xid)
+                        pending.remove(xid)
+            except Exception as error:
+                logging.getLogger('CsvLoader').warning(
+                    'Commit of prepared transactions failed, attempt {}/{}: {}'.format(
+                        attempt, self.COMMIT_PREPARED_ATTEMPTS, str(error).strip()))
+        if pending:
+            raise PreparedTransactionError([str(xid) for xid in pending])
+
+    def _copy_range(self, copy_range, connection, index, start, end):
+        """
+        Copies a byte range of CSV file without committing.
+
+        :param copy_range: function copying the range, called with connection, start and end
+        :param connection: open connection
+        :param index: range number
+        :param start: first byte of the range
+        :param end: byte after the last byte of the range
+        :return: ChunkTiming of the range
+        """
+        started = time.perf_counter()
+        rows = copy_range(connection, start=start, end=end)
+        return ChunkTiming(index, start, end, time.perf_counter() - started, rows)
+
+    def _copy_csv_range(self, connection, file_path, command, start, end, block_size=DEFAULT_BLOCK_SIZE,
+                        monitor=None):
+        """
+        Copies a byte range of CSV file as raw bytes, without committing.
+
+        :param connection: open connection
+        :param file_path: path to a CSV file
+        :param command: COPY command
+        :param start: first byte of the range
+        :param end: byte after the last byte of the range
+        :param block_size: number of bytes read from the file at once
+        :param monitor: LoadMonitor counting data read from the file
+        :return: number of copied rows
+        """
+        monitor = monitor or LoadMonitor(None, file_path)
+        cursor = connection.cursor()
+        with ProgressReader(FileRange(file_path, start, end), monitor) as csv_range:
+            cursor.copy_expert(command, csv_range, size=block_size)
+        rows = cursor.rowcount
+        cursor.close()
+        return rows
+
+    def _max_connections(self):
+        """
+        Provides the number of connections a load can use at once.
+
+        :return: 1 with a single connection, maximum size of the pool, or None if it is not known
+        """
+        if self._connection is not None or self._session_connection is not None:
+            return 1
+        pool = self._connection_pool()
+        return getattr(pool, "max_size", None) or getattr(pool, "maxconn", None)
+
+    def _connection_pool(self):
+        """
+        Provides external pool, or the pool owned by the loader, created on first use.
+
+        :return: pool with getconn/putconn methods
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ConnectionPool(**self._pool_kwargs)
+            return self._pool
+
+    @contextmanager
+    def _acquire_connection(self, monitor=None):
+        """
+        Provides external, session or pooled connection for the duration of with block.
+
+        :param monitor: LoadMonitor measuring time spent waiting for a pooled connection
+        """
+        connection = self._connection or self._session_connection
+        if connection is not None:
+            try:
+                yield connection
+            except Exception:
+                connection.rollback()
+                raise
+            return
+
+        pool = self._connection_pool()
+        if monitor is None:
+            connection = pool.getconn()
+        else:
+            with monitor.phase("connect"):
+                connection = pool.getconn()
+        try:
+            yield connection
+        finally:
+            pool.putconn(connection)
+
+    def _create_indexes(self, table_name, indexes=None, primary_key=None, unique=None, index_workers=1,
+                        maintenance_work_mem=None, definitions=None):
+        """
+        Builds indexes and constraints of loaded table.
+
+        Every index, including those of primary key and unique constraints, is built with CREATE INDEX, so
+        several of them can be built at the same time. When all indexes are built, constraints are added
+        using them in a single transaction, which does not scan the table again.
+
+        :param table_name: a table name
+        :param indexes: list of indexes, each a column name or a list of column names
+        :param primary_key: column name or list of column names
+        :param unique: list of unique constraints, each a column name or a list of column names
+        :param index_workers: number of connections building indexes at the same time
+        :param maintenance_work_mem: memory used to build each index, e.g. '1GB'
+        :param definitions: list of other indexes, each a tuple of index name, True for a unique index, index
+        definition following the table name, e.g. 'USING btree (id)', and constraint type or None
+        """
+        # (index name, unique index, definition, constraint type)
+        definitions = list(definitions or [])
+        columns_list = [(self._column_list(columns), False, None) for columns in indexes or []]
+        columns_list += [(self._column_list(columns), True, "UNIQUE") for columns in unique or []]
+        if primary_key:
+            columns_list.append((self._column_list(primary_key), True, "PRIMARY KEY"))
+        for columns, unique_index, constraint in columns_list:
+            suffix = {"PRIMARY KEY": "pkey", "UNIQUE": "key"}.get(constraint, "idx")
+            index_name = self._index_name(table_name, [] if constraint == "PRIMARY KEY" else columns, suffix)
+            columns_def = ",".join(['"{}"'.format(column) for column in columns])
+            definitions.append((index_name, unique_index, "({})".format(columns_def), constraint))
+        index_workers = max(1, min(index_workers, len(definitions), self._max_connections() or index_workers))
+
+        def build(definition):
+            index_name, unique_index, index_def, _ = definition
+            with self._acquire_connection() as connection:
+                self._create_index(connection, table_name, index_name, index_def, unique_index, maintenance_work_mem)
+
+        logging.getLogger('CsvLoader').info('Building {} indexes of table "{}" using {} connections...'.format(
+            len(definitions), table_name, index_workers))
+        with ThreadPoolExecutor(max_workers=index_workers) as executor:
+            list(executor.map(build, definitions))
+
+        constraints = [(index_name, constraint) for index_name, _, _, constraint in definitions if constraint]
+        if constraints:
+            with self._acquire_connection() as connection:
+                cursor = connection.cursor()
+                for index_name, constraint in constraints:
+                    cursor.execute(self.ADD_CONSTRAINT_STMT.format(table_name, index_name, constraint, index_name))
+                connection.commit()
+                cursor.close()
+
+    def _create_index(self, connection, table_name, index_name, index_def, unique=False, maintenance_work_mem=None):
+        """
+        Builds index of table.
+
+        :param connection: open connection
+        :param table_name: a table name
+        :param index_name: an index name
+        :param index_def: index definition following the table name, e.g. '("country")' or 'USING btree (id)'
+        :param unique: if True, unique index is built
+        :param maintenance_work_mem: memory used to build the index, e.g. '1GB'
+        """
+        started = time.perf_counter()
+        cursor = connection.cursor()
+        if maintenance_work_mem:
+            cursor.execute(self.MAINTENANCE_WORK_MEM_STMT, (maintenance_work_mem,))
+        cursor.execute(self.CREATE_INDEX_STMT.format("UNIQUE " if unique else "", index_name, table_name, index_def))
+        connection.commit()
+        cursor.close()
+        logging.getLogger('CsvLoader').info('Built index "{}" in {:.3f}s'.format(
+            index_name, time.perf_counter() - started))
+
+    def _analyze(self, connection, table_name):
+        """
+        Collects table statistics used by the query planner.
+
+        :param connection: open connection
+        :param table_name: a table name
+        """
+        cursor = connection.cursor()
+        cursor.execute(self.ANALYZE_STMT.format(table_name))
+        connection.commit()
+        cursor.close()
+
+    def _index_name(self, table_name, columns, suffix):
+        """
+        Generates index name the way PostgreSQL does, e.g. table_column_idx. Schema of the table is not part
+        of the name, the index is created in the schema of its table.
+
+        A name longer than maximum identifier length is cut and ends with a hash of the full name, so indexes
+        differing only in the cut part get different names.
+
+        :param table_name: a table name, optionally qualified with schema
+        :param columns: a list of columns
+        :param suffix: 'idx', 'key' or 'pkey'
+        :return: index name shorter than maximum identifier length
+        """
+        name = "_".join([table_name.rpartition(".")[2]] + list(columns)).encode("utf-8")
+        limit = self.MAX_IDENTIFIER_LENGTH - len(suffix) - 1
+        if len(name) > limit:
+            digest = hashlib.blake2b(name, digest_size=4).hexdigest().encode("ascii")
+            name = name[:limit - len(digest) - 1] + b"_" + digest
+        return name.decode("utf-8", "ignore") + "_" + suffix
+
+    @staticmethod
+    def _column_list(columns):
+        """
+        Provides list of columns from a single column name or a list.
+
+        :param columns: column name or list of column names
+        :return: list of column names
+        """
+        return [columns] if isinstance(columns, str) else list(columns)
@@ -0,0 +1,166 @@
+"""
+    Table of loaded files, used to skip unchanged files and resume interrupted loads.
+
+    A file is identified by its size, modification time and a fingerprint of sampled blocks, so checking
+    a large file reads only a few megabytes of it.
+"""
+
+import hashlib
+import os
+from collections import namedtuple
+
+
+DEFAULT_SAMPLE_COUNT = 16
+DEFAULT_SAMPLE_SIZE = 64 * 1024
+
+FileIdentity = namedtuple("FileIdentity", ["size", "mtime", "fingerprint"])
+ManifestEntry = namedtuple("ManifestEntry", ["file_path", "table_name", "size", "mtime", "fingerprint",
+                                             "committed_offset", "completed"])
+
+
+def fingerprint(file_path, sample_count=DEFAULT_SAMPLE_COUNT, sample_size=DEFAULT_SAMPLE_SIZE):
+    """
+    Computes a fingerprint of file content from evenly spaced blocks, including the first and the last one.
+
+    Files smaller than the samples together are hashed as a whole.
+
+    :param file_path: path to a file
+    :param sample_count: number of sampled blocks, None to hash the whole file
+    :param sample_size: size of each sampled block
+    :return: hex digest
+    """
+    file_size = os.path.getsize(file_path)
+    digest = hashlib.blake2b(str(file_size).encode("ascii"), digest_size=16)
+    with open(file_path, "rb") as sampled_file:
+        if sample_count is None or file_size <= sample_count * sample_size:
+            for block in iter(lambda: sampled_file.read(1024 * 1024), b""):
+                digest.update(block)
+        else:
+            last = file_size - sample_size
+            for index in range(sample_count):
+                sampled_file.seek(last * index // (sample_count - 1) if sample_count > 1 else 0)
+                digest.update(sampled_file.read(sample_size))
+    return digest.hexdigest()
+
+
+def identify(file_path, sample_count=DEFAULT_SAMPLE_COUNT, sample_size=DEFAULT_SAMPLE_SIZE):
+    """
+    Reads size, modification time and fingerprint of a file.
+
+    :param file_path: path to a file
+    :param sample_count: number of sampled blocks, None to hash the whole file
+    :param sample_size: size of each sampled block
+    :return: FileIdentity
+    """
+    stat = os.stat(file_path)
+    return FileIdentity(stat.st_size, stat.st_mtime, fingerprint(file_path, sample_count, sample_size))
+
+
+class Manifest(object):
+    """
+    Database table recording loaded files and committed byte offsets of files being loaded.
+
+    Methods do not commit, so offsets can be committed in the same transaction as the data they describe.
+    """
+
+    DEFAULT_TABLE_NAME = "csv_loader_manifest"
+
+    CREATE_STMT = "CREATE TABLE IF NOT EXISTS {} (" \
+                  "file_path text PRIMARY KEY, table_name text NOT NULL, size bigint NOT NULL, " \
+                  "mtime double precision NOT NULL, fingerprint text NOT NULL, " \
+                  "committed_offset bigint NOT NULL, completed boolean NOT NULL, " \
+                  "updated_at timestamptz NOT NULL DEFAULT now());"
+    SELECT_STMT = "SELECT file_path, table_name, size, mtime, fingerprint, committed_offset, completed " \
+                  "FROM {} WHERE file_path = %s;"
+    START_STMT = "INSERT INTO {} (file_path, table_name, size, mtime, fingerprint, committed_offset, completed) " \
+                 "VALUES (%s, %s, %s, %s, %s, %s, false) ON CONFLICT (file_path) DO UPDATE SET " \
+                 "table_name = EXCLUDED.table_name, size = EXCLUDED.size, mtime = EXCLUDED.mtime, " \
+                 "fingerprint = EXCLUDED.fingerprint, committed_offset = EXCLUDED.committed_offset, " \
+                 "completed = false, updated_at = now();"
+    UPDATE_STMT = "UPDATE {} SET committed_offset = %s, completed = %s, updated_at = now() WHERE file_path = %s;"
+
+    def __init__(self, table_name=DEFAULT_TABLE_NAME, sample_count=DEFAULT_SAMPLE_COUNT,
+                 sample_size=DEFAULT_SAMPLE_SIZE):
+        """
+        Constructs manifest stored in given table.
+
+        :param table_name: name of the manifest table, created when first used
+        :param sample_count: number of blocks sampled by file fingerprint, None to hash whole files
+        :param sample_size: size of each sampled block
+        """
+        self.table_name = table_name
+        self.sample_count = sample_count
+        self.sample_size = sample_size
+
+    def identify(self, file_path):
+        """
+        Reads size, modification time and fingerprint of a file.
+
+        :param file_path: path to a file
+        :return: FileIdentity
+        """
+        return identify(file_path, self.sample_count, self.sample_size)
+
+    def create(self, connection):
+        """
+        Creates manifest table if it does not exist.
+
+        :param connection: open connection
+        """
+        cursor = connection.cursor()
+        cursor.execute(self.CREATE_STMT.format(self.table_name))
+        cursor.close()
+
+    def get(self, connection, file_path):
+        """
+        Reads entry of a file.
+
+        :param connection: open connection
+        :param file_path: absolute path to a file
+        :return: ManifestEntry or None if the file was never loaded
+        """
+        cursor = connection.cursor()
+        cursor.execute(self.SELECT_STMT.format(self.table_name), (file_path,))
+        row = cursor.fetchone()
+        cursor.close()
+        return ManifestEntry(*row) if row else None
+
+    def start(self, connection, file_path, table_name, identity, committed_offset):
+        """
+        Records that loading of a file has started, replacing its previous entry.
+
+        :param connection: open connection
+        :param file_path: absolute path to a file
+        :param table_name: table the file is loaded to
+        :param identity: FileIdentity of the file
+        :param committed_offset: offset of the first record to be loaded
+        """
+        cursor = connection.cursor()
+        cursor.execute(self.START_STMT.format(self.table_name),
+                       (file_path, table_name, identity.size, identity.mtime, identity.fingerprint,
+                        committed_offset))
+        cursor.close()
+
+    def commit_offset(self, connection, file_path, committed_offset, completed=False):
+        """
+        Records that records up to given offset are loaded.
+
+        :param connection: open connection, in the transaction that loaded the records
+        :param file_path: absolute path to a file
+        :param committed_offset: byte after the last loaded record
+        :param completed: True if the whole file is loaded
+        """
+        cursor = connection.cursor()
+        cursor.execute(self.UPDATE_STMT.format(self.table_name), (committed_offset, completed, file_path))
+        cursor.close()
+
+    @staticmethod
+    def matches(entry, identity):
+        """
+        Checks whether entry describes the same file content.
+
+        :param entry: ManifestEntry or None
+        :param identity: FileIdentity of the file
+        :return: True if size, modification time and fingerprint are unchanged
+        """
+        return entry is not None and (entry.size, entry.mtime, entry.fingerprint) == tuple(identity)
@@ -0,0 +1,251 @@
+"""
+    Measuring load throughput.
+
+    Data is counted a block at a time as it is read from the file, so the counters add no per-row work and can
+    stay on in production.
+"""
+
+import io
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+
+Progress = namedtuple("Progress", ["table_name", "phase", "bytes_read", "rows", "elapsed", "megabytes_per_second"])
+
+
+class LoadResult(object):
+    """
+    Summary of a finished load returned by CsvLoader.load_data.
+    """
+
+    def __init__(self, table_name, file_path, bytes_read=0, rows=0, elapsed=0.0, phases=None, chunks=None,
+                 merge=None, skipped=False, rejected=0):
+        """
+        Constructs result.
+
+        :param table_name: loaded table
+        :param file_path: path to the loaded file
+        :param bytes_read: number of bytes read from the file, after decompression
+        :param rows: number of rows copied to the database
+        :param elapsed: total time in seconds
+        :param phases: dictionary of seconds spent in each phase, e.g. 'header', 'connect', 'copy', 'commit'
+        :param chunks: list of ChunkTiming of a parallel load
+        :param merge: MergeCounts of a merge
+        :param skipped: True if an incremental load found the file unchanged
+        :param rejected: number of rows rejected by a quarantined load
+        """
+        self.table_name = table_name
+        self.file_path = file_path
+        self.bytes_read = bytes_read
+        self.rows = rows
+        self.elapsed = elapsed
+        self.phases = phases or {}
+        self.chunks = chunks or []
+        self.merge = merge
+        self.skipped = skipped
+        self.rejected = rejected
+
+    @property
+    def megabytes_per_second(self):
+        """
+        Average throughput of the copy phase.
+        """
+        seconds = self.phases.get("copy", 0)
+        return self.bytes_read / (1024 * 1024) / seconds if seconds else 0.0
+
+    def __repr__(self):
+        return "LoadResult(table_name={!r}, rows={}, bytes_read={}, elapsed={:.3f}, phases={})".format(
+            self.table_name, self.rows, self.bytes_read, self.elapsed,
+            {phase: round(seconds, 3) for phase, seconds in self.phases.items()})
+
+
+class LoadMonitor(object):
+    """
+    Thread-safe counters of a single load.
+
+    Bytes and lines are added for every block read from the file. Lines are counted only for the callback,
+    which receives a Progress at most once per interval, from the thread that read the block.
+    """
+
+    DEFAULT_INTERVAL = 1.0
+    DEFAULT_WINDOW = 5.0
+
+    def __init__(self, table_name, file_path=None, callback=None, interval=DEFAULT_INTERVAL, window=DEFAULT_WINDOW):
+        """
+        Starts measuring a load.
+
+        :param table_name: loaded table
+        :param file_path: path to the loaded file
+        :param callback: function called with Progress, None to only collect counters
+        :param interval: minimum number of seconds between callbacks
+        :param window: number of seconds used to compute rolling throughput
+        """
+        self.table_name = table_name
+        self.file_path = file_path
+        self.phases = {}
+        self.bytes_read = 0
+        self.lines = 0
+        self.rows = 0
+        self._callback = callback
+        self.counts_lines = callback is not None
+        self._interval = interval
+        self._window = window
+        self._phase = None
+        self._started = time.perf_counter()
+        self._reported = self._started
+        self._samples = deque([(self._started, 0)])
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Adds time spent in with block to the given phase.
+
+        :param name: phase name, e.g. 'copy'
+        """
+        previous, self._phase = self._phase, name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            self._phase = previous
+
+    def add_block(self, byte_count, line_count):
+        """
+        Counts a block read from the file.
+
+        :param byte_count: size of the block
+        :param line_count: number of new lines in the block
+        """
+        now = time.perf_counter()
+        with self._lock:
+            self.bytes_read += byte_count
+            self.lines += line_count
+            self._samples.append((now, self.bytes_read))
+            while len(self._samples) > 2 and self._samples[1][0] < now - self._window:
+                self._samples.popleft()
+            if self._callback is None or now - self._reported < self._interval:
+                return
+            self._reported = now
+            progress = self._progress(now, max(self.rows, self.lines))
+        self._callback(progress)
+
+    def add_rows(self, row_count):
+        """
+        Counts rows reported by the database after COPY.
+
+        :param row_count: number of copied rows
+        """
+        with self._lock:
+            self.rows += row_count
+
+    def megabytes_per_second(self):
+        """
+        Throughput over the last window seconds.
+        """
+        with self._lock:
+            return self._rolling_rate(time.perf_counter())
+
+    def finish(self, chunks=None, merge=None, skipped=False, rejected=0):
+        """
+        Reports final progress and builds the result.
+
+        :param chunks: list of ChunkTiming of a parallel load
+        :param merge: MergeCounts of a merge
+        :param skipped: True if the file was not loaded
+        :param rejected: number of rejected rows
+        :return: LoadResult
+        """
+        now = time.perf_counter()
+        with self._lock:
+            self._phase = "done"
+            progress = self._progress(now, self.rows)
+            result = LoadResult(self.table_name, self.file_path, self.bytes_read, self.rows, now - self._started,
+                                dict(self.phases), chunks, merge, skipped, rejected)
+        if self._callback is not None:
+            self._callback(progress)
+        return result
+
+    def _progress(self, now, rows):
+        return Progress(self.table_name, self._phase, self.bytes_read, rows, now - self._started,
+                        self._rolling_rate(now))
+
+    def _rolling_rate(self, now):
+        started, byte_count = self._samples[0]
+        return (self.bytes_read - byte_count) / (1024 * 1024) / (now - started) if now > started else 0.0
+
+
+class ProgressReader(io.RawIOBase):
+    """
+    Binary file object counting data read from another binary file object.
+
+    New lines are counted per block, so during the load the row count includes the header and
+    new lines inside quoted values. Wrap it with io.BufferedReader and io.TextIOWrapper to read it as text.
+    """
+
+    def __init__(self, raw_file, monitor):
+        """
+        Wraps file.
+
+        :param raw_file: binary file object with read(size) method
+        :param monitor: LoadMonitor receiving counts
+        """
+        super(ProgressReader, self).__init__()
+        self._raw_file = raw_file
+        self._monitor = monitor
+        self._counts_lines = monitor.counts_lines
+
+    def read(self, size=-1):
+        data = self._raw_file.read(size)
+        if data:
+            self._monitor.add_block(len(data), data.count(b"\n") if self._counts_lines else 0)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def readable(self):
+        return True
+
+    def close(self):
+        self._raw_file.close()
+        super(ProgressReader, self).close()
+
+
+class ProgressWriter(io.RawIOBase):
+    """
+    Binary file object counting data written to another binary file object, e.g. by COPY TO.
+    """
+
+    def __init__(self, raw_file, monitor):
+        """
+        Wraps file.
+
+        :param raw_file: binary file object with write(data) method
+        :param monitor: LoadMonitor receiving counts
+        """
+        super(ProgressWriter, self).__init__()
+        self._raw_file = raw_file
+        self._monitor = monitor
+        self._counts_lines = monitor.counts_lines
+
+    def write(self, data):
+        # BufferedWriter passes memoryview
+        self._monitor.add_block(len(data), bytes(data).count(b"\n") if self._counts_lines else 0)
+        self._raw_file.write(data)
+        return len(data)
+
+    def writable(self):
+        return True
+
+    def close(self):
+        if not self.closed:
+            self._raw_file.close()
+        super(ProgressWriter, self).close()
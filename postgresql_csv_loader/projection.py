@@ -0,0 +1,98 @@
+"""
+    Selecting, renaming and filtering columns of a CSV file on the client, while it is streamed to COPY.
+
+    Records are parsed one at a time, only the selected fields of records accepted by the filter are encoded
+    again as CSV, so the server receives, parses and stores only the projected columns.
+"""
+
+import operator
+
+from .row_source import DEFAULT_BATCH_SIZE, encode_rows
+
+
+class Projection(object):
+    """
+    Columns selected from a file, their names in the table and conditions records have to meet.
+    """
+
+    def __init__(self, headers, columns=None, row_filter=None):
+        """
+        Constructs projection of a file with given columns.
+
+        :param headers: a list of file columns
+        :param columns: a list of selected file columns, or a dictionary of table column names by file column,
+        in table column order. All columns if None
+        :param row_filter: a dictionary of conditions by file column, each a value, a set of values or a function
+        called with the value. A record is loaded if it meets all conditions. Values are strings as read from
+        the file, an empty value is an empty string
+        :raise ValueError: if a column is not in the file
+        """
+        if columns is None:
+            columns = list(headers)
+        mapping = dict(columns) if isinstance(columns, dict) else {column: column for column in columns}
+        conditions = dict(row_filter or {})
+        missing = [column for column in list(mapping) + list(conditions) if column not in headers]
+        if missing:
+            raise ValueError("Columns not found in file: {}".format(", ".join(missing)))
+        if not mapping:
+            raise ValueError("At least one column has to be selected")
+
+        self.source_headers = list(headers)
+        self.columns = list(mapping)
+        self.headers = list(mapping.values())
+        self._table_columns = mapping
+        indexes = [headers.index(column) for column in self.columns]
+        select = operator.itemgetter(*indexes)
+        # itemgetter of a single index returns the value instead of a tuple
+        self._select = select if len(indexes) > 1 else lambda record: (select(record),)
+        self._predicates = [self._predicate(headers.index(column), condition)
+                            for column, condition in conditions.items()]
+
+    def table_column(self, column):
+        """
+        Provides table column name of a file column.
+
+        :param column: a file column
+        :return: a table column name, None if the column is not selected
+        """
+        return self._table_columns.get(column)
+
+    def rows(self, records):
+        """
+        Projects parsed records.
+
+        :param records: iterator of records, each a list of fields, e.g. csv.reader
+        :return: generator of tuples of selected fields of accepted records
+        :raise ValueError: if a record has other number of fields than the header
+        """
+        select, predicates, size = self._select, self._predicates, len(self.source_headers)
+        for record in records:
+            if len(record) != size:
+                raise ValueError("Record ending at line {} has {} fields, expected {}".format(
+                    getattr(records, "line_num", "?"), len(record), size))
+            for predicate in predicates:
+                if not predicate(record):
+                    break
+            else:
+                yield select(record)
+
+    def encode(self, records, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Projects parsed records and encodes them as CSV without header, a batch at a time.
+
+        Empty values are written as empty fields, which COPY loads as NULL.
+
+        :param records: iterator of records, each a list of fields, e.g. csv.reader
+        :param batch_size: number of rows encoded at once
+        :return: generator of UTF-8 encoded bytes
+        """
+        return encode_rows(self.rows(records), batch_size)
+
+    @staticmethod
+    def _predicate(index, condition):
+        if callable(condition):
+            return lambda record: condition(record[index])
+        if isinstance(condition, (set, frozenset, list, tuple)):
+            values = frozenset(condition)
+            return lambda record: record[index] in values
+        return lambda record: record[index] == condition
@@ -0,0 +1,154 @@
+"""
+    Recording rows rejected by error-tolerant loads.
+
+    Rejected rows are written with their line number in the file and the server error, to a CSV file,
+    a database table or both.
+"""
+
+import csv
+import os
+from collections import namedtuple
+
+
+Reject = namedtuple("Reject", ["line", "error", "record"])
+
+
+class RejectLimitError(ValueError):
+    """
+    More rows were rejected than allowed.
+    """
+
+    def __init__(self, max_rejects, reject):
+        super(RejectLimitError, self).__init__("More than {} rows rejected, the last one at line {}: {}".format(
+            max_rejects, reject.line, reject.error))
+        self.max_rejects = max_rejects
+        self.reject = reject
+
+
+class LineCounter(object):
+    """
+    Translates byte offsets to line numbers and back, reading the file forward from the last position.
+
+    Positions are usually requested in increasing order, so the whole file is read at most once.
+    """
+
+    BLOCK_SIZE = 8 * 1024 * 1024
+
+    def __init__(self, file_path):
+        """
+        Constructs counter of a file.
+
+        :param file_path: path to a file
+        """
+        self._file_path = file_path
+        self._offset = 0
+        self._line = 1
+
+    def line_at(self, offset):
+        """
+        Provides number of the line containing given byte.
+
+        :param offset: byte offset
+        :return: line number, starting from 1
+        """
+        if offset < self._offset:
+            self._offset, self._line = 0, 1
+        with open(self._file_path, "rb") as counted_file:
+            counted_file.seek(self._offset)
+            while self._offset < offset:
+                block = counted_file.read(min(self.BLOCK_SIZE, offset - self._offset))
+                if not block:
+                    break
+                self._line += block.count(b"\n")
+                self._offset += len(block)
+        return self._line
+
+    def offset_of(self, line):
+        """
+        Provides offset of the first byte of a line.
+
+        :param line: line number, starting from 1
+        :return: byte offset, file size if the file has fewer lines
+        """
+        if line < self._line:
+            self._offset, self._line = 0, 1
+        with open(self._file_path, "rb") as counted_file:
+            counted_file.seek(self._offset)
+            while self._line < line:
+                block = counted_file.read(self.BLOCK_SIZE)
+                if not block:
+                    break
+                position = 0
+                while self._line < line:
+                    position = block.find(b"\n", position) + 1
+                    if not position:
+                        break
+                    self._line += 1
+                if self._line < line:
+                    self._offset += len(block)
+                else:
+                    self._offset += position
+        return self._offset
+
+
+class RejectWriter(object):
+    """
+    Writes rejected rows to a CSV file and/or a table and enforces the maximum number of rejects.
+
+    Rows are appended to the file at once. Rows written to the table are committed by the caller.
+    """
+
+    CREATE_STMT = "CREATE TABLE IF NOT EXISTS {} (file_path text NOT NULL, line bigint, error text NOT NULL, " \
+                  "record text, rejected_at timestamptz NOT NULL DEFAULT now());"
+    INSERT_STMT = "INSERT INTO {} (file_path, line, error, record) VALUES (%s, %s, %s, %s);"
+    FILE_HEADER = ["file_path", "line", "error", "record"]
+
+    def __init__(self, file_path, max_rejects=None, reject_file=None, reject_table=None):
+        """
+        Constructs writer of rejects of a loaded file.
+
+        :param file_path: path to the loaded file, written with every reject
+        :param max_rejects: maximum number of rejected rows, None for no limit
+        :param reject_file: path to a CSV file rejected rows are appended to, None to skip it
+        :param reject_table: name of a table rejected rows are inserted to, created if needed, None to skip it
+        """
+        self.file_path = file_path
+        self.max_rejects = max_rejects
+        self.reject_file = reject_file
+        self.reject_table = reject_table
+        self.count = 0
+
+    def create(self, connection):
+        """
+        Creates reject table if it does not exist, without committing.
+
+        :param connection: open connection
+        """
+        if self.reject_table:
+            cursor = connection.cursor()
+            cursor.execute(self.CREATE_STMT.format(self.reject_table))
+            cursor.close()
+
+    def write(self, connection, reject):
+        """
+        Records a rejected row.
+
+        :param connection: open connection, used if rows are written to a table
+        :param reject: Reject
+        :raise RejectLimitError: if more than max_rejects rows were rejected
+        """
+        self.count += 1
+        if self.reject_file:
+            new_file = not os.path.exists(self.reject_file) or os.path.getsize(self.reject_file) == 0
+            with open(self.reject_file, "a", encoding="utf-8", newline="") as rejects:
+                writer = csv.writer(rejects)
+                if new_file:
+                    writer.writerow(self.FILE_HEADER)
+                writer.writerow([self.file_path, reject.line, reject.error, reject.record])
+        if self.reject_table:
+            cursor = connection.cursor()
+            cursor.execute(self.INSERT_STMT.format(self.reject_table),
+                           (self.file_path, reject.line, reject.error, reject.record))
+            cursor.close()
+        if self.max_rejects is not None and self.count > self.max_rejects:
+            raise RejectLimitError(self.max_rejects, reject)
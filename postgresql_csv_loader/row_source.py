@@ -0,0 +1,213 @@
+"""
+    Streaming in-memory data (row iterables, pandas DataFrames and NumPy structured arrays) to COPY as CSV.
+
+    Data is encoded a batch of rows at a time by a generator and read through a file-like object,
+    so only one batch is held in memory, whatever the size of the input.
+"""
+
+import csv
+import io
+import itertools
+
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+class RowStreamReader(object):
+    """
+    File-like object reading bytes produced by a generator of encoded batches.
+    """
+
+    def __init__(self, batches):
+        """
+        Constructs reader of given batches.
+
+        :param batches: iterable of bytes, e.g. a generator encoding rows
+        """
+        self._batches = iter(batches)
+        self._buffer = bytearray()
+        self._finished = False
+        self.error = None
+
+    def read(self, size=-1):
+        """
+        Reads encoded data, encoding as many batches as needed.
+
+        :param size: number of bytes requested, everything if negative
+        :return: bytes, empty when all batches were read
+        """
+        try:
+            while not self._finished and (size is None or size < 0 or len(self._buffer) < size):
+                batch = next(self._batches, None)
+                if batch is None:
+                    self._finished = True
+                else:
+                    self._buffer += batch
+        except Exception as error:
+            # psycopg2 replaces errors raised by read() with QueryCanceled, keep the original one
+            self.error = error
+            raise
+        if size is None or size < 0 or size >= len(self._buffer):
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        else:
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+        return data
+
+    def close(self):
+        self._batches = iter(())
+
+
+def is_frame(data):
+    """
+    Checks whether data is a pandas DataFrame.
+    """
+    return hasattr(data, "iloc") and hasattr(data, "to_csv")
+
+
+def is_structured_array(data):
+    """
+    Checks whether data is a NumPy structured array.
+    """
+    return getattr(getattr(data, "dtype", None), "names", None) is not None
+
+
+def column_names(data):
+    """
+    Provides column names of a DataFrame or a structured array.
+
+    :param data: pandas DataFrame or NumPy structured array
+    :return: list of column names
+    """
+    if is_frame(data):
+        return [str(column) for column in data.columns]
+    return list(data.dtype.names)
+
+
+def postgres_types(data):
+    """
+    Maps column dtypes of a DataFrame or a structured array to PostgreSQL types.
+
+    :param data: pandas DataFrame or NumPy structured array
+    :return: list of PostgreSQL types, one per column, None for columns stored as text
+    """
+    if is_frame(data):
+        dtypes = list(data.dtypes)
+    else:
+        dtypes = [data.dtype.fields[name][0] for name in data.dtype.names]
+    return [_postgres_type(dtype) for dtype in dtypes]
+
+
+def _postgres_type(dtype):
+    kind, size = getattr(dtype, "kind", "O"), getattr(dtype, "itemsize", 8)
+    if kind == "b":
+        return "boolean"
+    if kind == "i":
+        return {1: "smallint", 2: "smallint", 4: "integer"}.get(size, "bigint")
+    if kind == "u":
+        return {1: "smallint", 2: "integer", 4: "bigint"}.get(size, "numeric")
+    if kind == "f":
+        return "real" if size == 4 else "double precision"
+    if kind == "M":
+        return "timestamptz" if getattr(dtype, "tz", None) is not None else "timestamp"
+    return None
+
+
+def encode_rows(rows, batch_size=DEFAULT_BATCH_SIZE, encoding="utf-8"):
+    """
+    Encodes rows as CSV, a batch at a time. None and empty strings are written as empty values, which COPY
+    loads as NULL, like empty fields of a CSV file.
+
+    :param rows: iterable of rows, each a sequence of values
+    :param batch_size: number of rows encoded at once
+    :param encoding: encoding of produced bytes
+    :return: generator of bytes
+    """
+    rows = iter(rows)
+    text = io.StringIO()
+    writer = csv.writer(text, lineterminator="\n")
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        if len(batch[0]) == 1:
+            # csv.writer quotes a single empty field, which COPY loads as an empty string, an empty line is NULL
+            for row in batch:
+                if row[0] is None or row[0] == "":
+                    text.write("\n")
+                else:
+                    writer.writerow(row)
+        else:
+            writer.writerows(batch)
+        yield text.getvalue().encode(encoding)
+        text.seek(0)
+        text.truncate()
+
+
+def encode_frame(frame, batch_size=DEFAULT_BATCH_SIZE, encoding="utf-8"):
+    """
+    Encodes DataFrame as CSV, a slice of rows at a time, with pandas' CSV writer. Missing values and empty
+    strings are written as empty values, which COPY loads as NULL.
+
+    :param frame: pandas DataFrame
+    :param batch_size: number of rows encoded at once
+    :param encoding: encoding of produced bytes
+    :return: generator of bytes
+    """
+    for start in range(0, len(frame), batch_size):
+        text = frame.iloc[start:start + batch_size].to_csv(header=False, index=False, lineterminator="\n")
+        yield text.encode(encoding)
+
+
+def encode_array(array, batch_size=DEFAULT_BATCH_SIZE, encoding="utf-8"):
+    """
+    Encodes NumPy structured array as CSV, a slice of rows at a time. Each column of a slice is formatted
+    with vectorized NumPy operations and the columns are joined into lines. NaN, NaT, None and empty strings
+    are written as empty values, which COPY loads as NULL.
+
+    :param array: NumPy structured array
+    :param batch_size: number of rows encoded at once
+    :param encoding: encoding of produced bytes
+    :return: generator of bytes
+    """
+    import numpy
+
+    for start in range(0, len(array), batch_size):
+        batch = array[start:start + batch_size]
+        lines = None
+        for name in array.dtype.names:
+            text = _format_column(numpy, batch[name])
+            lines = text if lines is None else numpy.char.add(numpy.char.add(lines, ","), text)
+        yield ("\n".join(lines.tolist()) + "\n").encode(encoding)
+
+
+def _format_column(numpy, values):
+    """
+    Formats column values as CSV fields.
+
+    :param numpy: numpy module
+    :param values: one-dimensional array
+    :return: array of strings
+    """
+    kind = values.dtype.kind
+    if kind in "iub":
+        return values.astype(str)
+    if kind == "f":
+        text = values.astype(str)
+        text[numpy.isnan(values)] = ""
+        return text
+    if kind == "M":
+        text = numpy.datetime_as_string(values)
+        text[numpy.isnat(values)] = ""
+        return text
+    if kind == "S":
+        values = numpy.char.decode(values, "utf-8")
+    text = values.astype(str)
+    # None and NaN (pandas' missing value in object columns) are NULL, as are empty strings
+    missing = text == ""
+    if kind == "O":
+        missing |= numpy.equal(values, None) | (values != values)
+    text = numpy.char.add(numpy.char.add('"', numpy.char.replace(text, '"', '""')), '"')
+    text[missing] = ""
+    return text
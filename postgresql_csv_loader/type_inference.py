@@ -0,0 +1,142 @@
+"""
+    Detecting PostgreSQL column types from CSV values.
+
+    Values are classified a batch at a time: all values of a column in a batch are joined with new lines and matched
+    against a single regular expression per candidate type, so the per-value work is done by the regex engine.
+"""
+
+import re
+
+
+class TypeInferrer(object):
+    """
+    Narrows down the type of each column while batches of rows are added.
+
+    Every column starts with all candidate types. A candidate is dropped as soon as one non-empty value does not
+    match it. Empty values are treated as NULL. Columns without any non-empty value, or without remaining
+    candidates, fall back to the default type.
+    """
+
+    DEFAULT_BATCH_SIZE = 10000
+    DEFAULT_DATA_TYPE = "varchar"
+
+    INTEGER_RANGE = (-2 ** 31, 2 ** 31 - 1)
+    BIGINT_RANGE = (-2 ** 63, 2 ** 63 - 1)
+
+    _DATE = r"\d{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12]\d|3[01])"
+    _TIME = r"(?:[01]\d|2[0-3]):[0-5]\d(?::[0-5]\d(?:\.\d{1,6})?)?"
+    _HEX = "[0-9a-fA-F]"
+
+    # candidates in order of preference, zero-padded numbers stay text so no digits are lost
+    PATTERNS = [
+        ("boolean", r"(?i:true|false|t|f|yes|no)"),
+        ("integer", r"[+-]?(?:0|[1-9]\d{0,9})"),
+        ("bigint", r"[+-]?(?:0|[1-9]\d{0,18})"),
+        ("numeric", r"[+-]?(?:(?:0|[1-9]\d*)(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?"),
+        ("date", _DATE),
+        ("timestamp", _DATE + "[T ]" + _TIME),
+        ("timestamptz", _DATE + "[T ]" + _TIME + r"(?:Z|[+-](?:[01]\d|2[0-3])(?::?[0-5]\d)?)"),
+        ("uuid", "{0}{{8}}-{0}{{4}}-{0}{{4}}-{0}{{4}}-{0}{{12}}".format(_HEX)),
+    ]
+
+    # a type whose values always match the listed wider types as well
+    WIDER_TYPES = {"integer": ("bigint", "numeric"), "bigint": ("numeric",)}
+
+    def __init__(self, column_count):
+        """
+        Constructs inferrer for given number of columns.
+
+        :param column_count: number of columns
+        """
+        self._matchers = [(name, re.compile("(?:{0})(?:\n(?:{0}))*".format(pattern)).fullmatch)
+                          for name, pattern in self.PATTERNS]
+        self._candidates = [[name for name, _ in self.PATTERNS] for _ in range(column_count)]
+        self._seen = [False] * column_count
+
+    def add_rows(self, rows):
+        """
+        Narrows down column types using a batch of rows.
+
+        :param rows: list of rows, each a list of string values; short rows are padded with empty values
+        """
+        if not rows:
+            return
+        column_count = len(self._seen)
+        padded = [row if len(row) == column_count else (row + [""] * column_count)[:column_count] for row in rows]
+        for index, column in enumerate(zip(*padded)):
+            if not self._candidates[index]:
+                continue
+            values = [value for value in column if value]
+            if not values:
+                continue
+            self._seen[index] = True
+            self._candidates[index] = self._narrow(self._candidates[index], values)
+
+    def types(self):
+        """
+        Provides the most specific type matching all values added so far.
+
+        :return: list of PostgreSQL type names, one per column
+        """
+        return [candidates[0] if (seen and candidates) else self.DEFAULT_DATA_TYPE
+                for candidates, seen in zip(self._candidates, self._seen)]
+
+    def _narrow(self, candidates, values):
+        """
+        Removes candidate types not matching values.
+
+        :param candidates: remaining types of a column
+        :param values: non-empty values of the column
+        :return: types matching all values
+        """
+        joined = "\n".join(values)
+        if joined.count("\n") != len(values) - 1:
+            return []  # multi-line values are always text
+
+        remaining = []
+        implied = set()
+        for name, fullmatch in self._matchers:
+            if name not in candidates:
+                continue
+            if name in implied or (fullmatch(joined) and self._in_range(name, values)):
+                remaining.append(name)
+                implied.update(self.WIDER_TYPES.get(name, ()))
+        return remaining
+
+    def _in_range(self, name, values):
+        """
+        Checks integer values that are long enough to overflow the type.
+
+        :param name: type name
+        :param values: values matching type pattern
+        :return: True if all values fit
+        """
+        if name == "integer":
+            low, high = self.INTEGER_RANGE
+            digits = 10
+        elif name == "bigint":
+            low, high = self.BIGINT_RANGE
+            digits = 19
+        else:
+            return True
+        return all(low <= int(value) <= high for value in values if len(value.lstrip("+-")) >= digits)
+
+
+def infer_column_types(rows, column_count, batch_size=TypeInferrer.DEFAULT_BATCH_SIZE):
+    """
+    Infers column types from rows, keeping only one batch in memory.
+
+    :param rows: iterable of rows, each a list of string values
+    :param column_count: number of columns
+    :param batch_size: number of rows classified at once
+    :return: list of PostgreSQL type names, one per column
+    """
+    inferrer = TypeInferrer(column_count)
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            inferrer.add_rows(batch)
+            batch = []
+    inferrer.add_rows(batch)
+    return inferrer.types()
@@ -26,7 +26,10 @@ setup(
     url="https://github.com/roksela/postgresql-csv-loader",
     keywords=["python", "postgresql", "csv", "loader", "schema-generation"],
     install_requires=REQUIRES,
+    extras_require={"zstd": ["zstandard"], "async": ["psycopg>=3.1"],
+                    "frames": ["pandas>=1.5", "numpy"]},
     packages=find_packages(),
+    entry_points={"console_scripts": ["csv-loader = postgresql_csv_loader.cli:main"]},
     include_package_data=True,
     long_description="""\
     Automatically create tables and load data from CSV files to your database.\
@@ -0,0 +1,155 @@
+import asyncio
+import configparser
+import unittest
+from postgresql_csv_loader import AsyncCsvLoader, CsvLoader
+from psycopg2 import connect
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+
+@unittest.skipIf(psycopg is None, "psycopg 3 is not installed")
+class TestAsyncCsvLoader(unittest.TestCase):
+    """
+    Test asyncio CSV loader.
+
+    To run this test, you need to set up a postgresql database at localhost:5440.
+    Database name 'tests' and user 'tests'.
+    """
+
+    CSV_FILENAME_1 = "resources/stackoverflow_survey_results_public_sample.csv"
+    CSV_FILENAME_2 = "resources/simple_table.csv"
+    CSV_FILENAME_4 = "resources/polish_characters.csv"
+    CSV_FILENAME_8 = "resources/late_text_value.csv"
+    COMPRESSED_FILENAME = "resources/compressed_table.csv.gz"
+    CSV_1_RECORD_COUNT = 30
+    CSV_2_RECORD_COUNT = 5
+    CSV_4_RECORD_COUNT = 1
+    CSV_8_RECORD_COUNT = 4
+    COMPRESSED_RECORD_COUNT = 4
+    TABLE_NAME_1 = "csv_stackoverflow_survey_results_public_sample"
+    TABLE_NAME_2 = "csv_simple_table"
+    TABLE_NAME_4 = "csv_polish_characters"
+    TABLE_NAME_8 = "csv_late_text_value"
+    COMPRESSED_TABLE_NAME = "csv_compressed_table"
+
+    SELECT_COUNT_STMT = "SELECT count(*) from {};"
+    SELECT_TYPES_STMT = "SELECT column_name, data_type FROM information_schema.columns " \
+                        "WHERE table_name = '{}' ORDER BY ordinal_position;"
+    DROP_STMT = "DROP TABLE IF EXISTS {};"
+
+    def setUp(self):
+        config = configparser.ConfigParser()
+        config.read('db_config.ini')
+
+        self.database_host = config['DEFAULT']['database_host']
+        self.database_port = config['DEFAULT']['database_port']
+        self.database_name = config['DEFAULT']['database_name']
+        self.database_user = config['DEFAULT']['database_user']
+
+    def test_shared_names(self):
+        loader = self._get_loader()
+        sync_loader = CsvLoader(table_prefix="csv_")
+        file_name = "LongString-with-$date-20170701_100%_legit.csv"
+
+        self.assertNotIsInstance(loader, CsvLoader)
+        self.assertEqual(loader._generate_table_name(file_name), sync_loader._generate_table_name(file_name))
+        self.assertEqual(loader._normalize_headers(loader._read_headers(self.CSV_FILENAME_1)),
+                         sync_loader._normalize_headers(sync_loader._read_headers(self.CSV_FILENAME_1)))
+        self.assertEqual(loader._create_table_statement(["id", "name"], "t", {"id": "integer"}),
+                         'CREATE TABLE t ("id" integer,"name" varchar);')
+
+    def test_load_data(self):
+        result = asyncio.run(self._get_loader().load_data(self.CSV_FILENAME_1))
+
+        count = self._fetch_one(self.SELECT_COUNT_STMT.format(self.TABLE_NAME_1))
+        self._drop(self.TABLE_NAME_1)
+        self.assertEqual(count, self.CSV_1_RECORD_COUNT)
+        self.assertEqual(result.rows, self.CSV_1_RECORD_COUNT)
+        self.assertEqual(result.table_name, self.TABLE_NAME_1)
+        self.assertIn("copy", result.phases)
+
+    def test_load_data_encoding(self):
+        loader = self._get_loader()
+        for passthrough in (False, True):
+            asyncio.run(loader.load_data(self.CSV_FILENAME_4, encoding='iso-8859-2', passthrough=passthrough,
+                                         block_size=16))
+
+            count = self._fetch_one(self.SELECT_COUNT_STMT.format(self.TABLE_NAME_4))
+            name = self._fetch_one("SELECT text FROM {};".format(self.TABLE_NAME_4))
+            self._drop(self.TABLE_NAME_4)
+            self.assertEqual(count, self.CSV_4_RECORD_COUNT)
+            self.assertIn("Wąż", name)
+
+    def test_load_compressed(self):
+        asyncio.run(self._get_loader().load_data(self.COMPRESSED_FILENAME, passthrough=True))
+
+        count = self._fetch_one(self.SELECT_COUNT_STMT.format(self.COMPRESSED_TABLE_NAME))
+        self._drop(self.COMPRESSED_TABLE_NAME)
+        self.assertEqual(count, self.COMPRESSED_RECORD_COUNT)
+
+    def test_load_data_infer_types_fallback(self):
+        asyncio.run(self._get_loader().load_data(self.CSV_FILENAME_8, infer_types=True, sample_size=20))
+
+        count = self._fetch_one(self.SELECT_COUNT_STMT.format(self.TABLE_NAME_8))
+        types = self._fetch_all(self.SELECT_TYPES_STMT.format(self.TABLE_NAME_8))
+        self._drop(self.TABLE_NAME_8)
+        self.assertEqual(count, self.CSV_8_RECORD_COUNT)
+        self.assertEqual(types, [('id', 'integer'), ('amount', 'character varying')])
+
+    def test_load_many(self):
+        file_paths = [self.CSV_FILENAME_1, self.CSV_FILENAME_2, self.COMPRESSED_FILENAME]
+        results = asyncio.run(self._get_loader().load_many(file_paths, concurrency=2))
+
+        counts = [self._fetch_one(self.SELECT_COUNT_STMT.format(table_name))
+                  for table_name in (self.TABLE_NAME_1, self.TABLE_NAME_2, self.COMPRESSED_TABLE_NAME)]
+        for table_name in (self.TABLE_NAME_1, self.TABLE_NAME_2, self.COMPRESSED_TABLE_NAME):
+            self._drop(table_name)
+        self.assertEqual([result.rows for result in results],
+                         [self.CSV_1_RECORD_COUNT, self.CSV_2_RECORD_COUNT, self.COMPRESSED_RECORD_COUNT])
+        self.assertEqual(counts, [result.rows for result in results])
+
+    def test_load_many_failure(self):
+        file_paths = [self.CSV_FILENAME_2, "resources/missing.csv"]
+        loader = self._get_loader()
+        results = asyncio.run(loader.load_many(file_paths, return_exceptions=True))
+
+        count = self._fetch_one(self.SELECT_COUNT_STMT.format(self.TABLE_NAME_2))
+        self._drop(self.TABLE_NAME_2)
+        self.assertEqual(count, self.CSV_2_RECORD_COUNT)
+        self.assertIsInstance(results[1], FileNotFoundError)
+
+        with self.assertRaises(FileNotFoundError):
+            asyncio.run(loader.load_many(file_paths))
+        self._drop(self.TABLE_NAME_2)
+
+    def _get_loader(self):
+        return AsyncCsvLoader(self.database_host, self.database_port, self.database_name, self.database_user)
+
+    def _fetch_all(self, query):
+        connection = connect(dbname=self.database_name, user=self.database_user, password=None,
+                             host=self.database_host, port=self.database_port)
+        cursor = connection.cursor()
+        cursor.execute(query)
+        result = cursor.fetchall()
+        cursor.close()
+        connection.close()
+        return result
+
+    def _fetch_one(self, query):
+        return self._fetch_all(query)[0][0]
+
+    def _drop(self, table_name):
+        connection = connect(dbname=self.database_name, user=self.database_user, password=None,
+                             host=self.database_host, port=self.database_port)
+        cursor = connection.cursor()
+        cursor.execute(self.DROP_STMT.format(table_name))
+        connection.commit()
+        cursor.close()
+        connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
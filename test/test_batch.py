@@ -0,0 +1,56 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from postgresql_csv_loader import BatchResult, FileOutcome, LoadResult
+from postgresql_csv_loader.batch import find_files, largest_first
+from postgresql_csv_loader.cli import main
+
+
+class TestBatch(unittest.TestCase):
+    """
+    Test finding and scheduling files of a batch.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, "sub"))
+        for name, size in (("a.csv", 10), ("b.csv", 30), ("c.txt", 5), ("sub/d.csv", 20)):
+            with open(os.path.join(self.directory, name), "w") as csv_file:
+                csv_file.write("x" * size)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_find_files(self):
+        def path(name):
+            return os.path.join(self.directory, name)
+
+        self.assertEqual(find_files([self.directory]), [path("a.csv"), path("b.csv")])
+        self.assertEqual(find_files([self.directory], recursive=True),
+                         [path("a.csv"), path("b.csv"), path("sub/d.csv")])
+        self.assertEqual(find_files([path("*.txt"), path("a.csv"), path("a.csv")]), [path("c.txt"), path("a.csv")])
+
+    def test_largest_first(self):
+        files = find_files([self.directory], recursive=True)
+        self.assertEqual([os.path.basename(file_path) for file_path, _ in largest_first(files)],
+                         ["b.csv", "d.csv", "a.csv"])
+        self.assertEqual(largest_first([os.path.join(self.directory, "missing.csv")])[0][1], None)
+
+    def test_batch_result(self):
+        result = BatchResult([FileOutcome("a.csv", 10, LoadResult("csv_a", "a.csv", 1024 * 1024, 5), None),
+                              FileOutcome("b.csv", 30, None, ValueError("broken")),
+                              FileOutcome("c.csv", 20, LoadResult("csv_c", "c.csv", 1024 * 1024, 7), None)], 2.0)
+        self.assertEqual(result.rows, 12)
+        self.assertEqual(result.megabytes_per_second, 1.0)
+        self.assertEqual([outcome.file_path for outcome in result.failed], ["b.csv"])
+
+    def test_cli_no_files(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(main([os.path.join(self.directory, "*.tsv")]), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
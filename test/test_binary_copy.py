@@ -0,0 +1,105 @@
+import configparser
+import unittest
+from postgresql_csv_loader.binary_copy import (ENCODERS, BinaryCopyReader, BinaryEncodingError, SIGNATURE, TRAILER,
+                                               session_time_zone)
+from psycopg2 import connect
+
+
+class TestBinaryCopy(unittest.TestCase):
+    """
+    Test binary COPY encoding against the send functions of the server.
+
+    To run this test, you need to set up a postgresql database at localhost:5440.
+    Database name 'tests' and user 'tests'.
+    """
+
+    VALUES = {
+        "int4": ["0", "-2147483648", "2147483647"],
+        "int8": ["9223372036854775807", "-42"],
+        "float8": ["1.5", "-2.5e-3", "Infinity", "-inf", "NaN"],
+        "numeric": ["0", "12.50", "-1.5e3", "0.00012", "123456789.123456789", "1E+9", "NaN"],
+        "bool": ["true", "F", "yes"],
+        "date": ["2000-01-01", "1999-12-31", "2017-07-01"],
+        "timestamp": ["2017-07-01 10:15:00", "1970-01-01T00:00:00.000001"],
+        "timestamptz": ["2017-07-01T10:15:00+02:00", "2017-07-01 10:15:00Z"],
+        "uuid": ["550e8400-e29b-41d4-a716-446655440000"],
+        "varchar": ["zażółć"],
+    }
+
+    def setUp(self):
+        config = configparser.ConfigParser()
+        config.read('db_config.ini')
+        self.connection = connect(dbname=config['DEFAULT']['database_name'],
+                                  user=config['DEFAULT']['database_user'],
+                                  host=config['DEFAULT']['database_host'],
+                                  port=config['DEFAULT']['database_port'])
+        self.connection.set_client_encoding("UTF8")
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_encoders(self):
+        cursor = self.connection.cursor()
+        cursor.execute("SET TIME ZONE 'UTC'")
+        for type_name, values in self.VALUES.items():
+            for value in values:
+                cursor.execute("SELECT typsend::text FROM pg_type WHERE typname = %s", (type_name,))
+                send_function = cursor.fetchone()[0]
+                cursor.execute("SELECT {}(%s::{})".format(send_function, type_name), (value,))
+                expected = bytes(cursor.fetchone()[0])
+                encoded = ENCODERS[type_name](value)
+                self.assertEqual(encoded[4:], expected, "{} {}".format(type_name, value))
+                self.assertEqual(int.from_bytes(encoded[:4], "big"), len(expected))
+
+    def test_reader(self):
+        reader = BinaryCopyReader([["1", ""], ["2", "x"]], ["id", "name"], ["int4", "text"], buffer_size=4)
+        data = reader.read()
+        while True:
+            block = reader.read()
+            if not block:
+                break
+            data += block
+        self.assertTrue(data.startswith(SIGNATURE))
+        self.assertTrue(data.endswith(TRAILER))
+        self.assertIn(b"\xff\xff\xff\xff", data)
+
+    def test_invalid_value(self):
+        reader = BinaryCopyReader([["1"], ["x"]], ["id"], ["int4"])
+        with self.assertRaises(BinaryEncodingError) as context:
+            reader.read()
+        self.assertEqual(context.exception.record_number, 2)
+        self.assertEqual(context.exception.column, "id")
+
+    def test_invalid_numbers(self):
+        invalid = {"int2": ["70000"], "int4": ["3000000000", "1_000", " 5 ", "inf", "nan", "0x1A"],
+                   "int8": ["9223372036854775808", "1_000"], "float4": ["1e39", "1_000.5", " 5 "],
+                   "float8": ["1_000.5", "0x1p3"], "numeric": ["1_000", " 5 ", "Infinity"]}
+        for type_name, values in invalid.items():
+            for value in values:
+                reader = BinaryCopyReader([[value]], ["amount"], [type_name])
+                with self.assertRaises(BinaryEncodingError, msg="{} {!r}".format(type_name, value)):
+                    reader.read()
+
+    def test_time_zones(self):
+        reader = BinaryCopyReader([["2020-01-01T10:00:00+02:00"]], ["created"], ["timestamp"])
+        with self.assertRaises(BinaryEncodingError):
+            reader.read()
+
+        cursor = self.connection.cursor()
+        cursor.execute("SET TIME ZONE 'Europe/Warsaw'")
+        for value in ["2020-01-01 10:00:00", "2020-07-01 10:00:00", "2020-07-01 10:00:00+00:00"]:
+            cursor.execute("SELECT timestamptz_send(%s::timestamptz)", (value,))
+            expected = bytes(cursor.fetchone()[0])
+            reader = BinaryCopyReader([[value]], ["created"], ["timestamptz"],
+                                      time_zone=session_time_zone("Europe/Warsaw"))
+            self.assertIn(expected, reader.read(), value)
+        with self.assertRaises(ValueError):
+            session_time_zone("<+02>-02")
+
+    def test_unsupported_type(self):
+        with self.assertRaises(ValueError):
+            BinaryCopyReader([], ["shape"], ["polygon"])
+
+
+if __name__ == '__main__':
+    unittest.main()
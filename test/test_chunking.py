@@ -0,0 +1,48 @@
+import csv
+import io
+import unittest
+from postgresql_csv_loader.chunking import FileRange, find_record_boundaries, split_file
+
+
+class TestChunking(unittest.TestCase):
+    """
+    Test splitting CSV files into byte ranges.
+    """
+
+    CSV_FILENAME_1 = "resources/stackoverflow_survey_results_public_sample.csv"
+    CSV_FILENAME_5 = "resources/weird_format.csv"
+    CSV_1_RECORD_COUNT = 30
+    CSV_5_RECORD_COUNT = 1
+
+    def test_ranges_contain_all_records(self):
+        for chunk_count in (1, 2, 7, 100):
+            rows = self._read_ranges(self.CSV_FILENAME_1, chunk_count)
+            self.assertEqual(len(rows), self.CSV_1_RECORD_COUNT)
+            self.assertEqual(rows[0][0], '1')
+
+    def test_ranges_with_escape_char(self):
+        rows = self._read_ranges(self.CSV_FILENAME_5, 3, delimiter=';', quote_char='/', escape_char='\\')
+        self.assertEqual(len(rows), self.CSV_5_RECORD_COUNT)
+
+    def test_small_scan_blocks(self):
+        ranges = split_file(self.CSV_FILENAME_1, 5)
+        self.assertEqual(split_file(self.CSV_FILENAME_1, 5, block_size=16), ranges)
+
+    def test_boundaries_from_record_start(self):
+        targets = [ranges[0] for ranges in split_file(self.CSV_FILENAME_1, 5)]
+        boundaries = find_record_boundaries(self.CSV_FILENAME_1, targets[1:])
+        self.assertEqual(find_record_boundaries(self.CSV_FILENAME_1, targets[1:], start=targets[0]), boundaries)
+        self.assertEqual(find_record_boundaries(self.CSV_FILENAME_1, targets[2:], start=targets[1], block_size=16),
+                         boundaries[1:])
+
+    def _read_ranges(self, file_path, chunk_count, delimiter=',', quote_char='"', escape_char=None):
+        rows = []
+        for start, end in split_file(file_path, chunk_count, quote_char, escape_char):
+            with FileRange(file_path, start, end) as csv_range:
+                text = io.StringIO(csv_range.read().decode("utf-8"), newline='')
+            rows.extend(csv.reader(text, delimiter=delimiter, quotechar=quote_char, escapechar=escape_char))
+        return rows
+
+
+if __name__ == '__main__':
+    unittest.main()
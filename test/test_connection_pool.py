@@ -0,0 +1,70 @@
+import configparser
+import threading
+import unittest
+from postgresql_csv_loader.connection_pool import ConnectionPool
+from psycopg2.pool import PoolError
+
+
+class TestConnectionPool(unittest.TestCase):
+    """
+    Test connection pool.
+
+    To run this test, you need to set up a postgresql database at localhost:5440.
+    Database name 'tests' and user 'tests'.
+    """
+
+    def setUp(self):
+        config = configparser.ConfigParser()
+        config.read('db_config.ini')
+
+        self.pool = ConnectionPool(max_size=2, timeout=0.2,
+                                   host=config['DEFAULT']['database_host'],
+                                   port=config['DEFAULT']['database_port'],
+                                   dbname=config['DEFAULT']['database_name'],
+                                   user=config['DEFAULT']['database_user'])
+
+    def tearDown(self):
+        self.pool.closeall()
+
+    def test_reuse(self):
+        connection = self.pool.getconn()
+        self.pool.putconn(connection)
+        self.assertIs(self.pool.getconn(), connection)
+
+    def test_broken_connection_replaced(self):
+        connection = self.pool.getconn()
+        self.pool.putconn(connection)
+        connection.close()
+
+        replacement = self.pool.getconn()
+        self.assertIsNot(replacement, connection)
+        self.assertFalse(replacement.closed)
+
+    def test_failed_transaction_rolled_back(self):
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            with self.assertRaises(Exception):
+                cursor.execute("SELECT 1/0")
+
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_max_size(self):
+        self.pool.getconn()
+        second = self.pool.getconn()
+        with self.assertRaises(PoolError):
+            self.pool.getconn()
+
+        threading.Timer(0.05, self.pool.putconn, [second]).start()
+        self.assertIs(self.pool.getconn(), second)
+
+    def test_closed_pool(self):
+        self.pool.closeall()
+        with self.assertRaises(PoolError):
+            self.pool.getconn()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,41 @@
 import configparser
+import contextlib
+import gzip
+import io
 import logging
+import os
+import shutil
 import sys
+import tempfile
 import unittest
-from postgresql_csv_loader import CsvLoader
-from psycopg2 import connect
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from postgresql_csv_loader import (ConnectionPool, CsvLoader, Manifest, MergeCounts, PreparedTransactionError,
+                                   RejectLimitError)
+from postgresql_csv_loader.cli import main
+from psycopg2 import IntegrityError, OperationalError, connect, extensions
+from psycopg2.pool import ThreadedConnectionPool
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+
+class FailingCommitConnection(extensions.connection):
+    """
+    Connection whose commits of prepared transactions fail, a given number of times.
+    """
+
+    failures = 0
+    # if True, commits of transactions prepared by other connections fail too
+    fail_recovery = False
+
+    def tpc_commit(self, *args):
+        if FailingCommitConnection.failures > 0 and (not args or FailingCommitConnection.fail_recovery):
+            FailingCommitConnection.failures -= 1
+            raise OperationalError("server closed the connection unexpectedly")
+        return super(FailingCommitConnection, self).tpc_commit(*args)
 
 
 class TestCsvLoader(unittest.TestCase):
@@ -20,21 +52,52 @@ class TestCsvLoader(unittest.TestCase):
     CSV_FILENAME_4 = "resources/polish_characters.csv"
     CSV_FILENAME_5 = "resources/weird_format.csv"
     CSV_FILENAME_6 = "resources/quoted_headers.csv"
+    CSV_FILENAME_7 = "resources/typed_values.csv"
+    CSV_FILENAME_8 = "resources/late_text_value.csv"
+    CSV_FILENAME_9 = "resources/multiline_header.csv"
+    CSV_FILENAME_10 = "resources/simple_table_delta.csv"
+    CSV_FILENAME_11 = "resources/bad_rows.csv"
+    COMPRESSED_FILENAMES = ["resources/compressed_table.csv.gz", "resources/compressed_table.csv.bz2",
+                            "resources/compressed_table.csv.xz", "resources/compressed_table.csv.zst"]
     CSV_1_RECORD_COUNT = 30
     CSV_2_RECORD_COUNT = 5
     CSV_3_RECORD_COUNT = 5
     CSV_4_RECORD_COUNT = 1
     CSV_5_RECORD_COUNT = 1
     CSV_6_RECORD_COUNT = 5
+    CSV_7_RECORD_COUNT = 4
+    CSV_8_RECORD_COUNT = 4
+    CSV_9_RECORD_COUNT = 2
+    CSV_10_RECORD_COUNT = 3
     TABLE_NAME_1 = "csv_stackoverflow_survey_results_public_sample"
     TABLE_NAME_2 = "csv_simple_table"
     TABLE_NAME_3 = "csv_illegal_column_names"
     TABLE_NAME_4 = "csv_polish_characters"
     TABLE_NAME_5 = "csv_weird_format"
     TABLE_NAME_6 = "csv_quoted_headers"
+    TABLE_NAME_7 = "csv_typed_values"
+    TABLE_NAME_8 = "csv_late_text_value"
+    TABLE_NAME_9 = "csv_multiline_header"
+    TABLE_NAME_10 = "csv_simple_table_delta"
+    TABLE_NAME_11 = "csv_bad_rows"
+    COMPRESSED_TABLE_NAME = "csv_compressed_table"
+    MANIFEST_TABLE_NAME = "csv_test_manifest"
+    ROWS_TABLE_NAME = "csv_in_memory_rows"
+    REJECT_TABLE_NAME = "csv_test_rejects"
+    SCHEMA_NAME = "csv_test_schema"
+    PARTITIONED_TABLE_NAME = "csv_test_partitioned"
+    PARTITION_TABLE_NAME = "csv_test_partition_low"
 
     SELECT_COUNT_STMT = "SELECT count(*) from {};"
+    SELECT_INDEXES_STMT = "SELECT indexname FROM pg_indexes WHERE tablename = '{}' ORDER BY indexname;"
+    SELECT_CONSTRAINTS_STMT = "SELECT conname, contype FROM pg_constraint WHERE conrelid = '{}'::regclass " \
+                              "ORDER BY conname;"
+    SELECT_TYPES_STMT = "SELECT column_name, data_type FROM information_schema.columns " \
+                        "WHERE table_name = '{}' ORDER BY ordinal_position;"
+    SELECT_PERSISTENCE_STMT = "SELECT relpersistence FROM pg_class WHERE relname = '{}';"
     DROP_STMT = "DROP TABLE {};"
+    CREATE_PARTITIONED_STMT = "CREATE TABLE {} (respondent integer PRIMARY KEY, professional varchar, " \
+                              "country varchar) PARTITION BY RANGE (respondent); CREATE INDEX ON {} (country);"
 
     def setUp(self):
         config = configparser.ConfigParser()
@@ -51,6 +114,11 @@ class TestCsvLoader(unittest.TestCase):
 
         log_format = '%(asctime)s | %(name)s | %(levelname)s | %(message)s'
         logging.basicConfig(format=log_format, level=logging.INFO, stream=sys.stdout)
+        self._loaders = []
+
+    def tearDown(self):
+        for loader in self._loaders:
+            loader.close()
 
     def test_original_headers(self):
         loader = self._get_loader()
@@ -147,8 +215,913 @@ class TestCsvLoader(unittest.TestCase):
 
         self.assertEqual(result, self.CSV_6_RECORD_COUNT)
 
+    def test_load_data_parallel(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_1, workers=4)
+
+        result = self._check_count(self.TABLE_NAME_1)
+        self._drop(self.TABLE_NAME_1)
+        self.assertEqual(result, self.CSV_1_RECORD_COUNT)
+
+    def test_load_data_parallel_two_phase_commit(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_6, workers=3, two_phase_commit=True)
+
+        result = self._check_count(self.TABLE_NAME_6)
+        self._drop(self.TABLE_NAME_6)
+        self.assertEqual(result, self.CSV_6_RECORD_COUNT)
+
+    def test_load_data_parallel_commit_prepared_again(self):
+        FailingCommitConnection.failures, FailingCommitConnection.fail_recovery = 1, False
+        with self._get_pool() as pool:
+            loader = CsvLoader(pool=pool)
+            loader.COMMIT_PREPARED_DELAY = 0
+            loader.load_data(self.CSV_FILENAME_1, workers=3, two_phase_commit=True)
+
+        result = self._check_count(self.TABLE_NAME_1)
+        prepared = self._fetch_all("SELECT gid FROM pg_prepared_xacts;")
+        self._drop(self.TABLE_NAME_1)
+        self.assertEqual(result, self.CSV_1_RECORD_COUNT)
+        self.assertEqual(prepared, [])
+
+    def test_load_data_parallel_prepared_not_rolled_back(self):
+        FailingCommitConnection.failures, FailingCommitConnection.fail_recovery = 100, True
+        self.addCleanup(self._drop, self.TABLE_NAME_1)
+        with self._get_pool() as pool:
+            loader = CsvLoader(pool=pool)
+            loader.COMMIT_PREPARED_DELAY = 0
+            with self.assertRaises(PreparedTransactionError) as context:
+                loader.load_data(self.CSV_FILENAME_1, workers=3, two_phase_commit=True, analyze=False)
+
+        connection = connect(dbname=self.database_name, user=self.database_user, password=None,
+                             host=self.database_host, port=self.database_port)
+        prepared = connection.tpc_recover()
+        for xid in prepared:
+            connection.tpc_commit(xid)
+        connection.close()
+        result = self._check_count(self.TABLE_NAME_1)
+        self.assertEqual(len(context.exception.gids), 3)
+        self.assertEqual(sorted(str(xid) for xid in prepared), sorted(context.exception.gids))
+        self.assertEqual(result, self.CSV_1_RECORD_COUNT)
+
+    def test_load_data_parallel_encoding(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_4, encoding='iso-8859-2', workers=2)
+
+        result = self._check_count(self.TABLE_NAME_4)
+        self._drop(self.TABLE_NAME_4)
+        self.assertEqual(result, self.CSV_4_RECORD_COUNT)
+
+    def test_connection_reused(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_2)
+        first_pid = self._backend_pid(loader)
+        loader.load_data(self.CSV_FILENAME_6)
+        second_pid = self._backend_pid(loader)
+
+        self._drop(self.TABLE_NAME_2)
+        self._drop(self.TABLE_NAME_6)
+        self.assertEqual(first_pid, second_pid)
+
+    def test_session(self):
+        loader = self._get_loader()
+        with loader.session():
+            loader.load_data(self.CSV_FILENAME_2)
+            loader.load_data(self.CSV_FILENAME_6)
+            with self.assertRaises(ValueError):
+                loader.load_data(self.CSV_FILENAME_1, workers=2)
+
+        result = self._check_count(self.TABLE_NAME_6)
+        self._drop(self.TABLE_NAME_2)
+        self._drop(self.TABLE_NAME_6)
+        self.assertEqual(result, self.CSV_6_RECORD_COUNT)
+
+    def test_external_connection(self):
+        connection = connect(dbname=self.database_name, user=self.database_user, password=None,
+                             host=self.database_host, port=self.database_port)
+        with CsvLoader(connection=connection) as loader:
+            loader.load_data(self.CSV_FILENAME_2)
+
+        self.assertIsNone(loader._pool)
+        self.assertFalse(connection.closed)
+        connection.close()
+        result = self._check_count(self.TABLE_NAME_2)
+        self._drop(self.TABLE_NAME_2)
+        self.assertEqual(result, self.CSV_2_RECORD_COUNT)
+
+    def test_external_pool(self):
+        pool = ThreadedConnectionPool(1, 4, dbname=self.database_name, user=self.database_user,
+                                      host=self.database_host, port=self.database_port)
+        with CsvLoader(pool=pool) as loader:
+            loader.load_data(self.CSV_FILENAME_1, workers=3)
+
+        result = self._check_count(self.TABLE_NAME_1)
+        self._drop(self.TABLE_NAME_1)
+        pool.closeall()
+        self.assertEqual(result, self.CSV_1_RECORD_COUNT)
+
+    def test_infer_schema(self):
+        loader = self._get_loader()
+        schema = loader.infer_schema(self.CSV_FILENAME_7)
+        self.assertEqual(schema, self.TYPED_SCHEMA)
+
+    def test_infer_schema_text_columns(self):
+        loader = self._get_loader()
+        schema = loader.infer_schema(self.CSV_FILENAME_1)
+        self.assertEqual(schema[0], ('respondent', 'integer'))
+        self.assertEqual(schema[1], ('professional', 'varchar'))
+
+    def test_load_data_infer_types(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_7, infer_types=True, column_types={'comment': 'text'})
+
+        result = self._check_count(self.TABLE_NAME_7)
+        types = self._column_types(self.TABLE_NAME_7)
+        self._drop(self.TABLE_NAME_7)
+        self.assertEqual(result, self.CSV_7_RECORD_COUNT)
+        self.assertEqual(types, self.TYPED_COLUMNS)
+
+    def test_load_data_infer_types_fallback(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_8, infer_types=True, sample_size=20)
+
+        result = self._check_count(self.TABLE_NAME_8)
+        types = self._column_types(self.TABLE_NAME_8)
+        self._drop(self.TABLE_NAME_8)
+        self.assertEqual(result, self.CSV_8_RECORD_COUNT)
+        self.assertEqual(types, [('id', 'integer'), ('amount', 'character varying')])
+
+    def test_load_data_binary(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_7, infer_types=True, copy_format='binary')
+
+        result = self._select(self.TABLE_NAME_7, "big_id, price, active, day, created_at, token::text, comment")
+        self._drop(self.TABLE_NAME_7)
+        self.assertEqual(len(result), self.CSV_7_RECORD_COUNT)
+        self.assertEqual(result[2], (None, Decimal('-1500'), True, date(2017, 7, 3),
+                                     datetime(2017, 7, 3, 12, 30, 45, 500000),
+                                     '550e8400-e29b-41d4-a716-446655440002', 'multi\nline'))
+
+    def test_load_data_binary_parallel(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_7, infer_types=True, copy_format='binary', workers=2)
+
+        result = self._select(self.TABLE_NAME_7, "price")
+        self._drop(self.TABLE_NAME_7)
+        # rows of both workers are stored in the order they commit
+        self.assertEqual(sorted(result), [(Decimal('-1500'),), (Decimal('0.25'),), (Decimal('12.50'),),
+                                          (Decimal('13'),)])
+
+    def test_load_data_binary_fallback(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_8, infer_types=True, sample_size=20, copy_format='binary')
+
+        types = self._column_types(self.TABLE_NAME_8)
+        result = self._check_count(self.TABLE_NAME_8)
+        self._drop(self.TABLE_NAME_8)
+        self.assertEqual(result, self.CSV_8_RECORD_COUNT)
+        self.assertEqual(types, [('id', 'integer'), ('amount', 'character varying')])
+
+    def test_load_data_binary_fallback_out_of_range(self):
+        loader = self._get_loader()
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "late_large_value.csv")
+            with open(file_path, "w") as csv_file:
+                csv_file.write("Id,Amount\n" + "".join("{},{}\n".format(i, i * 10) for i in range(1, 50)) +
+                               "50,3000000000\n")
+            loader.load_data(file_path, infer_types=True, sample_size=50, copy_format='binary')
+
+        types = self._column_types("csv_late_large_value")
+        result = self._check_count("csv_late_large_value")
+        self._drop("csv_late_large_value")
+        self.assertEqual(result, 50)
+        self.assertEqual(types, [('id', 'integer'), ('amount', 'character varying')])
+
+    def test_load_data_binary_fallback_time_zone(self):
+        loader = self._get_loader()
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "late_offset.csv")
+            with open(file_path, "w") as csv_file:
+                csv_file.write("Id,Created\n" + "".join("{},2020-01-01 10:{:02d}:00\n".format(i, i)
+                                                          for i in range(1, 50)) + "50,2020-01-01T10:00:00+02:00\n")
+            loader.load_data(file_path, infer_types=True, sample_size=50, copy_format='binary')
+
+        types = self._column_types("csv_late_offset")
+        result = self._check_count("csv_late_offset")
+        self._drop("csv_late_offset")
+        self.assertEqual(result, 50)
+        self.assertEqual(types, [('id', 'integer'), ('created', 'character varying')])
+
+    def test_load_data_binary_session_time_zone(self):
+        connection = connect(dbname=self.database_name, user=self.database_user, password=None,
+                             host=self.database_host, port=self.database_port)
+        cursor = connection.cursor()
+        cursor.execute("SET TIME ZONE 'Europe/Warsaw'")
+        connection.commit()
+        cursor.close()
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "local_times.csv")
+            with open(file_path, "w") as csv_file:
+                csv_file.write("Id,Created\n1,2020-01-01 10:00:00\n2,2020-07-01 10:00:00+00:00\n")
+            with CsvLoader(connection=connection) as loader:
+                loader.load_data(file_path, column_types={"id": "integer", "created": "timestamptz"},
+                                 copy_format='binary')
+        connection.close()
+
+        selected = self._select("csv_local_times", "created")
+        self._drop("csv_local_times")
+        self.assertEqual(selected, [(datetime(2020, 1, 1, 9, tzinfo=timezone.utc),),
+                                    (datetime(2020, 7, 1, 10, tzinfo=timezone.utc),)])
+
+    def test_load_data_binary_encoding(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_4, encoding='iso-8859-2', copy_format='binary')
+
+        result = self._select(self.TABLE_NAME_4, "text")
+        self._drop(self.TABLE_NAME_4)
+        self.assertTrue(result[0][0].startswith('Wąż zjadł gruszkę'))
+
+    def test_load_data_unknown_format(self):
+        loader = self._get_loader()
+        with self.assertRaises(ValueError):
+            loader.load_data(self.CSV_FILENAME_2, copy_format='xml')
+
+    def test_multiline_headers(self):
+        loader = self._get_loader()
+        headers = loader._read_headers(self.CSV_FILENAME_9)
+        self.assertEqual(headers, ['Respondent', 'Professional\nTitle', 'Country'])
+
+    def test_load_data_passthrough(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_1, passthrough=True, block_size=4096)
+
+        result = self._check_count(self.TABLE_NAME_1)
+        self._drop(self.TABLE_NAME_1)
+        self.assertEqual(result, self.CSV_1_RECORD_COUNT)
+
+    def test_load_data_passthrough_encoding(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_4, encoding='iso-8859-2', passthrough=True)
+
+        result = self._select(self.TABLE_NAME_4, "text")
+        self._drop(self.TABLE_NAME_4)
+        self.assertTrue(result[0][0].startswith('Wąż zjadł gruszkę'))
+
+    def test_load_data_passthrough_weird_format(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_5, delimiter=';', quote_char='/', escape_char='\\', passthrough=True)
+
+        result = self._check_count(self.TABLE_NAME_5)
+        self._drop(self.TABLE_NAME_5)
+        self.assertEqual(result, self.CSV_5_RECORD_COUNT)
+
+    def test_load_data_passthrough_multiline_header(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_9, passthrough=True)
+
+        result = self._check_count(self.TABLE_NAME_9)
+        self._drop(self.TABLE_NAME_9)
+        self.assertEqual(result, self.CSV_9_RECORD_COUNT)
+
+    def test_compressed_table_name(self):
+        table_name = self._get_loader()._generate_table_name("Daily-Stats.csv.gz")
+        self.assertEqual(table_name, 'csv_daily_stats')
+
+    def test_compressed_headers(self):
+        loader = self._get_loader()
+        for file_path in self._compressed_files():
+            headers = loader._read_headers(file_path)
+            self.assertEqual(headers[0], 'Id', file_path)
+
+    def test_load_compressed(self):
+        loader = self._get_loader()
+        for file_path in self._compressed_files():
+            for passthrough in (False, True):
+                loader.load_data(file_path, passthrough=passthrough)
+
+                result = self._check_count(self.COMPRESSED_TABLE_NAME)
+                self._drop(self.COMPRESSED_TABLE_NAME)
+                self.assertEqual(result, self.CSV_7_RECORD_COUNT, file_path)
+
+    def test_load_compressed_typed(self):
+        loader = self._get_loader()
+        loader.load_data(self.COMPRESSED_FILENAMES[0], infer_types=True, copy_format='binary')
+
+        types = self._column_types(self.COMPRESSED_TABLE_NAME)
+        result = self._check_count(self.COMPRESSED_TABLE_NAME)
+        self._drop(self.COMPRESSED_TABLE_NAME)
+        self.assertEqual(result, self.CSV_7_RECORD_COUNT)
+        self.assertEqual(types[:3], [('id', 'integer'), ('big_id', 'bigint'), ('price', 'numeric')])
+
+    def test_load_compressed_parallel(self):
+        loader = self._get_loader()
+        with self.assertRaises(ValueError):
+            loader.load_data(self.COMPRESSED_FILENAMES[0], workers=2)
+
+    def _compressed_files(self):
+        try:
+            import zstandard  # noqa: F401
+            return self.COMPRESSED_FILENAMES
+        except ImportError:
+            return self.COMPRESSED_FILENAMES[:-1]
+
+    def test_load_data_indexes(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_7, infer_types=True, indexes=['day', ['active', 'price']],
+                         primary_key='id', unique=[['token']], index_workers=3, maintenance_work_mem='16MB')
+
+        indexes = self._fetch_all(self.SELECT_INDEXES_STMT.format(self.TABLE_NAME_7))
+        constraints = self._fetch_all(self.SELECT_CONSTRAINTS_STMT.format(self.TABLE_NAME_7))
+        analyzed = self._fetch_all("SELECT last_analyze IS NOT NULL FROM pg_stat_user_tables "
+                                   "WHERE relname = '{}';".format(self.TABLE_NAME_7))
+        self._drop(self.TABLE_NAME_7)
+        self.assertEqual(indexes, [('csv_typed_values_active_price_idx',), ('csv_typed_values_day_idx',),
+                                   ('csv_typed_values_pkey',), ('csv_typed_values_token_key',)])
+        self.assertEqual(constraints, [('csv_typed_values_pkey', 'p'), ('csv_typed_values_token_key', 'u')])
+        self.assertEqual(analyzed, [(True,)])
+
+    def test_load_data_indexes_schema(self):
+        self._execute("CREATE SCHEMA IF NOT EXISTS {};".format(self.SCHEMA_NAME))
+        self.addCleanup(self._execute, "DROP SCHEMA {} CASCADE;".format(self.SCHEMA_NAME))
+        table_name = "{}.{}".format(self.SCHEMA_NAME, self.TABLE_NAME_2)
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_2, table_name=table_name, indexes=['country'], primary_key='respondent')
+
+        indexes = self._fetch_all("SELECT schemaname, indexname FROM pg_indexes WHERE tablename = '{}' "
+                                  "ORDER BY indexname;".format(self.TABLE_NAME_2))
+        constraints = self._fetch_all(self.SELECT_CONSTRAINTS_STMT.format(table_name))
+        self.assertEqual(indexes, [(self.SCHEMA_NAME, 'csv_simple_table_country_idx'),
+                                   (self.SCHEMA_NAME, 'csv_simple_table_pkey')])
+        self.assertEqual(constraints, [('csv_simple_table_pkey', 'p')])
+
+    def test_load_data_indexes_long_names(self):
+        table_name = "csv_" + "long_table_name_" * 3 + "of_respondents"
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_1, table_name=table_name,
+                         indexes=[['respondent', 'country'], ['respondent', 'professional']])
+
+        indexes = self._fetch_all(self.SELECT_INDEXES_STMT.format(table_name))
+        self._drop(table_name)
+        self.assertEqual(len(indexes), 2)
+        self.assertNotEqual(indexes[0], indexes[1])
+        self.assertTrue(all(len(index.encode("utf-8")) <= 63 for index, in indexes))
+
+    def test_load_data_duplicate_key(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_1, create_table=True)
+        with self.assertRaises(IntegrityError):
+            loader.load_data(self.CSV_FILENAME_1, create_table=False, primary_key='respondent')
+
+        result = self._check_count(self.TABLE_NAME_1)
+        self._drop(self.TABLE_NAME_1)
+        self.assertEqual(result, 2 * self.CSV_1_RECORD_COUNT)
+
+    def test_load_data_fast_load(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_2, fast_load=True)
+        loader.load_data(self.CSV_FILENAME_2, create_table=False, fast_load=True)
+
+        result = self._check_count(self.TABLE_NAME_2)
+        self._drop(self.TABLE_NAME_2)
+        self.assertEqual(result, self.CSV_2_RECORD_COUNT)
+
+    def test_load_data_fast_load_unlogged(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_7, infer_types=True, copy_format='binary', fast_load=True,
+                         unlogged=True, primary_key='id')
+
+        result = self._check_count(self.TABLE_NAME_7)
+        persistence = self._fetch_all(self.SELECT_PERSISTENCE_STMT.format(self.TABLE_NAME_7))
+        self._drop(self.TABLE_NAME_7)
+        self.assertEqual(result, self.CSV_7_RECORD_COUNT)
+        self.assertEqual(persistence, [('p',)])
+
+    def test_load_data_fast_load_fallback(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_8, infer_types=True, sample_size=20, fast_load=True)
+
+        types = self._column_types(self.TABLE_NAME_8)
+        result = self._check_count(self.TABLE_NAME_8)
+        self._drop(self.TABLE_NAME_8)
+        self.assertEqual(result, self.CSV_8_RECORD_COUNT)
+        self.assertEqual(types, [('id', 'integer'), ('amount', 'character varying')])
+
+    def test_load_data_fast_load_parallel(self):
+        loader = self._get_loader()
+        with self.assertRaises(ValueError):
+            loader.load_data(self.CSV_FILENAME_2, fast_load=True, workers=2)
+
+    def test_load_data_incremental(self):
+        loader = self._get_loader()
+        manifest = Manifest(self.MANIFEST_TABLE_NAME)
+        loader.load_data(self.CSV_FILENAME_1, incremental=True, manifest=manifest, chunk_size=10000)
+        loader.load_data(self.CSV_FILENAME_1, create_table=False, incremental=True, manifest=manifest)
+
+        result = self._check_count(self.TABLE_NAME_1)
+        entries = self._fetch_all("SELECT committed_offset, completed FROM {};".format(self.MANIFEST_TABLE_NAME))
+        self._drop(self.TABLE_NAME_1)
+        self._drop(self.MANIFEST_TABLE_NAME)
+        self.assertEqual(result, self.CSV_1_RECORD_COUNT)
+        self.assertEqual(entries, [(os.path.getsize(self.CSV_FILENAME_1), True)])
+
+    def test_load_data_incremental_resume(self):
+        loader = self._get_loader()
+        with self.assertRaises(RuntimeError):
+            loader.load_data(self.CSV_FILENAME_1, copy_format='binary', incremental=True, chunk_size=10000,
+                             manifest=FailingManifest(self.MANIFEST_TABLE_NAME, fail_after=2))
+        interrupted = self._check_count(self.TABLE_NAME_1)
+        loader.load_data(self.CSV_FILENAME_1, copy_format='binary', incremental=True, chunk_size=10000,
+                         manifest=Manifest(self.MANIFEST_TABLE_NAME))
+
+        result = self._check_count(self.TABLE_NAME_1)
+        self._drop(self.TABLE_NAME_1)
+        self._drop(self.MANIFEST_TABLE_NAME)
+        self.assertTrue(0 < interrupted < self.CSV_1_RECORD_COUNT)
+        self.assertEqual(result, self.CSV_1_RECORD_COUNT)
+
+    def test_load_data_incremental_changed_file(self):
+        loader = self._get_loader()
+        manifest = Manifest(self.MANIFEST_TABLE_NAME)
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = shutil.copy(self.CSV_FILENAME_2, directory)
+            loader.load_data(file_path, incremental=True, manifest=manifest)
+            with open(file_path, "a") as csv_file:
+                csv_file.write("6,Student,Poland\n")
+            loader.load_data(file_path, incremental=True, manifest=manifest)
+
+        result = self._check_count(self.TABLE_NAME_2)
+        self._drop(self.TABLE_NAME_2)
+        self._drop(self.MANIFEST_TABLE_NAME)
+        self.assertEqual(result, self.CSV_2_RECORD_COUNT + 1)
+
+    def test_load_data_incremental_compressed(self):
+        loader = self._get_loader()
+        manifest = Manifest(self.MANIFEST_TABLE_NAME)
+        loader.load_data(self.COMPRESSED_FILENAMES[0], incremental=True, manifest=manifest)
+        loader.load_data(self.COMPRESSED_FILENAMES[0], incremental=True, manifest=manifest)
+
+        result = self._check_count(self.COMPRESSED_TABLE_NAME)
+        self._drop(self.COMPRESSED_TABLE_NAME)
+        self._drop(self.MANIFEST_TABLE_NAME)
+        self.assertEqual(result, self.CSV_7_RECORD_COUNT)
+
+    def test_load_data_merge(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_2, primary_key='respondent')
+        counts = loader.load_data(self.CSV_FILENAME_10, table_name=self.TABLE_NAME_2, merge_key='respondent').merge
+
+        result = self._select(self.TABLE_NAME_2, "respondent, country")
+        self._drop(self.TABLE_NAME_2)
+        self.assertEqual(counts, MergeCounts(inserted=1, updated=2, deleted=0))
+        self.assertEqual(len(result), self.CSV_2_RECORD_COUNT + 1)
+        self.assertIn(('2', 'Poland'), result)
+
+    def test_load_data_merge_schema(self):
+        self._execute("CREATE SCHEMA IF NOT EXISTS {};".format(self.SCHEMA_NAME))
+        self.addCleanup(self._execute, "DROP SCHEMA {} CASCADE;".format(self.SCHEMA_NAME))
+        table_name = "{}.{}".format(self.SCHEMA_NAME, self.TABLE_NAME_2)
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_2, table_name=table_name, primary_key='respondent')
+        counts = loader.load_data(self.CSV_FILENAME_10, table_name=table_name, merge_key='respondent').merge
+
+        result = self._select(table_name, "respondent, country")
+        self.assertEqual(counts, MergeCounts(inserted=1, updated=2, deleted=0))
+        self.assertIn(('2', 'Poland'), result)
+
+    def test_load_data_merge_delete_missing(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_2)
+        counts = loader.load_data(self.CSV_FILENAME_10, table_name=self.TABLE_NAME_2, merge_key=['respondent'],
+                                  delete_missing=True, merge_method='merge', copy_format='binary').merge
+
+        result = self._select(self.TABLE_NAME_2, "respondent, country")
+        self._drop(self.TABLE_NAME_2)
+        self.assertEqual(counts, MergeCounts(inserted=1, updated=2, deleted=3))
+        self.assertEqual(sorted(result), [('2', 'Poland'), ('5', 'Switzerland'), ('6', 'Germany')])
+
+    def test_load_data_merge_creates_table(self):
+        loader = self._get_loader()
+        counts = loader.load_data(self.CSV_FILENAME_10, merge_key='respondent', infer_types=True).merge
+        counts_again = loader.load_data(self.CSV_FILENAME_10, merge_key='respondent', infer_types=True).merge
+
+        constraints = self._fetch_all(self.SELECT_CONSTRAINTS_STMT.format(self.TABLE_NAME_10))
+        self._drop(self.TABLE_NAME_10)
+        self.assertEqual(counts, MergeCounts(inserted=self.CSV_10_RECORD_COUNT, updated=0, deleted=0))
+        self.assertEqual(counts_again, MergeCounts(inserted=0, updated=self.CSV_10_RECORD_COUNT, deleted=0))
+        self.assertEqual(constraints, [('csv_simple_table_delta_pkey', 'p')])
+
+    def test_load_data_merge_unknown_key(self):
+        loader = self._get_loader()
+        with self.assertRaises(ValueError):
+            loader.load_data(self.CSV_FILENAME_10, merge_key='salary')
+
+    def test_load_data_result(self):
+        loader = self._get_loader()
+        reports = []
+        result = loader.load_data(self.CSV_FILENAME_1, progress_callback=reports.append, progress_interval=0)
+
+        self._drop(self.TABLE_NAME_1)
+        self.assertEqual(result.table_name, self.TABLE_NAME_1)
+        self.assertEqual(result.rows, self.CSV_1_RECORD_COUNT)
+        self.assertEqual(result.bytes_read, os.path.getsize(self.CSV_FILENAME_1))
+        self.assertTrue({'header', 'connect', 'create', 'copy', 'commit', 'analyze'} <= set(result.phases))
+        self.assertEqual(reports[-1].phase, 'done')
+        self.assertEqual(reports[-1].rows, self.CSV_1_RECORD_COUNT)
+
+    def test_load_data_result_parallel(self):
+        loader = self._get_loader()
+        for copy_format in CsvLoader.COPY_FORMATS:
+            result = loader.load_data(self.CSV_FILENAME_1, workers=3, copy_format=copy_format)
+
+            self._drop(self.TABLE_NAME_1)
+            self.assertEqual(result.rows, self.CSV_1_RECORD_COUNT)
+            self.assertEqual(sum(chunk.rows for chunk in result.chunks), self.CSV_1_RECORD_COUNT)
+            self.assertLess(result.bytes_read, os.path.getsize(self.CSV_FILENAME_1))
+
+    def test_load_data_result_compressed(self):
+        loader = self._get_loader()
+        result = loader.load_data(self.COMPRESSED_FILENAMES[0], copy_format='binary', infer_types=True)
+
+        self._drop(self.COMPRESSED_TABLE_NAME)
+        self.assertEqual(result.rows, self.CSV_7_RECORD_COUNT)
+        self.assertEqual(result.bytes_read, os.path.getsize(self.CSV_FILENAME_7))
+
+    def test_load_data_quarantine(self):
+        loader = self._get_loader()
+        reject_file = os.path.join(tempfile.mkdtemp(), "rejects.csv")
+        result = loader.load_data(self.CSV_FILENAME_11, column_types={'id': 'integer', 'amount': 'numeric'},
+                                  quarantine=True, chunk_size=16, reject_file=reject_file,
+                                  reject_table=self.REJECT_TABLE_NAME)
+
+        selected = self._select(self.TABLE_NAME_11, "id")
+        rejects = self._fetch_all("SELECT file_path, line, error, record FROM {} ORDER BY line;".format(
+            self.REJECT_TABLE_NAME))
+        with open(reject_file, newline='') as rejects_csv:
+            rejects_in_file = len(rejects_csv.readlines())
+        shutil.rmtree(os.path.dirname(reject_file))
+        self._drop(self.TABLE_NAME_11)
+        self._drop(self.REJECT_TABLE_NAME)
+        self.assertEqual(selected, [(1,), (3,), (5,)])
+        self.assertEqual(result.rows, 3)
+        self.assertEqual(result.rejected, 2)
+        self.assertEqual(rejects, [
+            (self.CSV_FILENAME_11, 3, 'invalid input syntax for type numeric: "oops" (column "amount")', '2,oops,b'),
+            (self.CSV_FILENAME_11, 6, 'extra data after last expected column', '4,4.5,c,extra')])
+        self.assertEqual(rejects_in_file, 3)
+
+    def test_load_data_quarantine_many_skipped_rows(self):
+        loader = self._get_loader()
+        copy_csv_range = loader._copy_csv_range
+
+        def copy_skipping_rows(connection, file_path, command, start, end, block_size, monitor=None):
+            # rows skipped by COPY ... ON_ERROR ignore of PostgreSQL 17+ are reported in notices like these
+            rows = copy_csv_range(connection, file_path, command, start, end, block_size, monitor)
+            cursor = connection.cursor()
+            cursor.execute("DO $$ BEGIN FOR line IN 1..120 LOOP RAISE NOTICE 'skipping row due to data type "
+                           "incompatibility at line % for column \"amount\": \"oops\"', line; END LOOP; END $$;")
+            cursor.close()
+            return rows - 120
+
+        loader._copy_csv_range = copy_skipping_rows
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "skipped_rows.csv")
+            with open(file_path, "w") as csv_file:
+                csv_file.write("id,amount\n" + "".join("{},oops\n".format(i) for i in range(1, 201)))
+            result = loader.load_data(file_path, quarantine=True, reject_table=self.REJECT_TABLE_NAME)
+
+        rejects = self._fetch_all("SELECT min(line), max(line), count(*) FROM {};".format(self.REJECT_TABLE_NAME))
+        self._drop("csv_skipped_rows")
+        self._drop(self.REJECT_TABLE_NAME)
+        self.assertEqual(result.rejected, 120)
+        self.assertEqual(rejects, [(2, 121, 120)])
+
+    def test_load_data_quarantine_inferred_types(self):
+        loader = self._get_loader()
+        result = loader.load_data(self.CSV_FILENAME_8, infer_types=True, sample_size=20, quarantine=True)
+
+        count = self._check_count(self.TABLE_NAME_8)
+        types = self._column_types(self.TABLE_NAME_8)
+        self._drop(self.TABLE_NAME_8)
+        self.assertEqual(count, self.CSV_8_RECORD_COUNT)
+        self.assertEqual(result.rejected, 0)
+        self.assertEqual(types, [('id', 'integer'), ('amount', 'character varying')])
+
+    def test_load_data_quarantine_max_rejects(self):
+        loader = self._get_loader()
+        with self.assertRaises(RejectLimitError):
+            loader.load_data(self.CSV_FILENAME_11, quarantine=True, max_rejects=0)
+        # records before the rejected one are committed, all columns are varchar so only record 4 fails
+        result = self._check_count(self.TABLE_NAME_11)
+        self._drop(self.TABLE_NAME_11)
+        self.assertEqual(result, 3)
+
+    def test_load_data_quarantine_clean(self):
+        loader = self._get_loader()
+        result = loader.load_data(self.CSV_FILENAME_7, infer_types=True, quarantine=True, chunk_size=64)
+
+        count = self._check_count(self.TABLE_NAME_7)
+        self._drop(self.TABLE_NAME_7)
+        self.assertEqual(count, self.CSV_7_RECORD_COUNT)
+        self.assertEqual(result.rejected, 0)
+
+    def test_load_data_quarantine_invalid(self):
+        loader = self._get_loader()
+        with self.assertRaises(ValueError):
+            loader.load_data(self.CSV_FILENAME_11, quarantine=True, workers=2)
+        with self.assertRaises(ValueError):
+            loader.load_data(self.COMPRESSED_FILENAMES[0], quarantine=True)
+
+    def test_load_rows(self):
+        loader = self._get_loader()
+        rows = ((index, "name {}".format(index) if index % 3 else [None, ""][index % 2]) for index in range(2500))
+        result = loader.load_rows(rows, ["Id", "Name"], self.ROWS_TABLE_NAME, column_types={"id": "integer"},
+                                  batch_size=1000, block_size=4096)
+
+        selected = self._select(self.ROWS_TABLE_NAME, "id, name")
+        self._drop(self.ROWS_TABLE_NAME)
+        self.assertEqual(result.rows, 2500)
+        self.assertEqual(selected[:4], [(0, None), (1, "name 1"), (2, "name 2"), (3, None)])
+        self.assertEqual(len(selected), 2500)
+
+    def test_load_rows_failure(self):
+        def rows():
+            yield (1, "a")
+            raise KeyError("broken")
+
+        loader = self._get_loader()
+        with self.assertRaises(KeyError):
+            loader.load_rows(rows(), ["id", "name"], self.ROWS_TABLE_NAME)
+        result = self._check_count(self.ROWS_TABLE_NAME)
+        self._drop(self.ROWS_TABLE_NAME)
+        self.assertEqual(result, 0)
+
+    @unittest.skipIf(pandas is None, "pandas is not installed")
+    def test_load_frame(self):
+        frame = pandas.DataFrame({"Id": [1, 2, 3], "price": [0.5, None, 2.0], "active": [True, False, True],
+                                  "day": pandas.to_datetime(["2020-01-01", None, "2020-01-03"]),
+                                  "name": ["a", "b,\"c\"", ""]})
+        loader = self._get_loader()
+        for data in (frame, frame.to_records(index=False)):
+            result = loader.load_frame(data, self.ROWS_TABLE_NAME, batch_size=2)
+
+            types = self._column_types(self.ROWS_TABLE_NAME)
+            selected = self._select(self.ROWS_TABLE_NAME, "id, price, active, day, name")
+            self._drop(self.ROWS_TABLE_NAME)
+            self.assertEqual(result.rows, 3)
+            self.assertEqual(types, [("id", "bigint"), ("price", "double precision"), ("active", "boolean"),
+                                     ("day", "timestamp without time zone"), ("name", "character varying")])
+            self.assertEqual(selected, [(1, 0.5, True, datetime(2020, 1, 1), "a"), (2, None, False, None, 'b,"c"'),
+                                        (3, 2.0, True, datetime(2020, 1, 3), None)])
+
+    def test_load_frame_unsupported(self):
+        loader = self._get_loader()
+        with self.assertRaises(ValueError):
+            loader.load_frame([(1, 2)], self.ROWS_TABLE_NAME)
+
+    def test_load_data_projection(self):
+        loader = self._get_loader()
+        result = loader.load_data(self.CSV_FILENAME_1, columns={"respondent": "id", "country": "country"},
+                                  row_filter={"professional": "Student"}, infer_types=True)
+
+        types = self._column_types(self.TABLE_NAME_1)
+        selected = self._select(self.TABLE_NAME_1, "id, country")
+        self._drop(self.TABLE_NAME_1)
+        self.assertEqual(types, [("id", "integer"), ("country", "character varying")])
+        self.assertEqual(result.rows, len(selected))
+        self.assertEqual(selected[0], (1, "United States"))
+
+    def test_load_data_projection_fast(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_7, columns=["id", "comment"], fast_load=True,
+                         row_filter={"id": lambda value: int(value) > 1})
+
+        selected = self._select(self.TABLE_NAME_7, "id, comment")
+        self._drop(self.TABLE_NAME_7)
+        self.assertEqual(selected, [("2", None), ("3", "multi\nline"), ("4", "last")])
+
+    def test_load_data_projection_single_column(self):
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_7, columns=["comment"])
+
+        selected = self._select(self.TABLE_NAME_7, "comment")
+        self._drop(self.TABLE_NAME_7)
+        self.assertEqual(selected, [("first",), (None,), ("multi\nline",), ("last",)])
+
+    def test_load_data_projection_invalid(self):
+        loader = self._get_loader()
+        with self.assertRaises(ValueError):
+            loader.load_data(self.CSV_FILENAME_2, columns=["country"], workers=2)
+        with self.assertRaises(ValueError):
+            loader.load_data(self.CSV_FILENAME_2, columns=["salary"])
+
+    def test_load_many(self):
+        missing = "resources/missing.csv"
+        finished = []
+        loader = self._get_loader()
+        result = loader.load_many([self.CSV_FILENAME_2, missing, self.CSV_FILENAME_1], concurrency=2,
+                                   file_callback=finished.append, infer_types=True)
+
+        count_1 = self._check_count(self.TABLE_NAME_1)
+        count_2 = self._check_count(self.TABLE_NAME_2)
+        self._drop(self.TABLE_NAME_1)
+        self._drop(self.TABLE_NAME_2)
+        self.assertEqual(count_1, self.CSV_1_RECORD_COUNT)
+        self.assertEqual(count_2, self.CSV_2_RECORD_COUNT)
+        # largest first, the missing file last
+        self.assertEqual([outcome.file_path for outcome in result.outcomes],
+                         [self.CSV_FILENAME_1, self.CSV_FILENAME_2, missing])
+        self.assertIsInstance(result.failed[0].error, FileNotFoundError)
+        self.assertEqual(result.rows, self.CSV_1_RECORD_COUNT + self.CSV_2_RECORD_COUNT)
+        self.assertEqual(len(finished), 3)
+
+    def test_load_many_processes(self):
+        loader = self._get_loader()
+        result = loader.load_many([self.CSV_FILENAME_2, self.CSV_FILENAME_6], processes=True)
+
+        count = self._check_count(self.TABLE_NAME_6)
+        self._drop(self.TABLE_NAME_2)
+        self._drop(self.TABLE_NAME_6)
+        self.assertEqual(count, self.CSV_6_RECORD_COUNT)
+        self.assertEqual(result.rows, self.CSV_2_RECORD_COUNT + self.CSV_6_RECORD_COUNT)
+        self.assertEqual(result.failed, [])
+
+    def test_load_many_invalid(self):
+        loader = CsvLoader(self.database_host, self.database_port, self.database_name, self.database_user,
+                           pool_size=4)
+        self._loaders.append(loader)
+        with self.assertRaises(ValueError):
+            loader.load_many([self.CSV_FILENAME_2], concurrency=2, workers=4)
+        with self.assertRaises(ValueError):
+            loader.load_many([self.CSV_FILENAME_2], table_name=self.TABLE_NAME_2)
+
+    def test_cli(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            status = main(["--host", self.database_host, "--port", self.database_port, "--dbname",
+                           self.database_name, "--user", self.database_user, "--jobs", "2", "--pattern",
+                           "simple_table*.csv", "resources"])
+
+        count = self._check_count(self.TABLE_NAME_10)
+        self._drop(self.TABLE_NAME_2)
+        self._drop(self.TABLE_NAME_10)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(status, 0)
+        self.assertEqual(count, self.CSV_10_RECORD_COUNT)
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[-1].startswith("total"))
+
+    def test_export_data(self):
+        directory = tempfile.mkdtemp()
+        export_path = os.path.join(directory, "simple_table.csv")
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_2)
+        try:
+            result = loader.export_data(self.TABLE_NAME_2, export_path, columns=["respondent", "country"],
+                                        where="country <> 'Switzerland'", delimiter=";")
+            with open(export_path) as export_file:
+                exported = export_file.read().splitlines()
+        finally:
+            shutil.rmtree(directory)
+            self._drop(self.TABLE_NAME_2)
+        self.assertEqual(result.rows, 4)
+        self.assertEqual(exported, ["respondent;country", "1;United States", "2;United Kingdom", "3;United Kingdom",
+                                    "4;United States"])
+
+    def test_export_data_parallel(self):
+        directory = tempfile.mkdtemp()
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_1)
+        try:
+            # wide rows fill several pages, so every worker exports some of them
+            single = loader.export_data(self.TABLE_NAME_1, os.path.join(directory, "single.csv"))
+            parallel = loader.export_data(self.TABLE_NAME_1, os.path.join(directory, "parallel.csv.gz"),
+                                          workers=3)
+            with open(os.path.join(directory, "single.csv"), "rb") as single_file:
+                single_data = single_file.read()
+            with gzip.open(os.path.join(directory, "parallel.csv.gz")) as parallel_file:
+                parallel_data = parallel_file.read()
+            files = sorted(os.listdir(directory))
+        finally:
+            shutil.rmtree(directory)
+            self._drop(self.TABLE_NAME_1)
+        self.assertEqual(parallel.rows, self.CSV_1_RECORD_COUNT)
+        self.assertEqual(len([chunk for chunk in parallel.chunks if chunk.rows]), 3)
+        self.assertEqual(parallel_data, single_data)
+        self.assertEqual(single.rows, self.CSV_1_RECORD_COUNT)
+        self.assertEqual(files, ["parallel.csv.gz", "single.csv"])
+
+    def test_load_data_partition(self):
+        self._execute(self.CREATE_PARTITIONED_STMT.format(self.PARTITIONED_TABLE_NAME, self.PARTITIONED_TABLE_NAME))
+        connection = connect(dbname=self.database_name, user=self.database_user, password=None,
+                             host=self.database_host, port=self.database_port,
+                             options="-c client_min_messages=debug1")
+        try:
+            with CsvLoader(connection=connection) as loader:
+                loader.load_data(self.CSV_FILENAME_2, partition_of=self.PARTITIONED_TABLE_NAME,
+                                 partition_bounds=(None, 10), table_name=self.PARTITION_TABLE_NAME)
+            # the CHECK constraint added before attaching spares the scan of the partition
+            implied = [notice for notice in connection.notices if "implied by existing constraints" in notice]
+        finally:
+            connection.close()
+
+        count = self._check_count(self.PARTITIONED_TABLE_NAME)
+        indexes = self._fetch_all(self.SELECT_INDEXES_STMT.format(self.PARTITION_TABLE_NAME))
+        constraints = self._fetch_all(self.SELECT_CONSTRAINTS_STMT.format(self.PARTITION_TABLE_NAME))
+        self._drop(self.PARTITIONED_TABLE_NAME)
+        self.assertEqual(count, self.CSV_2_RECORD_COUNT)
+        self.assertEqual(len(implied), 1)
+        self.assertEqual(indexes, [("csv_test_partition_low_country_idx",), ("csv_test_partition_low_pkey",)])
+        self.assertEqual(constraints, [("csv_test_partition_low_pkey", "p")])
+
+    def test_load_data_replace_partition(self):
+        self._execute(self.CREATE_PARTITIONED_STMT.format(self.PARTITIONED_TABLE_NAME, self.PARTITIONED_TABLE_NAME))
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_2, partition_of=self.PARTITIONED_TABLE_NAME, partition_bounds=(1, 10),
+                         table_name=self.PARTITION_TABLE_NAME)
+        result = loader.load_data(self.CSV_FILENAME_10, partition_of=self.PARTITIONED_TABLE_NAME,
+                                  partition_bounds=(1, 10), table_name=self.PARTITION_TABLE_NAME,
+                                  replace_partition=True, workers=2, index_workers=2)
+
+        selected = self._select(self.PARTITIONED_TABLE_NAME, "respondent")
+        tables = self._fetch_all("SELECT relname FROM pg_class WHERE relname LIKE '{}%' AND relkind = 'r';".format(
+            self.PARTITION_TABLE_NAME))
+        indexes = self._fetch_all(self.SELECT_INDEXES_STMT.format(self.PARTITION_TABLE_NAME))
+        self._drop(self.PARTITIONED_TABLE_NAME)
+        self.assertEqual(result.rows, self.CSV_10_RECORD_COUNT)
+        self.assertEqual(selected, [(2,), (5,), (6,)])
+        self.assertEqual(tables, [(self.PARTITION_TABLE_NAME,)])
+        self.assertEqual(indexes, [("csv_test_partition_low_country_idx",), ("csv_test_partition_low_pkey",)])
+
+    def test_load_data_replace_partition_schema(self):
+        self._execute("CREATE SCHEMA IF NOT EXISTS {};".format(self.SCHEMA_NAME))
+        self.addCleanup(self._execute, "DROP SCHEMA {} CASCADE;".format(self.SCHEMA_NAME))
+        partitioned_table = "{}.{}".format(self.SCHEMA_NAME, self.PARTITIONED_TABLE_NAME)
+        partition_table = "{}.{}".format(self.SCHEMA_NAME, self.PARTITION_TABLE_NAME)
+        self._execute(self.CREATE_PARTITIONED_STMT.format(partitioned_table, partitioned_table))
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_2, partition_of=partitioned_table, partition_bounds=(1, 10),
+                         table_name=partition_table)
+        loader.load_data(self.CSV_FILENAME_10, partition_of=partitioned_table, partition_bounds=(1, 10),
+                         table_name=partition_table, replace_partition=True)
+
+        selected = self._select(partitioned_table, "respondent")
+        tables = self._fetch_all("SELECT schemaname, tablename FROM pg_tables WHERE tablename LIKE '{}%';".format(
+            self.PARTITION_TABLE_NAME))
+        self.assertEqual(selected, [(2,), (5,), (6,)])
+        self.assertEqual(tables, [(self.SCHEMA_NAME, self.PARTITION_TABLE_NAME)])
+
+    def test_load_data_replace_partition_out_of_bounds(self):
+        self._execute(self.CREATE_PARTITIONED_STMT.format(self.PARTITIONED_TABLE_NAME, self.PARTITIONED_TABLE_NAME))
+        loader = self._get_loader()
+        loader.load_data(self.CSV_FILENAME_2, partition_of=self.PARTITIONED_TABLE_NAME, partition_bounds=(1, 10),
+                         table_name=self.PARTITION_TABLE_NAME)
+        with self.assertRaises(IntegrityError):
+            loader.load_data(self.CSV_FILENAME_10, partition_of=self.PARTITIONED_TABLE_NAME,
+                             partition_bounds=(1, 4), table_name=self.PARTITION_TABLE_NAME, replace_partition=True)
+
+        count = self._check_count(self.PARTITIONED_TABLE_NAME)
+        tables = self._fetch_all("SELECT relname FROM pg_class WHERE relname LIKE '{}%' AND relkind = 'r';".format(
+            self.PARTITION_TABLE_NAME))
+        self._drop(self.PARTITIONED_TABLE_NAME)
+        self.assertEqual(count, self.CSV_2_RECORD_COUNT)
+        self.assertEqual(tables, [(self.PARTITION_TABLE_NAME,)])
+
+    def test_load_data_partition_out_of_bounds(self):
+        self._execute(self.CREATE_PARTITIONED_STMT.format(self.PARTITIONED_TABLE_NAME, self.PARTITIONED_TABLE_NAME))
+        loader = self._get_loader()
+        with self.assertRaises(IntegrityError):
+            loader.load_data(self.CSV_FILENAME_10, partition_of=self.PARTITIONED_TABLE_NAME,
+                             partition_bounds=(5, None), table_name=self.PARTITION_TABLE_NAME)
+
+        count = self._check_count(self.PARTITIONED_TABLE_NAME)
+        self._drop(self.PARTITION_TABLE_NAME)
+        self._drop(self.PARTITIONED_TABLE_NAME)
+        self.assertEqual(count, 0)
+
+    def test_load_data_partition_invalid(self):
+        loader = self._get_loader()
+        with self.assertRaises(ValueError):
+            loader.load_data(self.CSV_FILENAME_2, partition_of=self.PARTITIONED_TABLE_NAME, partition_bounds=(1, 10),
+                             primary_key="respondent")
+        loader.load_data(self.CSV_FILENAME_2)
+        try:
+            with self.assertRaises(ValueError):
+                loader.load_data(self.CSV_FILENAME_10, partition_of=self.TABLE_NAME_2, partition_bounds=(1, 10))
+        finally:
+            self._drop(self.TABLE_NAME_2)
+
     def _get_loader(self):
-        return CsvLoader(self.database_host, self.database_port, self.database_name, self.database_user)
+        loader = CsvLoader(self.database_host, self.database_port, self.database_name, self.database_user)
+        self._loaders.append(loader)
+        return loader
+
+    def _get_pool(self):
+        return ConnectionPool(max_size=4, connection_factory=FailingCommitConnection, dbname=self.database_name,
+                              user=self.database_user, host=self.database_host, port=self.database_port)
+
+    def _backend_pid(self, loader):
+        with loader._acquire_connection() as connection:
+            return connection.get_backend_pid()
 
     def _check_count(self, table_name):
         connection = connect(dbname=self.database_name, user=self.database_user, password=None,
@@ -160,6 +1133,45 @@ class TestCsvLoader(unittest.TestCase):
         connection.close()
         return result[0]
 
+    def _fetch_all(self, query):
+        connection = connect(dbname=self.database_name, user=self.database_user, password=None,
+                             host=self.database_host, port=self.database_port)
+        cursor = connection.cursor()
+        cursor.execute(query)
+        result = cursor.fetchall()
+        cursor.close()
+        connection.close()
+        return result
+
+    def _select(self, table_name, columns):
+        connection = connect(dbname=self.database_name, user=self.database_user, password=None,
+                             host=self.database_host, port=self.database_port)
+        cursor = connection.cursor()
+        cursor.execute("SELECT {} FROM {} ORDER BY ctid;".format(columns, table_name))
+        result = cursor.fetchall()
+        cursor.close()
+        connection.close()
+        return result
+
+    def _column_types(self, table_name):
+        connection = connect(dbname=self.database_name, user=self.database_user, password=None,
+                             host=self.database_host, port=self.database_port)
+        cursor = connection.cursor()
+        cursor.execute(self.SELECT_TYPES_STMT.format(table_name))
+        result = cursor.fetchall()
+        cursor.close()
+        connection.close()
+        return result
+
+    def _execute(self, statement):
+        connection = connect(dbname=self.database_name, user=self.database_user, password=None,
+                             host=self.database_host, port=self.database_port)
+        cursor = connection.cursor()
+        cursor.execute(statement)
+        connection.commit()
+        cursor.close()
+        connection.close()
+
     def _drop(self, table_name):
         connection = connect(dbname=self.database_name, user=self.database_user, password=None,
                              host=self.database_host, port=self.database_port)
@@ -249,6 +1261,30 @@ class TestCsvLoader(unittest.TestCase):
 
     WEIRD_HEADERS = ['Respondent', 'Professional', 'Country']
 
+    TYPED_SCHEMA = [('id', 'integer'), ('big_id', 'bigint'), ('price', 'numeric'), ('active', 'boolean'),
+                    ('day', 'date'), ('created_at', 'timestamp'), ('token', 'uuid'), ('code', 'varchar'),
+                    ('comment', 'varchar')]
+
+    TYPED_COLUMNS = [('id', 'integer'), ('big_id', 'bigint'), ('price', 'numeric'), ('active', 'boolean'),
+                     ('day', 'date'), ('created_at', 'timestamp without time zone'), ('token', 'uuid'),
+                     ('code', 'character varying'), ('comment', 'text')]
+
+
+class FailingManifest(Manifest):
+    """
+    Manifest interrupting the load after given number of committed chunks.
+    """
+
+    def __init__(self, table_name, fail_after):
+        super(FailingManifest, self).__init__(table_name)
+        self._remaining = fail_after
+
+    def commit_offset(self, connection, file_path, committed_offset, completed=False):
+        if self._remaining == 0:
+            raise RuntimeError("interrupted")
+        self._remaining -= 1
+        super(FailingManifest, self).commit_offset(connection, file_path, committed_offset, completed)
+
 
 if __name__ == '__main__':
     unittest.main()
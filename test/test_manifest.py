@@ -0,0 +1,46 @@
+import os
+import shutil
+import tempfile
+import unittest
+from postgresql_csv_loader.manifest import Manifest, ManifestEntry, fingerprint, identify
+
+
+class TestManifest(unittest.TestCase):
+    """
+    Test file fingerprints used by incremental load.
+    """
+
+    CSV_FILENAME_1 = "resources/stackoverflow_survey_results_public_sample.csv"
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.directory, "sample.csv")
+        shutil.copy(self.CSV_FILENAME_1, self.file_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_fingerprint_is_stable(self):
+        self.assertEqual(fingerprint(self.file_path, 4, 1024), fingerprint(self.CSV_FILENAME_1, 4, 1024))
+
+    def test_fingerprint_detects_sampled_change(self):
+        original = fingerprint(self.file_path, 4, 1024)
+        with open(self.file_path, "r+b") as csv_file:
+            csv_file.seek(-10, os.SEEK_END)
+            csv_file.write(b"X")
+        self.assertNotEqual(fingerprint(self.file_path, 4, 1024), original)
+
+    def test_fingerprint_small_file_hashed_whole(self):
+        self.assertEqual(fingerprint(self.file_path), fingerprint(self.file_path, sample_count=None))
+
+    def test_matches(self):
+        identity = identify(self.file_path)
+        entry = ManifestEntry(self.file_path, "csv_sample", identity.size, identity.mtime, identity.fingerprint,
+                              0, False)
+        self.assertTrue(Manifest.matches(entry, identity))
+        self.assertFalse(Manifest.matches(entry._replace(size=identity.size + 1), identity))
+        self.assertFalse(Manifest.matches(None, identity))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import io
+import unittest
+from postgresql_csv_loader.progress import LoadMonitor, LoadResult, ProgressReader, ProgressWriter
+
+
+class TestProgress(unittest.TestCase):
+    """
+    Test load throughput counters.
+    """
+
+    DATA = b"id,name\n1,a\n2,\"b\nc\"\n"
+
+    def test_reader_counts_blocks(self):
+        monitor = LoadMonitor("csv_test", callback=lambda progress: None)
+        with ProgressReader(io.BytesIO(self.DATA), monitor) as reader:
+            blocks = list(iter(lambda: reader.read(5), b""))
+
+        self.assertEqual(b"".join(blocks), self.DATA)
+        self.assertEqual(monitor.bytes_read, len(self.DATA))
+        self.assertEqual(monitor.lines, 4)
+
+    def test_reader_as_text(self):
+        monitor = LoadMonitor("csv_test")
+        with io.TextIOWrapper(io.BufferedReader(ProgressReader(io.BytesIO(self.DATA), monitor)),
+                              encoding="utf-8") as text:
+            self.assertEqual(text.read(), self.DATA.decode("utf-8"))
+        self.assertEqual(monitor.bytes_read, len(self.DATA))
+
+    def test_writer_counts_blocks(self):
+        monitor = LoadMonitor("csv_test", callback=lambda progress: None)
+        target = io.BytesIO()
+        target.close = lambda: None
+        with io.BufferedWriter(ProgressWriter(target, monitor), 8) as writer:
+            for line in self.DATA.splitlines(keepends=True):
+                writer.write(line)
+
+        self.assertEqual(target.getvalue(), self.DATA)
+        self.assertEqual(monitor.bytes_read, len(self.DATA))
+        self.assertEqual(monitor.lines, 4)
+
+    def test_callback(self):
+        reports = []
+        monitor = LoadMonitor("csv_test", callback=reports.append, interval=0)
+        monitor.add_block(100, 2)
+        monitor.add_block(100, 3)
+        monitor.add_rows(4)
+        result = monitor.finish()
+
+        self.assertEqual([progress.bytes_read for progress in reports], [100, 200, 200])
+        self.assertEqual(reports[-1].phase, "done")
+        self.assertEqual(reports[-2].rows, 5)
+        self.assertEqual(reports[-1].rows, 4)
+        self.assertEqual(result.rows, 4)
+
+    def test_lines_counted_only_for_callback(self):
+        monitor = LoadMonitor("csv_test")
+        with ProgressReader(io.BytesIO(self.DATA), monitor) as reader:
+            reader.read()
+        self.assertEqual(monitor.lines, 0)
+
+    def test_callback_interval(self):
+        reports = []
+        monitor = LoadMonitor("csv_test", callback=reports.append, interval=3600)
+        for _ in range(100):
+            monitor.add_block(10, 1)
+        self.assertEqual(reports, [])
+
+    def test_phases(self):
+        monitor = LoadMonitor("csv_test")
+        with monitor.phase("copy"):
+            monitor.add_block(1024 * 1024, 1)
+        with monitor.phase("copy"):
+            pass
+        result = monitor.finish()
+
+        self.assertEqual(list(result.phases), ["copy"])
+        self.assertGreater(result.megabytes_per_second, 0)
+
+    def test_result_without_copy(self):
+        self.assertEqual(LoadResult("csv_test", "test.csv").megabytes_per_second, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import csv
+import io
+import unittest
+from postgresql_csv_loader.projection import Projection
+
+
+class TestProjection(unittest.TestCase):
+    """
+    Test selecting and filtering columns of parsed records.
+    """
+
+    HEADERS = ["respondent", "professional", "country"]
+    RECORDS = [["1", "Student", "United States"], ["2", "Student", "United Kingdom"],
+               ["3", "Professional developer", "United Kingdom"], ["4", "", "Poland, \"PL\""]]
+
+    def test_select_and_rename(self):
+        projection = Projection(self.HEADERS, {"country": "name", "respondent": "id"})
+
+        self.assertEqual(projection.headers, ["name", "id"])
+        self.assertEqual(projection.table_column("respondent"), "id")
+        self.assertIsNone(projection.table_column("professional"))
+        self.assertEqual(list(projection.rows(self.RECORDS))[0], ("United States", "1"))
+
+    def test_single_column(self):
+        projection = Projection(self.HEADERS, ["country"])
+        self.assertEqual(list(projection.rows(self.RECORDS[:2])), [("United States",), ("United Kingdom",)])
+
+    def test_filter(self):
+        projection = Projection(self.HEADERS, ["respondent"], {"country": {"United Kingdom", "Poland"},
+                                                               "professional": lambda value: value != "Student"})
+        self.assertEqual(list(projection.rows(self.RECORDS)), [("3",)])
+
+        projection = Projection(self.HEADERS, row_filter={"professional": ""})
+        self.assertEqual(list(projection.rows(self.RECORDS)), [tuple(self.RECORDS[3])])
+
+    def test_encode(self):
+        projection = Projection(self.HEADERS, ["respondent", "professional", "country"])
+        records = list(csv.reader(io.StringIO(b"".join(projection.encode(self.RECORDS, batch_size=3)).decode(),
+                                              newline="")))
+        self.assertEqual(records, self.RECORDS)
+
+    def test_encode_single_column(self):
+        projection = Projection(self.HEADERS, ["professional"])
+        self.assertEqual(b"".join(projection.encode(self.RECORDS[2:])), b"Professional developer\n\n")
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Projection(self.HEADERS, ["respondent", "salary"])
+        with self.assertRaises(ValueError):
+            Projection(self.HEADERS, row_filter={"salary": "1"})
+        with self.assertRaises(ValueError):
+            Projection(self.HEADERS, [])
+        with self.assertRaises(ValueError):
+            list(Projection(self.HEADERS, ["country"]).rows([["1", "Student"]]))
+
+
+if __name__ == '__main__':
+    unittest.main()
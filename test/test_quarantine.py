@@ -0,0 +1,64 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from postgresql_csv_loader.quarantine import LineCounter, Reject, RejectLimitError, RejectWriter
+
+
+class TestQuarantine(unittest.TestCase):
+    """
+    Test recording of rejected rows.
+    """
+
+    CSV_FILENAME = "resources/bad_rows.csv"
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_line_at(self):
+        counter = LineCounter(self.CSV_FILENAME)
+        with open(self.CSV_FILENAME, "rb") as csv_file:
+            data = csv_file.read()
+
+        self.assertEqual(counter.line_at(0), 1)
+        self.assertEqual(counter.line_at(data.index(b"3,3.5")), 4)
+        self.assertEqual(counter.line_at(data.index(b"4,4.5")), 6)
+        # moving back starts counting from the beginning
+        self.assertEqual(counter.line_at(data.index(b"2,oops")), 3)
+
+    def test_offset_of(self):
+        counter = LineCounter(self.CSV_FILENAME)
+        with open(self.CSV_FILENAME, "rb") as csv_file:
+            data = csv_file.read()
+
+        self.assertEqual(counter.offset_of(3), data.index(b"2,oops"))
+        self.assertEqual(counter.offset_of(6), data.index(b"4,4.5"))
+        self.assertEqual(counter.offset_of(1), 0)
+        self.assertEqual(counter.offset_of(100), len(data))
+
+    def test_reject_file(self):
+        reject_file = os.path.join(self.directory, "rejects.csv")
+        writer = RejectWriter("data.csv", reject_file=reject_file)
+        writer.write(None, Reject(3, "invalid input", "2,oops,b"))
+        writer.write(None, Reject(6, "extra data", "4,4.5,c,extra"))
+
+        with open(reject_file, newline="") as rejects:
+            rows = list(csv.reader(rejects))
+        self.assertEqual(rows, [RejectWriter.FILE_HEADER, ["data.csv", "3", "invalid input", "2,oops,b"],
+                                ["data.csv", "6", "extra data", "4,4.5,c,extra"]])
+        self.assertEqual(writer.count, 2)
+
+    def test_max_rejects(self):
+        writer = RejectWriter("data.csv", max_rejects=1)
+        writer.write(None, Reject(3, "invalid input", "2,oops,b"))
+        with self.assertRaises(RejectLimitError) as context:
+            writer.write(None, Reject(6, "extra data", "4,4.5,c,extra"))
+        self.assertEqual(context.exception.reject.line, 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import csv
+import io
+import unittest
+from datetime import datetime
+from postgresql_csv_loader.row_source import (RowStreamReader, column_names, encode_array, encode_frame,
+                                              encode_rows, postgres_types)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+
+class TestRowSource(unittest.TestCase):
+    """
+    Test encoding of in-memory data as CSV.
+    """
+
+    ROWS = [(1, "plain", 0.5), (2, 'with "quote", comma', None), (3, "new\nline", 1.25), (4, "", 2.0)]
+
+    def test_reader_sizes(self):
+        reader = RowStreamReader(iter([b"abc", b"", b"defgh", b"ij"]))
+        self.assertEqual(reader.read(4), b"abcd")
+        self.assertEqual(reader.read(2), b"ef")
+        self.assertEqual(reader.read(), b"ghij")
+        self.assertEqual(reader.read(4), b"")
+
+    def test_reader_keeps_error(self):
+        def batches():
+            yield b"abc"
+            raise KeyError("column")
+
+        reader = RowStreamReader(batches())
+        self.assertEqual(reader.read(2), b"ab")
+        with self.assertRaises(KeyError):
+            reader.read(10)
+        self.assertIsInstance(reader.error, KeyError)
+
+    def test_encode_rows_batches(self):
+        batches = list(encode_rows(iter(self.ROWS), batch_size=2))
+
+        self.assertEqual(len(batches), 2)
+        self.assertTrue(b"".join(batches).endswith(b"\n4,,2.0\n"))
+        records = list(csv.reader(io.StringIO(b"".join(batches).decode("utf-8"), newline="")))
+        self.assertEqual(records, [["1", "plain", "0.5"], ["2", 'with "quote", comma', ""],
+                                   ["3", "new\nline", "1.25"], ["4", "", "2.0"]])
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_encode_array(self):
+        array = numpy.array([(1, 0.5, True, "2020-01-02T03:04:05", "a,\"b"), (2, numpy.nan, False, "NaT", "")],
+                            dtype=[("Id", "i4"), ("price", "f8"), ("active", "?"), ("created", "M8[s]"),
+                                   ("name", "U10")])
+        text = b"".join(encode_array(array, batch_size=1)).decode("utf-8")
+
+        self.assertEqual(text, '1,0.5,True,2020-01-02T03:04:05,"a,""b"\n2,,False,,\n')
+        self.assertEqual(column_names(array), ["Id", "price", "active", "created", "name"])
+        self.assertEqual(postgres_types(array), ["integer", "double precision", "boolean", "timestamp", None])
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_encode_array_objects(self):
+        array = numpy.array([("x",), (None,), ("",)], dtype=[("name", "O")])
+        self.assertEqual(b"".join(encode_array(array)), b'"x"\n\n\n')
+
+    @unittest.skipIf(pandas is None, "pandas is not installed")
+    def test_encode_frame(self):
+        frame = pandas.DataFrame({"id": [1, 2, 3, 4], "name": ["a", None, "c,d", ""],
+                                  "day": [datetime(2020, 1, 1), None, datetime(2020, 1, 3), datetime(2020, 1, 4)]})
+        batches = list(encode_frame(frame, batch_size=2))
+
+        self.assertEqual(len(batches), 2)
+        self.assertEqual(b"".join(batches), b'1,a,2020-01-01\n2,,\n3,"c,d",2020-01-03\n4,,2020-01-04\n')
+        self.assertEqual(postgres_types(frame), ["bigint", None, "timestamp"])
+
+
+if __name__ == '__main__':
+    unittest.main()
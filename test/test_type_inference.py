@@ -0,0 +1,39 @@
+import unittest
+from postgresql_csv_loader.type_inference import TypeInferrer, infer_column_types
+
+
+class TestTypeInference(unittest.TestCase):
+    """
+    Test detecting column types.
+    """
+
+    def test_types(self):
+        rows = [['1', '2147483648', '1.5', 'true', '2017-07-01', '2017-07-01 10:00:00', '2017-07-01T10:00:00Z',
+                 '550e8400-e29b-41d4-a716-446655440000'],
+                ['-3', '5', '2', 'F', '2017-12-31', '2017-07-01T10:00', '2017-07-01 10:00:00+02:00',
+                 '550E8400-E29B-41D4-A716-446655440000']]
+        types = infer_column_types(rows, 8)
+        self.assertEqual(types, ['integer', 'bigint', 'numeric', 'boolean', 'date', 'timestamp', 'timestamptz',
+                                 'uuid'])
+
+    def test_text(self):
+        rows = [['007', 'a', 'multi\nline', '', 'NA'], ['12', 'b', '1', '', '1']]
+        self.assertEqual(infer_column_types(rows, 5), ['varchar'] * 5)
+
+    def test_later_batch_widens_type(self):
+        inferrer = TypeInferrer(2)
+        inferrer.add_rows([['1', '1'], ['2', '2']])
+        self.assertEqual(inferrer.types(), ['integer', 'integer'])
+        inferrer.add_rows([['99999999999', 'x']])
+        self.assertEqual(inferrer.types(), ['bigint', 'varchar'])
+
+    def test_integer_overflow(self):
+        self.assertEqual(infer_column_types([['2147483647'], ['-2147483648']], 1), ['integer'])
+        self.assertEqual(infer_column_types([['9223372036854775808']], 1), ['numeric'])
+
+    def test_short_rows(self):
+        self.assertEqual(infer_column_types([['1'], ['2', 'x', 'extra']], 2), ['integer', 'varchar'])
+
+
+if __name__ == '__main__':
+    unittest.main()